@@ -0,0 +1,329 @@
+"""Benchmark suite for the NexusLink backend hot paths.
+
+Builds a deterministic synthetic catalog at each requested size, installs it
+into the in-memory store and times the core functions plus every GET route
+through the in-process ASGI app. Routes are timed cold (the store version is
+bumped before each sample, as after a tick) and again as ``[cached]`` hits. Results (timings and memory high-water
+marks) are written as JSON so runs can be compared:
+
+    uv run python bench.py --sizes 10,1000,100000 --output bench_results.json
+    uv run python bench.py --sizes 10,1000 --compare bench_results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+import main
+
+COUNTRIES = [
+    ("Vietnam", 0.15, [("Geopolitical Spike", 0.32, "2026-05-01"), ("Negotiated Cap", 0.20, "2026-07-01")]),
+    ("China", 0.25, [("Trade War 2.0", 0.45, "2026-06-15"), ("Phase-Down", 0.18, "2027-01-01")]),
+    ("Mexico", 0.0, [("USMCA Review", 0.05, "2026-09-01")]),
+    ("Bangladesh", 0.12, [("GSP Withdrawal", 0.22, "2026-08-01")]),
+    ("India", 0.10, [("Reciprocal Duty", 0.26, "2026-10-01")]),
+    ("Portugal", 0.04, [("EU Retaliation", 0.12, "2026-11-15")]),
+]
+CATEGORIES = ["Outerwear", "Footwear", "Packs", "Equipment", "Camping", "Base Layers", "Accessories", "Climbing"]
+RETURN_REASONS = ["Carrier Damaged", "Wrong Item Shipped", "Quality Issue", "Size Exchange", "Changed Mind"]
+GRADES = ["A", "B", "C", "pending"]
+
+# History is 168 points per SKU; above this many SKUs it is generated for a prefix only.
+DEFAULT_HISTORY_MAX_SKUS = 1_000
+# 0%..99% in 1-point steps, evaluated against every country.
+TARIFF_SWEEP = [r / 100 for r in range(100)]
+GET_ROUTES = [
+    "/",
+    "/inventory",
+    "/api/history",
+    "/api/analytics/demand",
+    "/api/health",
+    "/api/recommendations",
+    "/api/replenishment",
+    "/api/supplier-risks",
+    "/api/connectors",
+    "/api/ingest/stats",
+    "/api/startup",
+]
+
+
+def synthetic_catalog(n_skus, seed=42):
+    """Seed-shaped catalog of ``n_skus`` inventory records, identical for a given seed."""
+    rng = random.Random(seed)
+    inventory = []
+    for i in range(n_skus):
+        wms = rng.randint(0, 800)
+        committed = rng.randint(0, max(1, wms // 2))
+        drift = rng.random()
+        # ~30% of SKUs carry a listing gap, a few of them large.
+        over = rng.randint(6, 80) if drift < 0.3 else rng.randint(-5, 5)
+        country = COUNTRIES[rng.randrange(len(COUNTRIES))][0]
+        item = main.InventoryRecord({
+            "id": f"SKU-{100000 + i}",
+            "name": f"{rng.choice(['Alpine', 'Summit', 'Glacier', 'Ridge', 'Canyon', 'Trail'])} "
+                    f"{rng.choice(['Jacket', 'Pack', 'Boot', 'Tent', 'Stove', 'Bag', 'Layer'])} {i}",
+            "category": rng.choice(CATEGORIES),
+            "systems": {
+                "shopify": max(0, wms + over),
+                "amazon": max(0, wms + rng.randint(-10, over if over > 0 else 5)),
+                "wms": wms,
+                "pos": rng.randint(0, 60),
+            },
+            "true_atp": wms,
+            "committed": committed,
+            "available": 0,
+            "discrepancy": False,
+            "risk_value": 0,
+            "country_of_origin": country,
+            "lead_time_days": rng.choice([14, 21, 30, 45, 60, 90]),
+            "reorder_point": rng.randint(10, 200),
+            "unit_cost": round(rng.uniform(4, 180), 2),
+        })
+        main.refresh_item_state(item)
+        inventory.append(item)
+
+    tariffs = [
+        {
+            "country": country,
+            "current_rate": rate,
+            "scenarios": [{"name": name, "rate": r, "effective_date": date} for name, r, date in scenarios],
+        }
+        for country, rate, scenarios in COUNTRIES
+    ]
+
+    return_items = []
+    for i in range(max(1, n_skus // 20)):
+        sku = inventory[rng.randrange(n_skus)]["id"] if n_skus else "SKU-0"
+        qty = rng.randint(1, 200)
+        return_items.append({
+            "id": f"RET-{10000 + i}",
+            "sku": sku,
+            "qty": qty,
+            "value": int(qty * rng.uniform(20, 150)),
+            "days": rng.randint(1, 60),
+            "reason": rng.choice(RETURN_REASONS),
+            "grade": rng.choice(GRADES),
+        })
+
+    alerts = []
+    for i, item in enumerate(rng.sample(inventory, min(len(inventory), 20))):
+        kind = rng.choice(["gap", "reorder", "spike", "returns", "tariff"])
+        message = {
+            "gap": f"{item['name']}: 40-unit gap detected — Shopify vs WMS ({item['systems']['wms']})",
+            "reorder": f"{item['name']} approaching reorder point — {item['available']} available",
+            "spike": f"TikTok spike: {item['name']} — velocity surge",
+            "returns": "Returns backlog awaiting inspection at ShipBob",
+            "tariff": f"{item['country_of_origin']} tariff increase pending",
+        }[kind]
+        alerts.append({
+            "id": f"B{i}",
+            "type": rng.choice(["CRITICAL", "WARNING", "INFO"]),
+            "message": message,
+            "risk": item["risk_value"],
+            "action": "sync_inventory" if kind == "gap" else None,
+            "sku": item["id"] if kind not in ("returns", "tariff") else None,
+            "time": "1m ago",
+        })
+
+    return {
+        "inventory": inventory,
+        "tariffs": tariffs,
+        "returns": main.summarize_returns(return_items),
+        "alerts": alerts,
+    }
+
+
+def load_catalog(catalog, history_max_skus=DEFAULT_HISTORY_MAX_SKUS):
+    """Load a catalog into the app store with history for at most ``history_max_skus``."""
+    main.initialize_store(catalog)
+    main.store["history"] = main.generate_history(catalog["inventory"][:history_max_skus])
+    main.store["history_rollups"] = main.build_history_rollups(main.store["history"])
+    main.store["history_ready"] = True
+
+
+# Former name, kept for callers written against it; new code should use load_catalog.
+install_catalog = load_catalog
+
+
+def _timed(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _peak_kib(fn, setup=None):
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _case(name, fn, repeat, trace_memory, setup=None, **extra):
+    """Time ``fn`` ``repeat`` times; ``setup`` runs before each sample, outside the timing."""
+    samples = _timed(fn, repeat, setup)
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+        **extra,
+    }
+    if trace_memory:
+        result["peak_alloc_kib"] = _peak_kib(fn, setup)
+    return result
+
+
+def function_cases(catalog, history_max_skus):
+    inventory = catalog["inventory"]
+    history_inventory = inventory[:history_max_skus]
+    enriched = main.enrich_inventory_with_forecasts(inventory)
+    alerts = main.store["alerts"]
+
+    def root_causes():
+        for alert in main.store["alerts"]:
+            main.get_root_cause(alert)
+
+    return [
+        ("generate_history", lambda: main.generate_history(history_inventory), {"skus_measured": len(history_inventory)}),
+        ("simulate_tick", main.simulate_tick, {}),
+        ("enrich_inventory_with_forecasts", lambda: main.enrich_inventory_with_forecasts(inventory), {}),
+        ("build_action_recommendations", lambda: main.build_action_recommendations(
+            inventory=enriched,
+            returns_data=catalog["returns"],
+            alerts=alerts,
+            tariffs=catalog["tariffs"],
+        ), {}),
+        ("get_root_cause", root_causes, {"alerts": len(alerts)}),
+        ("simulate_tariffs_sweep", lambda: main.simulate_tariffs(
+            catalog["tariffs"],
+            main.TariffIndex(inventory),
+            rates=TARIFF_SWEEP,
+        ), {"rates": len(TARIFF_SWEEP)}),
+    ]
+
+
+def run_size(n_skus, repeat, seed, history_max_skus, trace_memory=True, progress=None):
+    started = time.perf_counter()
+    catalog = synthetic_catalog(n_skus, seed=seed)
+    generate_ms = (time.perf_counter() - started) * 1000
+    load_catalog(catalog, history_max_skus)
+
+    cases = []
+    for name, fn, extra in function_cases(catalog, history_max_skus):
+        cases.append(_case(name, fn, repeat, trace_memory, **extra))
+        if progress:
+            progress(n_skus, cases[-1])
+
+    # No lifespan: the store was installed above and the simulation loop stays off.
+    client = TestClient(main.app)
+    for route in GET_ROUTES:
+        def request(route=route):
+            resp = client.get(route)
+            resp.raise_for_status()
+            return resp
+        size = len(request().content)
+        # Without a version bump every sample after the first is a response-cache hit.
+        cases.append(_case(f"GET {route}", request, repeat, trace_memory, setup=main.touch_store, response_bytes=size))
+        cases.append(_case(f"GET {route} [cached]", request, repeat, trace_memory, response_bytes=size))
+        if progress:
+            progress(n_skus, cases[-2])
+            progress(n_skus, cases[-1])
+
+    return {
+        "skus": n_skus,
+        "catalog_generate_ms": round(generate_ms, 1),
+        "history_skus": min(n_skus, history_max_skus),
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "cases": cases,
+    }
+
+
+def run_benchmark(sizes, repeat=5, seed=42, history_max_skus=DEFAULT_HISTORY_MAX_SKUS, trace_memory=True, progress=None):
+    return {
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "results": [run_size(n, repeat, seed, history_max_skus, trace_memory, progress) for n in sizes],
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return cases whose median got slower than ``threshold`` (fractional) vs the baseline."""
+    base = {
+        (size["skus"], case["name"]): case
+        for size in baseline.get("results", [])
+        for case in size["cases"]
+    }
+    regressions = []
+    for size in current["results"]:
+        for case in size["cases"]:
+            prev = base.get((size["skus"], case["name"]))
+            if not prev or prev["median_ms"] <= 0:
+                continue
+            ratio = case["median_ms"] / prev["median_ms"]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "skus": size["skus"],
+                    "case": case["name"],
+                    "baseline_ms": prev["median_ms"],
+                    "current_ms": case["median_ms"],
+                    "ratio": round(ratio, 2),
+                })
+    return regressions
+
+
+def _print_case(n_skus, case):
+    peak = f"{case['peak_alloc_kib']:>10,.0f} KiB" if "peak_alloc_kib" in case else ""
+    print(f"  {n_skus:>9,} SKUs  {case['name']:<36} {case['median_ms']:>10.2f} ms  {peak}", flush=True)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated SKU counts (up to 1000000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--history-max-skus", type=int, default=DEFAULT_HISTORY_MAX_SKUS)
+    parser.add_argument("--no-trace-memory", action="store_true", help="skip per-case tracemalloc peaks")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_benchmark(sizes, args.repeat, args.seed, args.history_max_skus, not args.no_trace_memory, _print_case)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['skus']:,} SKUs {r['case']}: {r['baseline_ms']} -> {r['current_ms']} ms ({r['ratio']}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,162 @@
+"""Minimal OpenAI-compatible chat completions server for local load tests.
+
+Serves ``POST /v1/chat/completions`` with streaming (SSE) and non-streaming
+responses at a configurable first-token latency and token rate, so the
+backend can be driven without real API calls:
+
+    uv run python fake_openai.py --port 8011 --tokens-per-second 40 --latency-ms 400
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8011/v1 uv run uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Alpine Ridge Jacket (SKU-101) shows a 53-unit gap between Shopify and WMS. "
+    "Run sync_inventory:SKU-101 to align channels, then review the Vietnam tariff "
+    "exposure before placing the next purchase order."
+)
+PARSED_DOCUMENT = {
+    "po_number": "PO-7781",
+    "supplier": "Hanoi Outdoor Manufacturing",
+    "style": "Alpine Ridge Jacket",
+    "quantity": 2500,
+    "unit_cost": 31.2,
+    "ship_date": "2026-06-20",
+    "origin": "Vietnam",
+    "factory_load": "92%",
+    "anomalies": [
+        {"severity": "critical", "title": "Unit Cost Escalation", "detail": "Cost up $2.80/unit.",
+         "impact": "$7,000 added cost", "recommendation": "Negotiate or split the PO."},
+        {"severity": "warning", "title": "Capacity Risk", "detail": "Factory at 92% load.",
+         "impact": "Possible 2-week delay", "recommendation": "Confirm production slot."},
+    ],
+}
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    tokens_per_second: float = 50.0
+    max_tokens: int = 60
+    error_rate: float = 0.0
+
+
+def _completion_text(body):
+    system = next((m.get("content", "") for m in body.get("messages", []) if m.get("role") == "system"), "")
+    if "Parse supplier documents" in system:
+        return json.dumps(PARSED_DOCUMENT)
+    return ANSWER
+
+
+def _tokens(text, limit):
+    words = text.split(" ")
+    return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)][:limit]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        cfg = self.config
+        time.sleep(max(0.0, random.gauss(cfg.latency_ms, cfg.jitter_ms)) / 1000)
+        if random.random() < cfg.error_rate:
+            self._send_json(503, {"error": {"message": "fake overload", "type": "server_error"}})
+            return
+
+        text = _completion_text(body)
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model", "gpt-4o")}
+        if not body.get("stream"):
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        limit = min(cfg.max_tokens, int(body.get("max_tokens") or cfg.max_tokens))
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": t} for t in _tokens(text, limit)]
+        pause = 1 / cfg.tokens_per_second if cfg.tokens_per_second > 0 else 0
+        for i, delta in enumerate(deltas):
+            last = i == len(deltas) - 1
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if last else None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if i and pause:
+                time.sleep(pause)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream is normal under load; don't spam tracebacks.
+        pass
+
+
+def make_server(host="127.0.0.1", port=0, config=None):
+    handler = type("ConfiguredHandler", (FakeOpenAIHandler,), {"config": config or FakeConfig()})
+    return QuietServer((host, port), handler)
+
+
+def serve_in_thread(host="127.0.0.1", port=0, config=None):
+    """Start a fake server on a background thread; returns (server, base_url)."""
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--max-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeConfig(args.latency_ms, args.jitter_ms, args.tokens_per_second, args.max_tokens, args.error_rate)
+    server = make_server(args.host, args.port, config)
+    print(f"Fake OpenAI listening on http://{args.host}:{server.server_address[1]}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Local stand-in for Shopify/Amazon/WMS/POS inventory webhooks.
+
+Fires batched channel-count events at a running backend so the ingestion
+path can be exercised at drop-day rates without real connectors:
+
+    uv run python loadgen.py --rate 5000 --duration 10 --batch 250
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CHANNELS = ("shopify", "amazon", "wms", "pos")
+
+
+def _request(url, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=body, method="POST" if body else "GET")
+    req.add_header("Content-Type", "application/json")
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def fetch_counts(base_url):
+    inventory = _request(f"{base_url}/inventory").get("inventory", [])
+    return {item["id"]: dict(item["systems"]) for item in inventory}
+
+
+def make_batch(counts, seqs, size, rng, hot_fraction=0.2):
+    """Random walk a batch of counts; a hot subset of SKUs gets most of the traffic."""
+    skus = list(counts)
+    hot = skus[: max(1, int(len(skus) * hot_fraction))]
+    now = time.time()
+    events = []
+    for _ in range(size):
+        sku = rng.choice(hot) if rng.random() < 0.8 else rng.choice(skus)
+        channel = rng.choice(CHANNELS)
+        counts[sku][channel] = max(0, counts[sku][channel] + rng.choice((-3, -2, -1, -1, 0, 1, 2)))
+        events.append({
+            "sku": sku,
+            "channel": channel,
+            "count": counts[sku][channel],
+            "seq": next(seqs),
+            "ts": now,
+        })
+    return events
+
+
+def run(base_url, rate, duration, batch, workers, seed):
+    rng = random.Random(seed)
+    counts = fetch_counts(base_url)
+    if not counts:
+        raise SystemExit("No inventory returned by the backend")
+
+    seqs = itertools.count(int(time.time() * 1000))
+    lock = threading.Lock()
+    totals = {"events": 0, "batches": 0, "errors": 0, "latency_ms": []}
+    interval = batch / rate
+    url = f"{base_url}/api/ingest/channel-counts"
+
+    def send(events):
+        started = time.perf_counter()
+        try:
+            _request(url, {"events": events})
+            ok = True
+        except Exception:
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            totals["batches"] += 1
+            totals["events"] += len(events) if ok else 0
+            totals["errors"] += 0 if ok else 1
+            totals["latency_ms"].append(elapsed)
+
+    deadline = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while time.perf_counter() < deadline:
+            with lock:
+                events = make_batch(counts, seqs, batch, rng)
+            pool.submit(send, events)
+            next_send += interval
+            time.sleep(max(0.0, next_send - time.perf_counter()))
+
+    latencies = sorted(totals["latency_ms"]) or [0.0]
+    server = _request(f"{base_url}/api/ingest/stats")
+    return {
+        "target_rate": rate,
+        "sent_events": totals["events"],
+        "achieved_rate": round(totals["events"] / duration, 1),
+        "batches": totals["batches"],
+        "errors": totals["errors"],
+        "request_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "request_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "server": server,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=2000, help="events per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--batch", type=int, default=200, help="events per request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    report = run(args.url.rstrip("/"), args.rate, args.duration, args.batch, args.workers, args.seed)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Load-test harness: the backend under uvicorn plus a fake OpenAI server.
+
+Starts ``fake_openai`` in-process, launches ``uvicorn main:app`` as a
+subprocess pointed at it, then drives virtual users through a weighted
+traffic profile. Each ``--users`` stage runs for ``--duration`` seconds and
+reports throughput, latency percentiles and error rate per endpoint:
+
+    uv run python loadtest.py --profile mixed --users 10,50,200 --duration 20
+    uv run python loadtest.py --url http://localhost:8000 --profile dashboard --users 100
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+import fake_openai
+
+QUERIES = [
+    "Which SKUs are at risk of stockout?",
+    "What's our total tariff exposure from Vietnam?",
+    "Summarize the returns backlog.",
+]
+SUPPLIER_EMAIL = (
+    "Hi team, PO-7781 for 2,500 Alpine Ridge Jackets will ship 2026-06-20 from Vietnam. "
+    "Unit cost moves to $31.20 due to materials. Factory load is at 92%."
+)
+
+# endpoint name -> weight; names map to request builders below.
+PROFILES = {
+    "dashboard": {"inventory": 60, "health": 30, "history": 5, "recommendations": 5},
+    "ai": {"query": 70, "parse": 30},
+    "actions": {"action_burst": 70, "inventory": 30},
+    "mixed": {
+        "inventory": 40,
+        "health": 20,
+        "recommendations": 8,
+        "history": 2,
+        "query": 15,
+        "parse": 5,
+        "action_burst": 10,
+    },
+}
+ACTION_BURST = 5
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port, openai_base_url, catalog_path=None):
+    env = dict(os.environ, OPENAI_API_KEY="fake-key", OPENAI_BASE_URL=openai_base_url)
+    if catalog_path:
+        env["NEXUS_CATALOG_PATH"] = catalog_path
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/startup")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("Backend did not become ready within 30s")
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.ttfb = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, latency_s, ok, ttfb_s=None):
+        with self.lock:
+            self.latency[endpoint].append(latency_s)
+            if ttfb_s is not None:
+                self.ttfb[endpoint].append(ttfb_s)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def _pct(sorted_values, q):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] * 1000, 2)
+
+
+def summarize(recorder, elapsed_s):
+    endpoints = {}
+    for name, samples in sorted(recorder.latency.items()):
+        values = sorted(samples)
+        ttfb = sorted(recorder.ttfb.get(name, []))
+        endpoints[name] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed_s, 2),
+            "error_rate": round(recorder.errors[name] / len(values), 4),
+            "p50_ms": _pct(values, 0.50),
+            "p95_ms": _pct(values, 0.95),
+            "p99_ms": _pct(values, 0.99),
+            "max_ms": round(values[-1] * 1000, 2),
+            **({"ttfb_p50_ms": _pct(ttfb, 0.50), "ttfb_p99_ms": _pct(ttfb, 0.99)} if ttfb else {}),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(recorder.errors.values())
+    return {
+        "requests": total,
+        "rps": round(total / elapsed_s, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, host, port, profile, recorder, stop, skus, think_s, seed):
+        super().__init__(daemon=True)
+        self.conn_args = (host, port)
+        self.conn = None
+        self.endpoints = list(profile)
+        self.weights = [profile[e] for e in self.endpoints]
+        self.recorder = recorder
+        self.stop = stop
+        self.skus = skus
+        self.think_s = think_s
+        self.rng = random.Random(seed)
+
+    def _request(self, method, path, body=None):
+        """Returns (status, ttfb_s); the body is read fully so streaming time counts."""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(*self.conn_args, timeout=60)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            resp = self.conn.getresponse()
+            ttfb = time.perf_counter() - started
+            resp.read()
+            return resp.status, ttfb
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            return 0, None
+
+    def _timed(self, name, method, path, body=None, streaming=False):
+        started = time.perf_counter()
+        status, ttfb = self._request(method, path, body)
+        self.recorder.add(name, time.perf_counter() - started, 200 <= status < 300, ttfb if streaming else None)
+
+    def run(self):
+        while not self.stop.is_set():
+            endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+            if endpoint == "inventory":
+                self._timed(endpoint, "GET", "/inventory")
+            elif endpoint == "health":
+                self._timed(endpoint, "GET", "/api/health")
+            elif endpoint == "history":
+                self._timed(endpoint, "GET", "/api/history")
+            elif endpoint == "recommendations":
+                self._timed(endpoint, "GET", "/api/recommendations")
+            elif endpoint == "query":
+                self._timed(endpoint, "POST", "/api/query", {"query": self.rng.choice(QUERIES), "history": []}, streaming=True)
+            elif endpoint == "parse":
+                self._timed(endpoint, "POST", "/api/parse", {"text": SUPPLIER_EMAIL})
+            elif endpoint == "action_burst":
+                for _ in range(ACTION_BURST):
+                    sku = self.rng.choice(self.skus)
+                    action = self.rng.choice([f"sync_inventory:{sku}", f"pause_channel:amazon:{sku}", "release_returns"])
+                    self._timed("action", "POST", "/api/action", {"action": action})
+            if self.think_s:
+                time.sleep(self.rng.expovariate(1 / self.think_s))
+        if self.conn is not None:
+            self.conn.close()
+
+
+def run_stage(host, port, profile, users, duration, think_s, skus, seed):
+    recorder = Recorder()
+    stop = threading.Event()
+    workers = [VirtualUser(host, port, profile, recorder, stop, skus, think_s, seed + i) for i in range(users)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(duration)
+    stop.set()
+    for w in workers:
+        w.join(timeout=65)
+    return {"users": users, **summarize(recorder, time.perf_counter() - started)}
+
+
+def _fetch_skus(host, port):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", "/inventory")
+    inventory = json.loads(conn.getresponse().read()).get("inventory", [])
+    return [item["id"] for item in inventory] or ["SKU-101"]
+
+
+def _print_stage(stage):
+    print(f"\n{stage['users']} users: {stage['rps']} req/s, error rate {stage['error_rate']:.2%}")
+    for name, e in stage["endpoints"].items():
+        ttfb = f"  ttfb p50 {e['ttfb_p50_ms']} ms" if "ttfb_p50_ms" in e else ""
+        print(f"  {name:<16} {e['rps']:>8} rps  p50 {e['p50_ms']:>8} ms  p95 {e['p95_ms']:>8} ms  "
+              f"p99 {e['p99_ms']:>8} ms  err {e['error_rate']:.2%}{ttfb}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target an already running backend instead of starting one")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--users", default="10,50", help="comma-separated concurrent user counts, one stage each")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per stage")
+    parser.add_argument("--think-ms", type=float, default=200, help="mean think time between requests per user")
+    parser.add_argument("--catalog", help="NDJSON/CSV catalog for the spawned backend")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    backend = None
+    fake = None
+    if args.url:
+        parsed = urllib.parse.urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        config = fake_openai.FakeConfig(
+            latency_ms=args.llm_latency_ms,
+            tokens_per_second=args.llm_tokens_per_second,
+            error_rate=args.llm_error_rate,
+        )
+        fake, base_url = fake_openai.serve_in_thread(config=config)
+        host, port = "127.0.0.1", _free_port()
+        backend = start_backend(port, base_url, args.catalog)
+
+    try:
+        skus = _fetch_skus(host, port)
+        stages = []
+        for users in [int(u) for u in args.users.split(",") if u.strip()]:
+            stage = run_stage(host, port, PROFILES[args.profile], users, args.duration, args.think_ms / 1000, skus, args.seed)
+            _print_stage(stage)
+            stages.append(stage)
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait(timeout=10)
+        if fake is not None:
+            fake.shutdown()
+
+    report = {"profile": args.profile, "duration_s": args.duration, "think_ms": args.think_ms, "stages": stages}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
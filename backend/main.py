@@ -1,33 +1,185 @@
-from fastapi import FastAPI
+import time
+_PROCESS_T0 = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from openai import OpenAI
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 import asyncio
-import copy
+import ast
+from array import array
+import bisect
+import codecs
+import contextvars
+import atexit
+import csv
+import gzip
+import heapq
 from datetime import datetime, timezone
 import json
 import math
 import os
 import random
 import re
-import time
+import shutil
+import statistics
+import string
+import sys
+import tempfile
+import threading
+import urllib.parse
+import zlib
+from collections import Counter
+from collections.abc import Mapping, MutableMapping
+from functools import wraps
 load_dotenv()
 
 # ── In-memory data store ──────────────────────────────────────────────
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "shared", "nexus_truth.json")
-store = {
-    "data": {},
-    "alerts": [],
-    "last_update": 0,
-    "boot_time": 0,
-    "history": {},
-    "connections": {},
-    "demo_mode": False,
-    "supplier_risks": {},
+SIMULATION_INTERVAL_S = 5
+# Channel webhook events are coalesced per SKU/channel for this long before being applied.
+INGEST_WINDOW_MS = float(os.environ.get("NEXUS_INGEST_WINDOW_MS", "50"))
+# Optional NDJSON/CSV catalog(s) loaded at boot instead of the seed, separated by os.pathsep.
+CATALOG_PATH = os.environ.get("NEXUS_CATALOG_PATH", "")
+# How long per-tick store snapshots are kept for ?at= reads.
+SNAPSHOT_RETENTION_S = float(os.environ.get("NEXUS_SNAPSHOT_RETENTION_S", str(24 * 3600)))
+# Past either cap, the older half of the retained snapshots is thinned to every other one.
+SNAPSHOT_MAX_COUNT = int(os.environ.get("NEXUS_SNAPSHOT_MAX_COUNT", "288"))
+# Distinct record copies held across all retained snapshots.
+SNAPSHOT_MAX_RECORDS = int(os.environ.get("NEXUS_SNAPSHOT_MAX_RECORDS", "1000000"))
+# Multi-tenant hosting: every request/task sees one tenant's state through ``store``.
+DEFAULT_TENANT = os.environ.get("NEXUS_DEFAULT_TENANT", "default")
+COMPANY_NAME = os.environ.get("NEXUS_COMPANY_NAME", "Ridgeline Outdoor Co.")
+# Optional JSON list of extra tenants: [{"id", "company", "catalog", "tick_interval_s"}].
+TENANTS_PATH = os.environ.get("NEXUS_TENANTS_PATH", "")
+# Tenants with no requests for this long have their history spilled to SPILL_DIR.
+TENANT_IDLE_S = float(os.environ.get("NEXUS_TENANT_IDLE_S", "900"))
+# Optional JSON list of alert rules (or {"rules": [...]}) replacing DEFAULT_ALERT_RULES.
+ALERT_RULES_PATH = os.environ.get("NEXUS_ALERT_RULES_PATH", "")
+# Unset: a private per-process directory from tempfile.mkdtemp, removed at exit.
+SPILL_DIR = os.environ.get("NEXUS_SPILL_DIR", "")
+TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def new_store_state(tenant_id=DEFAULT_TENANT, company=COMPANY_NAME, tick_interval_s=SIMULATION_INTERVAL_S):
+    """Fresh per-tenant state; every feature keeps its data under these keys."""
+    return {
+        "tenant": tenant_id,
+        "company": company,
+        "tick_interval_s": tick_interval_s,
+        "data": {},
+        "alerts": [],
+        "alert_counter": 100,
+        "alert_rules": None,
+        "last_update": 0,
+        "last_access": time.time(),
+        "boot_time": 0,
+        "history": {},
+        "history_rollups": None,
+        "history_builds": 0,
+        "history_lock": threading.Lock(),
+        "history_spill": None,
+        "spike_detector": None,
+        "connections": {},
+        "demo_mode": False,
+        "supplier_risks": {},
+        "history_ready": False,
+        "sku_index": {},
+        "ingest": {},
+        "telemetry": {},
+        "version": 0,
+        "section_versions": {},
+        "fragments": {},
+        "response_cache": {},
+        "inflight": {},
+        "tariff_index": None,
+        "replenishment": {},
+        "returns_ledger": None,
+        "dirty_skus": set(),
+        "dirty_all": True,
+        "snapshots": None,
+        "scheduler": None,
+        "tasks": [],
+    }
+
+
+tenants = {DEFAULT_TENANT: new_store_state()}
+current_tenant = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+class StoreProxy(MutableMapping):
+    """The active tenant's state dict, resolved per access from ``current_tenant``.
+
+    Tasks and ``asyncio.to_thread`` workers inherit the context they were started
+    from, so background work stays bound to the tenant that scheduled it.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return tenants[current_tenant.get()][key]
+
+    def __setitem__(self, key, value):
+        tenants[current_tenant.get()][key] = value
+
+    def __delitem__(self, key):
+        del tenants[current_tenant.get()][key]
+
+    def __iter__(self):
+        return iter(tenants[current_tenant.get()])
+
+    def __len__(self):
+        return len(tenants[current_tenant.get()])
+
+    def get(self, key, default=None):
+        return tenants[current_tenant.get()].get(key, default)
+
+    def setdefault(self, key, default=None):
+        return tenants[current_tenant.get()].setdefault(key, default)
+
+    def __repr__(self):
+        return f"<store tenant={current_tenant.get()!r}>"
+
+
+store = StoreProxy()
+
+
+@contextmanager
+def tenant_context(tenant_id):
+    token = current_tenant.set(tenant_id)
+    try:
+        yield tenants[tenant_id]
+    finally:
+        current_tenant.reset(token)
+
+
+def next_alert_id(prefix):
+    store["alert_counter"] += 1
+    return f"{prefix}-{store['alert_counter']}"
+
+
+# Boot phases in milliseconds, filled in by lifespan and the history warmer.
+startup_report = {
+    "phases_ms": {},
+    "ready_ms": None,
+    "history_ms": None,
+    "history_source": None,
 }
-alert_counter = 100
+
+
+def touch_store(*sections, now=None):
+    """Record a mutation: bump the store version (and any named sections) and last_update."""
+    store["version"] += 1
+    versions = store["section_versions"]
+    for section in sections:
+        versions[section] = versions.get(section, 0) + 1
+    store["last_update"] = now or time.time()
+
+
+def mark_dirty(*skus):
+    """Note inventory records changed in place since the last snapshot."""
+    store["dirty_skus"].update(skus)
 
 
 def load_seed_data():
@@ -41,14 +193,640 @@ def get_client():
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         return None
+    # Deferred so processes that never call the LLM don't pay for the SDK import.
+    from openai import OpenAI
     return OpenAI(api_key=api_key)
 
 
+# ── Instrumentation ───────────────────────────────────────────────────
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_PROBE_S = 0.25
+PROFILER_MAX_STACKS = 10_000
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS_S):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.total += seconds
+        self.count += 1
+        for i, bound in enumerate(self.bounds):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, n in zip(self.bounds, self.counts):
+            running += n
+            yield bound, running
+
+
+# Process-wide; shared by every request and background task.
+metrics = {
+    "requests": {},
+    "spans": {},
+    "counters": Counter(),
+    "gauges": {},
+    "singleflight": {},
+}
+
+
+def observe_span(name, seconds):
+    hist = metrics["spans"].get(name)
+    if hist is None:
+        hist = metrics["spans"][name] = Histogram()
+    hist.observe(seconds)
+
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """Decorator form of ``span`` for hot-path functions."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TimingMiddleware:
+    """ASGI middleware recording per-route latency until the last body chunk is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", "unmatched"), str(status["code"]))
+            hist = metrics["requests"].get(key)
+            if hist is None:
+                hist = metrics["requests"][key] = Histogram()
+            hist.observe(time.perf_counter() - started)
+
+
+class TenantMiddleware:
+    """Binds each HTTP request to a tenant from ``X-Tenant-ID`` or ``?tenant=`` (default tenant otherwise)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tenant_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-tenant-id":
+                tenant_id = value.decode("latin-1").strip()
+                break
+        if tenant_id is None and scope.get("query_string"):
+            tenant_id = urllib.parse.parse_qs(scope["query_string"].decode("latin-1")).get("tenant", [None])[0]
+        tenant_id = tenant_id or DEFAULT_TENANT
+        state = tenants.get(tenant_id)
+        if state is None:
+            response = JSONResponse({"error": f"Unknown tenant: {tenant_id}"}, status_code=404)
+            await response(scope, receive, send)
+            return
+        state["last_access"] = time.time()
+        token = current_tenant.set(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+async def monitor_event_loop_lag():
+    """Measure how late the loop wakes a fixed-interval sleeper."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_PROBE_S)
+        lag = max(0.0, time.perf_counter() - started - LOOP_LAG_PROBE_S)
+        metrics["gauges"]["event_loop_lag_seconds"] = lag
+        observe_span("event_loop_lag", lag)
+
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack into collapsed (flame-graph) form."""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval_s = 0.005
+        self.target_ident = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, target_ident, interval_ms=5):
+        self.stop()
+        self.target_ident = target_ident
+        self.interval_s = max(0.001, interval_ms / 1000)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="nexus-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def reset(self):
+        self.stacks.clear()
+        self.samples = 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(parts))
+            if key in self.stacks or len(self.stacks) < PROFILER_MAX_STACKS:
+                self.stacks[key] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+def _prom_labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def _prom_histogram(lines, name, hist, **labels):
+    for bound, running in hist.cumulative():
+        lines.append(f"{name}_bucket{_prom_labels(**labels, le=bound)} {running}")
+    lines.append(f"{name}_bucket{_prom_labels(**labels, le='+Inf')} {hist.count}")
+    lines.append(f"{name}_sum{_prom_labels(**labels)} {hist.total:.6f}")
+    lines.append(f"{name}_count{_prom_labels(**labels)} {hist.count}")
+
+
+def render_prometheus():
+    lines = [
+        "# HELP nexus_http_request_duration_seconds Request latency by route.",
+        "# TYPE nexus_http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), hist in sorted(metrics["requests"].items()):
+        _prom_histogram(lines, "nexus_http_request_duration_seconds", hist, method=method, route=route, status=status)
+
+    lines += [
+        "# HELP nexus_span_duration_seconds Duration of named hot-path spans.",
+        "# TYPE nexus_span_duration_seconds histogram",
+    ]
+    for name, hist in sorted(metrics["spans"].items()):
+        _prom_histogram(lines, "nexus_span_duration_seconds", hist, span=name)
+
+    lines += [
+        "# HELP nexus_singleflight_requests_total Read requests that led or joined a coalesced computation.",
+        "# TYPE nexus_singleflight_requests_total counter",
+    ]
+    for route, counts in sorted(metrics["singleflight"].items()):
+        for role, value in sorted(counts.items()):
+            lines.append(f"nexus_singleflight_requests_total{_prom_labels(route=route, role=role)} {value}")
+
+    for name, value in sorted(metrics["counters"].items()):
+        lines += [f"# TYPE nexus_{name}_total counter", f"nexus_{name}_total {value}"]
+    gauges = dict(metrics["gauges"], profiler_enabled=int(profiler.enabled))
+    for name, value in sorted(gauges.items()):
+        lines += [f"# TYPE nexus_{name} gauge", f"nexus_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+# ── Response encoding ─────────────────────────────────────────────────
+# orjson/brotli are optional speedups (``uv sync --extra speed``); stdlib fallbacks otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def encode_json(obj):
+    """Serialize straight to UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+
+def section_fragment(section, value, version=None):
+    """Pre-encoded JSON for a section, reused until its section version changes.
+
+    Pass ``version`` when ``value`` is a snapshot copy rather than the live section.
+    """
+    version = store["section_versions"].get(section, 0) if version is None else version
+    cached = store["fragments"].get(section)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    encoded = encode_json(value)
+    if cached is None or cached[0] < version:
+        store["fragments"][section] = (version, encoded)
+    return encoded
+
+
+def json_object_bytes(parts):
+    """Assemble a JSON object from ``(key, encoded_value)`` pairs without re-encoding values."""
+    return b"{" + b",".join(encode_json(key) + b":" + value for key, value in parts) + b"}"
+
+
+def negotiate_encoding(accept_encoding, allow_br=True):
+    accepted = {}
+    for token in (accept_encoding or "").split(","):
+        name, _, params = token.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if allow_br and brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    with span("compress"):
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _gzip_open(prefix):
+    """Gzip ``prefix`` into a stream left open, so a per-request suffix can finish it cheaply."""
+    with span("compress"):
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(prefix) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor
+
+
+def _gzip_close(opened, suffix):
+    head, compressor = opened
+    compressor = compressor.copy()
+    return head + compressor.compress(suffix) + compressor.flush()
+
+
+def _trailer_suffix(body, trailer):
+    """Bytes that close the JSON object ``body`` (minus its ``}``) with the ``trailer`` fields."""
+    fields = b",".join(encode_json(name) + b":" + encode_json(value) for name, value in trailer)
+    return (fields if body == b"{}" else b"," + fields) + b"}"
+
+
+def single_flight(route, key, fn):
+    """Run ``fn`` in a worker thread once per ``(route, key)``; concurrent callers share the result.
+
+    The loop keeps mutating the store while ``fn`` runs, so ``fn`` must read
+    only immutable inputs (a Snapshot) or hold the lock guarding what it reads.
+    """
+    inflight = store["inflight"]
+    flight_key = (route, key)
+    counts = metrics["singleflight"].setdefault(route, {"leader": 0, "coalesced": 0})
+    task = inflight.get(flight_key)
+    if task is None:
+        counts["leader"] += 1
+        task = asyncio.ensure_future(asyncio.to_thread(fn))
+        inflight[flight_key] = task
+
+        def _done(finished):
+            if inflight.get(flight_key) is finished:
+                del inflight[flight_key]
+        task.add_done_callback(_done)
+    else:
+        counts["coalesced"] += 1
+    # Shielded so a disconnecting caller doesn't cancel the work others are waiting on.
+    return asyncio.shield(task)
+
+
+def _build_cache_entry(key, build):
+    with span("serialize"):
+        return {"key": key, "body": build(), "encoded": {}}
+
+
+async def cached_response(request, route, key, build, trailer=None):
+    """Serve ``build()`` bytes for ``route``, cached with their compressed forms until ``key`` changes.
+
+    Misses are computed off the event loop and coalesced, so a burst of
+    requests for the same version triggers a single build; ``build`` must
+    only read immutable data such as a Snapshot. One entry per route is
+    kept, so memory is bounded by the latest payloads. ``trailer`` fields
+    change on every request (uptime, timestamps), so they stay out of the
+    cached body and are appended to the JSON object at send time; such
+    routes are gzipped from a cached open stream rather than brotli'd.
+    """
+    cache = store["response_cache"]
+    entry = cache.get(route)
+    if entry is None or entry["key"] != key:
+        metrics["counters"]["response_cache_misses"] += 1
+        entry = await single_flight(route, key, lambda: _build_cache_entry(key, build))
+        current = cache.get(route)
+        if current is None or current["key"] != key:
+            cache[route] = entry
+    else:
+        metrics["counters"]["response_cache_hits"] += 1
+
+    headers = {"Vary": "Accept-Encoding"}
+    body = entry["body"]
+    suffix = _trailer_suffix(body, trailer) if trailer else None
+    encoding = None
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), allow_br=suffix is None)
+    if encoding:
+        compressed = entry["encoded"].get(encoding)
+        if compressed is None:
+            compressed = await single_flight(
+                f"{route}:{encoding}", key,
+                lambda: _compress(body, encoding) if suffix is None else _gzip_open(body[:-1]),
+            )
+            entry["encoded"][encoding] = compressed
+        body = compressed if suffix is None else _gzip_close(compressed, suffix)
+        headers["Content-Encoding"] = encoding
+    elif suffix is not None:
+        body = body[:-1] + suffix
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# ── Inventory records (fixed layout, zero-copy views) ──────────────────
+CHANNELS = ("shopify", "amazon", "wms", "pos")
+# Key order of an inventory item in every JSON response.
+RECORD_FIELDS = (
+    "id", "name", "category", "systems", "true_atp", "committed", "available", "discrepancy",
+    "risk_value", "country_of_origin", "lead_time_days", "reorder_point", "unit_cost",
+)
+_RECORD_SCALARS = frozenset(RECORD_FIELDS) - {"systems"}
+_CHANNEL_SET = frozenset(CHANNELS)
+_MISSING = object()
+
+
+class ChannelCountsView(Mapping):
+    """Read-only ``systems`` mapping over a record's channel slots."""
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getitem__(self, channel):
+        if channel in _CHANNEL_SET:
+            return getattr(self._record, channel)
+        raise KeyError(channel)
+
+    def get(self, channel, default=None):
+        return getattr(self._record, channel, default) if channel in _CHANNEL_SET else default
+
+    def __contains__(self, channel):
+        return channel in _CHANNEL_SET
+
+    def __iter__(self):
+        return iter(CHANNELS)
+
+    def __len__(self):
+        return len(CHANNELS)
+
+    def to_dict(self):
+        r = self._record
+        return {"shopify": r.shopify, "amazon": r.amazon, "wms": r.wms, "pos": r.pos}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class ChannelCounts(ChannelCountsView, MutableMapping):
+    """Writable ``systems`` mapping; ``item["systems"]["wms"] += 1`` writes the record's slot."""
+
+    __slots__ = ()
+
+    def __setitem__(self, channel, count):
+        if channel not in _CHANNEL_SET:
+            raise KeyError(channel)
+        setattr(self._record, channel, count)
+
+    def __delitem__(self, channel):
+        raise TypeError("channel counts have a fixed layout")
+
+
+class InventoryRecord(MutableMapping):
+    """One SKU in slots instead of two dicts, with the item dict's keys, order and JSON.
+
+    Channel counts are stored inline; ``record["systems"]`` is a live view
+    over them. Keys outside the fixed layout go to a small overflow dict so
+    catalog extras round-trip unchanged.
+    """
+
+    __slots__ = (
+        "id", "name", "category", "shopify", "amazon", "wms", "pos", "true_atp", "committed", "available",
+        "discrepancy", "risk_value", "country_of_origin", "lead_time_days", "reorder_point", "unit_cost", "extra",
+    )
+
+    def __init__(self, fields=None, **kwargs):
+        self.extra = None
+        for source in (fields or {}, kwargs):
+            for key, value in source.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, item):
+        return item if isinstance(item, cls) else cls(item)
+
+    def __getitem__(self, key):
+        if key in _RECORD_SCALARS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if key == "systems" and hasattr(self, "wms"):
+            return ChannelCounts(self)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _RECORD_SCALARS:
+            return getattr(self, key, default)
+        if key == "systems":
+            return ChannelCounts(self) if hasattr(self, "wms") else default
+        return self.extra.get(key, default) if self.extra else default
+
+    def __setitem__(self, key, value):
+        if key in _RECORD_SCALARS:
+            setattr(self, key, value)
+        elif key == "systems":
+            counts = {channel: value[channel] for channel in value}
+            unknown = counts.keys() - _CHANNEL_SET
+            if unknown:
+                raise ValueError(f"unknown channel(s): {', '.join(sorted(unknown))}")
+            for channel in CHANNELS:
+                setattr(self, channel, counts.get(channel, 0))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _RECORD_SCALARS and hasattr(self, key):
+            delattr(self, key)
+        elif key == "systems" and hasattr(self, "wms"):
+            for channel in CHANNELS:
+                delattr(self, channel)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _RECORD_SCALARS:
+            return hasattr(self, key)
+        if key == "systems":
+            return hasattr(self, "wms")
+        return bool(self.extra) and key in self.extra
+
+    def __iter__(self):
+        for key in RECORD_FIELDS:
+            if key in self:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        clone = InventoryRecord.__new__(InventoryRecord)
+        for name in InventoryRecord.__slots__:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                setattr(clone, name, value)
+        clone.extra = dict(self.extra) if self.extra else None
+        return clone
+
+    def to_dict(self):
+        out = {}
+        for key in RECORD_FIELDS:
+            if key == "systems":
+                if hasattr(self, "wms"):
+                    out["systems"] = {"shopify": self.shopify, "amazon": self.amazon, "wms": self.wms, "pos": self.pos}
+                continue
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                out[key] = value
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __repr__(self):
+        return f"InventoryRecord({self.to_dict()!r})"
+
+
+class RecordView(Mapping):
+    """Read-only view of an item plus computed fields, sharing the item instead of copying it."""
+
+    __slots__ = ("_item", "_added")
+
+    def __init__(self, item, **added):
+        self._item = item
+        self._added = added
+
+    def __getitem__(self, key):
+        if key in self._added:
+            return self._added[key]
+        if key == "systems" and isinstance(self._item, InventoryRecord):
+            return ChannelCountsView(self._item)
+        return self._item[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        yield from (key for key in self._item if key not in self._added)
+        yield from self._added
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        item = self._item
+        out = item.to_dict() if isinstance(item, InventoryRecord) else dict(item)
+        out.update(self._added)
+        return out
+
+
+def json_default(obj):
+    """Serialize records and views (``default=`` hook for orjson and json)."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 # ── History generation (7-day random walk per SKU) ─────────────────────
+@timed("history_build")
+def day_velocity(day_pts):
+    """Orders per day approximation from one day's hourly points."""
+    vel = max(0, day_pts[-1]["shopify"] - day_pts[0]["shopify"]) + \
+          max(0, day_pts[-1]["amazon"] - day_pts[0]["amazon"])
+    return max(1, round(vel))
+
+
 def generate_history(inventory):
     """Generate 7 days of simulated hourly data for each SKU."""
     history = {}
-    hours = 7 * 24  # 168 data points
+    hours = HISTORY_HOURS
+    end = int(time.time())  # one clock read, so every SKU shares the same hourly grid
     for item in inventory:
         sku = item["id"]
         base_shopify = item["systems"]["shopify"]
@@ -84,7 +862,7 @@ def generate_history(inventory):
             a = max(5, a)
             w = max(10, w)
 
-            ts = int(time.time()) - (hours - h) * 3600
+            ts = end - (hours - h) * 3600
             points.append({
                 "ts": ts,
                 "day": day,
@@ -100,9 +878,7 @@ def generate_history(inventory):
         for d in range(7):
             day_pts = [p for p in points if p["day"] == d]
             if day_pts:
-                vel = max(0, day_pts[-1]["shopify"] - day_pts[0]["shopify"]) + \
-                      max(0, day_pts[-1]["amazon"] - day_pts[0]["amazon"])
-                daily_velocity.append({"day": d, "velocity": max(1, round(vel))})
+                daily_velocity.append({"day": d, "velocity": day_velocity(day_pts)})
 
         history[sku] = {
             "hourly": points,
@@ -112,18 +888,875 @@ def generate_history(inventory):
     return history
 
 
-def generate_connections():
-    """Simulated connection status for each system."""
-    now = time.time()
+def ensure_history(source="on_demand"):
+    """Build the 7-day history on first use (or reload it if spilled); safe from any thread."""
+    if store.get("history_ready"):
+        return store["history"]
+    with store["history_lock"]:
+        while not store.get("history_ready"):
+            started = time.perf_counter()
+            generation = store["section_versions"].get("history", 0)
+            spill = store.get("history_spill")
+            if spill and os.path.exists(spill):
+                with gzip.open(spill, "rb") as f:
+                    history = json.loads(f.read())
+                source = "spill"
+            else:
+                history = generate_history(store["data"].get("inventory", []))
+            rollups = build_history_rollups(history)
+            if store["section_versions"].get("history", 0) != generation:
+                continue  # a catalog import replaced the inventory mid-build
+            store["history"] = history
+            store["history_rollups"] = rollups
+            store["history_ready"] = True
+            store["history_builds"] += 1
+            store["section_versions"]["history"] = store["section_versions"].get("history", 0) + 1
+            if store["tenant"] == DEFAULT_TENANT and source != "spill":
+                startup_report["history_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                startup_report["history_source"] = source
+    return store["history"]
+
+
+_private_spill_dir = None
+
+
+def spill_dir():
+    """The spill directory, owner-only (0700): ``NEXUS_SPILL_DIR`` or a private temp directory."""
+    global _private_spill_dir
+    if SPILL_DIR:
+        os.makedirs(SPILL_DIR, mode=0o700, exist_ok=True)
+        os.chmod(SPILL_DIR, 0o700)
+        return SPILL_DIR
+    if _private_spill_dir is None:
+        _private_spill_dir = tempfile.mkdtemp(prefix="nexuslink-spill-")
+        atexit.register(shutil.rmtree, _private_spill_dir, ignore_errors=True)
+    return _private_spill_dir
+
+
+def spill_history(state):
+    """Write a tenant's history to disk and drop it, and its encoded copies, from memory.
+
+    Each spill gets a fresh, exclusively created file, so a pre-planted path
+    or another process hosting the same tenant id cannot collide with it.
+    """
+    with state["history_lock"]:
+        if not state["history_ready"]:
+            return False
+        fd, path = tempfile.mkstemp(prefix=f"{state['tenant']}-", suffix=".history.json.gz", dir=spill_dir())
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wb", compresslevel=1) as f:
+            f.write(encode_json(state["history"]))
+        previous = state["history_spill"]
+        if previous and previous != path and os.path.exists(previous):
+            os.remove(previous)
+        state["history"] = {}
+        state["history_rollups"] = None
+        state["history_ready"] = False
+        state["history_spill"] = path
+        state["fragments"].pop("history", None)
+        state["response_cache"].pop("/api/history", None)
+    return True
+
+
+async def warm_history():
+    """Build history off the event loop once the server is accepting requests."""
+    await asyncio.sleep(0)
+    await asyncio.to_thread(ensure_history, "background")
+
+
+# ── History rollups (demand analytics) ────────────────────────────────
+# Hourly demand is the units drawn down on each sales channel between two
+# consecutive history points. Rollups keep sums, counts and quantile sketches
+# of it per SKU and per category, by UTC hour of day and day of week, and
+# follow the retained history exactly: appending an hour adds a sample and the
+# hour that falls out of the window is taken back out.
+HISTORY_HOURS = 7 * 24
+DEMAND_CHANNELS = ("shopify", "amazon")
+ROLLUP_CHANNELS = DEMAND_CHANNELS + ("all",)
+ROLLUP_GROUPS = {"hour": 24, "dow": 7}
+ANALYTICS_GROUPS = ("hour", "dow", "category")
+ANALYTICS_QUANTILES = (0.1, 0.5, 0.9)
+ANALYTICS_MAX_SKUS = 5_000
+
+
+def point_demand(prev, point):
+    """Units drawn down per sales channel between two consecutive hourly points."""
+    shopify = max(0, prev["shopify"] - point["shopify"])
+    amazon = max(0, prev["amazon"] - point["amazon"])
+    return (("shopify", shopify), ("amazon", amazon), ("all", shopify + amazon))
+
+
+def hour_of_day(ts):
+    return int(ts) // 3600 % 24
+
+
+def weekday(ts):
+    """Monday=0 weekday of a Unix timestamp in UTC (the epoch fell on a Thursday)."""
+    return (int(ts) // 86400 + 3) % 7
+
+
+def contiguous_buckets(first_ts, n):
+    """Hour-of-day and weekday lists for ``n`` consecutive hours starting at ``first_ts``."""
+    hour, dow = hour_of_day(first_ts), weekday(first_ts)
+    hours = (_HOUR_CYCLE * (n // 24 + 2))[hour:hour + n]
+    dows = [dow] * (24 - hour)
+    while len(dows) < n:
+        dow = (dow + 1) % 7
+        dows += [dow] * 24
+    return hours, dows[:n]
+
+
+_HOUR_CYCLE = list(range(24))
+
+
+class DemandRollup:
+    """Hourly demand sums and counts by hour of day and day of week, plus a quantile sketch.
+
+    With ``bucket_sketches`` every bucket also keeps its own sketch, so
+    percentile bands can be drawn per hour; only category rollups pay for that.
+    """
+
+    __slots__ = ("sums", "counts", "sketch", "bucket_sketches")
+
+    def __init__(self, bucket_sketches=False):
+        self.sums = {group: [0] * n for group, n in ROLLUP_GROUPS.items()}
+        self.counts = {group: [0] * n for group, n in ROLLUP_GROUPS.items()}
+        self.sketch = QuantileSketch()
+        self.bucket_sketches = (
+            {group: [QuantileSketch() for _ in range(n)] for group, n in ROLLUP_GROUPS.items()}
+            if bucket_sketches else None
+        )
+
+    def add(self, hour, dow, value, weight=1):
+        """Add (or, with a negative weight, take back) one hourly demand sample."""
+        for group, bucket in (("hour", hour), ("dow", dow)):
+            self.sums[group][bucket] += value * weight
+            self.counts[group][bucket] += weight
+            if self.bucket_sketches is not None:
+                _sketch_add(self.bucket_sketches[group][bucket], value, weight)
+        _sketch_add(self.sketch, value, weight)
+
+    def add_series(self, hours, dows, values):
+        """Bulk add one SKU's samples, oldest first, one per consecutive hour.
+
+        Because the samples are contiguous, each hour-of-day bucket is a
+        stride-24 slice and each weekday a run ending at midnight, so sums are
+        taken a slice at a time rather than a sample at a time.
+        """
+        n = len(values)
+        sums, counts = self.sums["hour"], self.counts["hour"]
+        for k in range(min(24, n)):
+            chunk = values[k::24]
+            sums[hours[k]] += sum(chunk)
+            counts[hours[k]] += len(chunk)
+        sums, counts = self.sums["dow"], self.counts["dow"]
+        start = 0
+        while start < n:
+            end = start + 24 - hours[start]
+            chunk = values[start:end]
+            sums[dows[start]] += sum(chunk)
+            counts[dows[start]] += len(chunk)
+            start = end
+        for value, weight in Counter(values).items():
+            self.sketch.add(value, weight)
+
+    def add_counts(self, by_group):
+        """Bulk add from ``{group: Counter((bucket, value) -> weight)}`` describing the same samples."""
+        values = Counter()
+        for group, samples in by_group.items():
+            sums, counts = self.sums[group], self.counts[group]
+            sketches = self.bucket_sketches[group] if self.bucket_sketches is not None else None
+            for (bucket, value), weight in samples.items():
+                sums[bucket] += value * weight
+                counts[bucket] += weight
+                if sketches is not None:
+                    sketches[bucket].add(value, weight)
+                if group == "hour":
+                    values[value] += weight
+        for value, weight in values.items():
+            self.sketch.add(value, weight)
+
+
+def _sketch_add(sketch, value, weight):
+    if weight > 0:
+        sketch.add(value, weight)
+    else:
+        sketch.remove(value, -weight)
+
+
+class HistoryRollups:
+    """Per-SKU and per-category demand rollups over the retained hourly history."""
+
+    def __init__(self):
+        self.skus = {}
+        self.categories = {}
+        self.sku_category = {}
+        self.points = 0
+        self.revision = 0
+
+    @classmethod
+    def build(cls, history, categories):
+        """Roll up every SKU's series; ``categories`` maps SKU -> category."""
+        rollups = cls()
+        pending = {}
+        for sku, series in history.items():
+            hourly = series.get("hourly") or []
+            category = categories.get(sku, "Uncategorized")
+            sku_rollup = rollups._rollup(sku, category)
+            if len(hourly) < 2:
+                continue
+            n = len(hourly) - 1
+            hours, dows = contiguous_buckets(hourly[1]["ts"], n)
+            shopify = [p["shopify"] for p in hourly]
+            amazon = [p["amazon"] for p in hourly]
+            demand = {
+                "shopify": [max(0, a - b) for a, b in zip(shopify, shopify[1:])],
+                "amazon": [max(0, a - b) for a, b in zip(amazon, amazon[1:])],
+            }
+            demand["all"] = [s + a for s, a in zip(demand["shopify"], demand["amazon"])]
+            category_samples = pending.setdefault(
+                category, {channel: {"hour": Counter(), "dow": Counter()} for channel in ROLLUP_CHANNELS}
+            )
+            for channel, values in demand.items():
+                sku_rollup[channel].add_series(hours, dows, values)
+                category_samples[channel]["hour"].update(zip(hours, values))
+                category_samples[channel]["dow"].update(zip(dows, values))
+            rollups.points += n
+        for category, channels in pending.items():
+            for channel, by_group in channels.items():
+                rollups.categories[category][channel].add_counts(by_group)
+        return rollups
+
+    def _rollup(self, sku, category):
+        rollup = self.skus.get(sku)
+        if rollup is None:
+            rollup = self.skus[sku] = {channel: DemandRollup() for channel in ROLLUP_CHANNELS}
+            self.sku_category[sku] = category
+            if category not in self.categories:
+                self.categories[category] = {channel: DemandRollup(bucket_sketches=True) for channel in ROLLUP_CHANNELS}
+        return rollup
+
+    def add(self, sku, category, prev, point, weight=1):
+        """Account for the demand between two consecutive points; ``weight=-1`` takes it back."""
+        sku_rollup = self._rollup(sku, category)
+        category_rollup = self.categories[self.sku_category[sku]]
+        hour, dow = hour_of_day(point["ts"]), weekday(point["ts"])
+        for channel, value in point_demand(prev, point):
+            sku_rollup[channel].add(hour, dow, value, weight)
+            category_rollup[channel].add(hour, dow, value, weight)
+        self.points += weight
+        self.revision += 1
+
+    def query(self, channel="all", group="hour", skus=None, category=None, quantiles=ANALYTICS_QUANTILES):
+        """Demand profile for a channel: per bucket of ``group`` plus overall, optionally scoped."""
+        if skus is not None:
+            matched = [sku for sku in skus if sku in self.skus]
+            scoped = {}
+            for sku in matched:
+                scoped.setdefault(self.sku_category[sku], []).append(self.skus[sku][channel])
+            scope = {"skus": len(skus), "matched": len(matched)}
+        else:
+            names = [category] if category is not None else sorted(self.categories)
+            scoped = {name: [self.categories[name][channel]] for name in names if name in self.categories}
+            scope = {"category": category} if category is not None else {"categories": len(scoped)}
+
+        rollups = [r for members in scoped.values() for r in members]
+        if group == "category":
+            buckets = [{"bucket": name, **_demand_summary(members, quantiles)} for name, members in sorted(scoped.items())]
+        else:
+            buckets = _demand_profile(rollups, group, quantiles)
+        return {
+            "channel": channel,
+            "group": group,
+            "scope": scope,
+            "buckets": buckets,
+            "overall": _demand_summary(rollups, quantiles),
+        }
+
+
+def _quantile_fields(sketch, quantiles):
+    return {f"p{q * 100:g}": _round_or_none(sketch.quantile(q)) for q in quantiles}
+
+
+def _round_or_none(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+def _demand_summary(rollups, quantiles):
+    points = sum(sum(r.counts["hour"]) for r in rollups)
+    total = sum(sum(r.sums["hour"]) for r in rollups)
+    merged = QuantileSketch()
+    for r in rollups:
+        merged.merge(r.sketch)
     return {
-        "shopify": {"status": "connected", "last_sync": now - random.randint(10, 120), "latency_ms": random.randint(45, 180)},
-        "amazon": {"status": "connected", "last_sync": now - random.randint(30, 300), "latency_ms": random.randint(80, 250)},
-        "wms": {"status": "connected", "last_sync": now - random.randint(5, 60), "latency_ms": random.randint(20, 80)},
-        "shipbob": {"status": "connected", "last_sync": now - random.randint(60, 600), "latency_ms": random.randint(100, 350)},
-        "pos": {"status": "connected", "last_sync": now - random.randint(15, 180), "latency_ms": random.randint(30, 120)},
+        "points": points,
+        "total": total,
+        "mean": round(total / points, 3) if points else None,
+        **_quantile_fields(merged, quantiles),
     }
 
 
+def _demand_profile(rollups, group, quantiles):
+    # Percentile bands per bucket come from per-bucket sketches, which only
+    # category rollups keep; SKU-scoped profiles report means only.
+    banded = bool(rollups) and all(r.bucket_sketches is not None for r in rollups)
+    buckets = []
+    for bucket in range(ROLLUP_GROUPS[group]):
+        points = sum(r.counts[group][bucket] for r in rollups)
+        total = sum(r.sums[group][bucket] for r in rollups)
+        entry = {"bucket": bucket, "points": points, "total": total, "mean": round(total / points, 3) if points else None}
+        if banded:
+            merged = QuantileSketch()
+            for r in rollups:
+                merged.merge(r.bucket_sketches[group][bucket])
+            entry.update(_quantile_fields(merged, quantiles))
+        buckets.append(entry)
+    return buckets
+
+
+def build_history_rollups(history):
+    categories = {item["id"]: item.get("category", "Uncategorized") for item in store["data"].get("inventory", [])}
+    return HistoryRollups.build(history, categories)
+
+
+def ensure_history_rollups():
+    """History rollups, building the history and/or the rollups first if needed."""
+    history = ensure_history()
+    with store["history_lock"]:
+        if store["history_rollups"] is None:
+            store["history_rollups"] = build_history_rollups(history)
+        return store["history_rollups"]
+
+
+def append_history_hour(now=None):
+    """Roll every SKU's history forward to the current hour from live counts.
+
+    Each new point feeds the rollups, and once a series holds more than
+    ``HISTORY_HOURS`` points the oldest is dropped and taken back out of them.
+    The hour that completes a day adds that day's ``daily_velocity`` entry and
+    drops the oldest one. ``day`` stays the 0-6 index ``generate_history``
+    uses, wrapping as the window rolls. When several hours were missed, the
+    live counts are only known for the last one: the hours before it are
+    interpolated from the previous point and flagged ``gap_fill``.
+    Returns the number of points appended.
+    """
+    if not store.get("history_ready"):
+        return 0
+    now = now or time.time()
+    appended = 0
+    with store["history_lock"]:
+        history = store["history"]
+        rollups = store["history_rollups"]
+        for item in store["data"].get("inventory", []):
+            series = history.get(item["id"])
+            if not series or not series.get("hourly"):
+                continue
+            hourly = series["hourly"]
+            counts = item["systems"]
+            start = hourly[-1]
+            steps = min(int((now - start["ts"]) // 3600), HISTORY_HOURS)
+            added = 0
+            while added < steps:
+                last = hourly[-1]
+                hour = (last["hour"] + 1) % 24
+                added += 1
+                frac = added / steps
+                shopify, amazon, wms = (
+                    round(start[channel] + (counts[channel] - start[channel]) * frac)
+                    for channel in ("shopify", "amazon", "wms")
+                )
+                point = {
+                    "ts": last["ts"] + 3600,
+                    "day": (last["day"] + (1 if hour == 0 else 0)) % 7,
+                    "hour": hour,
+                    "shopify": shopify,
+                    "amazon": amazon,
+                    "wms": wms,
+                    "total": shopify + amazon + wms,
+                }
+                if added < steps:
+                    point["gap_fill"] = True
+                hourly.append(point)
+                if rollups is not None:
+                    rollups.add(item["id"], item.get("category", "Uncategorized"), last, point)
+                if len(hourly) > HISTORY_HOURS:
+                    dropped = hourly.pop(0)
+                    if rollups is not None:
+                        rollups.add(item["id"], None, dropped, hourly[0], weight=-1)
+                if hour == 23:
+                    # Swapped rather than edited in place: planner builds read it from worker threads.
+                    closed = {"day": point["day"], "velocity": day_velocity(hourly[-24:])}
+                    series["daily_velocity"] = (series.get("daily_velocity", []) + [closed])[-(HISTORY_HOURS // 24):]
+            if added:
+                series["sparkline"] = [p["total"] for p in hourly[::12]]
+                appended += added
+        if appended:
+            touch_store("history")
+    return appended
+
+
+# ── Demand spike detection ────────────────────────────────────────────
+# Every refresh of a SKU observes its sales velocity per channel: units
+# drawn down per hour since the previous observation. Velocity is divided
+# by the category's hour-of-day factor from the history rollups, and an
+# EWMA level and variance of the result are kept per SKU and channel in
+# flat arrays, so an observation costs O(1) whatever the catalog size.
+SPIKE_TAU_S = 900.0
+# Observations closer together than this are merged into the next one.
+SPIKE_MIN_INTERVAL_S = 4.0
+SPIKE_WARMUP = 5
+# Residuals beyond this many standard deviations are clipped before they
+# update the level, so a surge does not become the new normal at once.
+SPIKE_CLIP_Z = 3.0
+# Floor on expected units/h, so a near-idle SKU's multiplier stays finite.
+SPIKE_MIN_RATE = 1.0
+# Pseudo-samples shrinking sparse hour-of-day factors toward 1.
+SPIKE_SEASONAL_PRIOR = 24
+SPIKE_FIELDS = ("spike_multiplier", "spike_z", "spike_units", "spike_velocity", "spike_baseline")
+_NO_READING = 255
+
+
+def seasonal_factors(rollups):
+    """Hour-of-day demand factors (mean about 1) per ``(category, channel)`` from the history rollups."""
+    factors = {}
+    if rollups is None:
+        return factors
+    for category, channels in rollups.categories.items():
+        for channel in DEMAND_CHANNELS:
+            rollup = channels[channel]
+            sums, counts = rollup.sums["hour"], rollup.counts["hour"]
+            n = sum(counts)
+            if n <= 0 or sum(sums) <= 0:
+                continue
+            mean = sum(sums) / n
+            factors[category, channel] = [
+                min(4.0, max(0.25, (s + SPIKE_SEASONAL_PRIOR * mean) / (c + SPIKE_SEASONAL_PRIOR) / mean))
+                for s, c in zip(sums, counts)
+            ]
+    return factors
+
+
+class SpikeDetector:
+    """Streaming per-SKU, per-channel velocity statistics in ``array`` columns indexed by SKU slot.
+
+    Each observation scores the channels against their seasonal baseline
+    before updating it; the channel with the highest multiplier becomes the
+    SKU's reading, which alert rules see as the ``spike_*`` fields.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.skus = []
+        self.categories = []
+        self.last_ts = array("d")
+        self.counts = [array("d") for _ in DEMAND_CHANNELS]
+        self.levels = [array("d") for _ in DEMAND_CHANNELS]
+        self.variances = [array("d") for _ in DEMAND_CHANNELS]
+        self.observed = [array("l") for _ in DEMAND_CHANNELS]
+        # Latest reading per slot, one column per SPIKE_FIELDS entry plus the channel.
+        self.readings = [array("d") for _ in SPIKE_FIELDS]
+        self.reading_channel = bytearray()
+        self.factors = {}
+        self._rollups = None
+        self._revision = None
+        self.stats = {"observations": 0, "merged": 0, "scored": 0}
+
+    def _add(self, item, now):
+        slot = self.slots[item.id] = len(self.skus)
+        self.skus.append(item.id)
+        self.categories.append(item.get("category") or "Uncategorized")
+        self.last_ts.append(now)
+        for ci, channel in enumerate(DEMAND_CHANNELS):
+            self.counts[ci].append(getattr(item, channel))
+            self.levels[ci].append(0.0)
+            self.variances[ci].append(0.0)
+            self.observed[ci].append(0)
+        for column in self.readings:
+            column.append(0.0)
+        self.reading_channel.append(_NO_READING)
+        return slot
+
+    def _refresh_factors(self):
+        rollups = store.get("history_rollups")
+        revision = rollups.revision if rollups is not None else None
+        if rollups is not self._rollups or revision != self._revision:
+            self.factors = seasonal_factors(rollups)
+            self._rollups, self._revision = rollups, revision
+
+    def observe(self, items, now=None):
+        """Observe current channel counts for ``items``; returns how many SKUs were scored."""
+        now = now or time.time()
+        self._refresh_factors()
+        hour = hour_of_day(now)
+        slots, last_ts, factors = self.slots, self.last_ts, self.factors
+        mult_col, z_col, units_col, velocity_col, baseline_col = self.readings
+        columns = list(enumerate(zip(DEMAND_CHANNELS, self.counts, self.levels, self.variances, self.observed)))
+        stats = self.stats
+        scored = 0
+        for item in items:
+            slot = slots.get(item.id)
+            if slot is None:
+                self._add(item, now)
+                continue
+            dt = now - last_ts[slot]
+            if dt < SPIKE_MIN_INTERVAL_S:
+                stats["merged"] += 1
+                continue
+            last_ts[slot] = now
+            stats["observations"] += 1
+            alpha = 1.0 - math.exp(-dt / SPIKE_TAU_S)
+            one_unit = 3600.0 / dt  # velocity of a single unit in this window: the noise floor
+            category = self.categories[slot]
+            best = None
+            for ci, (channel, counts, levels, variances, observed) in columns:
+                value = getattr(item, channel)
+                units = max(0.0, counts[slot] - value)
+                counts[slot] = value
+                velocity = units * 3600.0 / dt
+                profile = factors.get((category, channel))
+                season = profile[hour] if profile else 1.0
+                x = velocity / season
+
+                n = observed[slot] + 1
+                observed[slot] = n
+                if n == 1:
+                    levels[slot] = x
+                    continue
+                level, var = levels[slot], variances[slot]
+                resid = x - level
+                std = max(math.sqrt(var), one_unit / season)
+                if n > SPIKE_WARMUP:
+                    baseline = max(level * season, SPIKE_MIN_RATE)
+                    multiplier = velocity / baseline
+                    if best is None or multiplier > best[0]:
+                        best = (multiplier, resid / std, units, velocity, baseline, ci)
+                    resid = min(resid, SPIKE_CLIP_Z * std)
+                else:
+                    alpha_n = max(alpha, 1.0 / n)  # warm-up: plain running mean
+                    levels[slot] = level + alpha_n * resid
+                    variances[slot] = (1.0 - alpha_n) * (var + alpha_n * resid * resid)
+                    continue
+                levels[slot] = level + alpha * resid
+                variances[slot] = (1.0 - alpha) * (var + alpha * resid * resid)
+            if best is not None:
+                scored += 1
+                mult_col[slot], z_col[slot], units_col[slot], velocity_col[slot], baseline_col[slot], channel_index = best
+                self.reading_channel[slot] = channel_index
+        stats["scored"] += scored
+        return scored
+
+    def rebase(self, item):
+        """Take the SKU's current channel counts as the new reference without counting the change as demand.
+
+        Operator writes (pausing a channel, syncing to WMS) move counts without
+        anything being sold; the next observation measures from here.
+        """
+        slot = self.slots.get(item.id)
+        if slot is None:
+            return
+        for ci, channel in enumerate(DEMAND_CHANNELS):
+            self.counts[ci][slot] = getattr(item, channel)
+
+    def reading(self, sku):
+        """``SPIKE_FIELDS`` values plus the channel name from the SKU's latest scored observation, or None."""
+        slot = self.slots.get(sku)
+        if slot is None or self.reading_channel[slot] == _NO_READING:
+            return None
+        return tuple(column[slot] for column in self.readings) + (DEMAND_CHANNELS[self.reading_channel[slot]],)
+
+    def top(self, limit=20, min_multiplier=0.0, min_z=0.0):
+        """SKUs with the highest current multipliers."""
+        mult_col, z_col = self.readings[0], self.readings[1]
+        ranked = heapq.nlargest(
+            limit,
+            (slot for slot, channel in enumerate(self.reading_channel)
+             if channel != _NO_READING and mult_col[slot] >= min_multiplier and z_col[slot] >= min_z),
+            key=mult_col.__getitem__,
+        )
+        out = []
+        for slot in ranked:
+            sku = self.skus[slot]
+            multiplier, z, units, velocity, baseline, channel = self.reading(sku)
+            out.append({
+                "sku": sku,
+                "channel": channel,
+                "multiplier": round(multiplier, 2),
+                "z": round(z, 2),
+                "units": int(units),
+                "velocity_per_h": round(velocity, 1),
+                "baseline_per_h": round(baseline, 1),
+            })
+        return out
+
+
+def history_velocity_multiplier(sku):
+    """Peak daily velocity of the last three days over the median day, if history is loaded."""
+    if not store.get("history_ready"):
+        return None
+    series = store["history"].get(sku)
+    days = [d["velocity"] for d in (series or {}).get("daily_velocity", [])]
+    if len(days) < 4:
+        return None
+    return max(days[-3:]) / max(1, statistics.median(days))
+
+
+def spike_detector():
+    detector = store.get("spike_detector")
+    if detector is None:
+        detector = store["spike_detector"] = SpikeDetector()
+    return detector
+
+
+def rebase_demand(item):
+    """Call after an admin write to a SKU's channel counts so the spike detector doesn't read it as sales."""
+    detector = store.get("spike_detector")
+    if detector is not None:
+        detector.rebase(item)
+
+
+def observe_demand(items, now=None):
+    """Feed refreshed SKUs to the tenant's spike detector; call before the alert rules see them."""
+    return spike_detector().observe(items, now)
+
+
+# ── Connector telemetry ───────────────────────────────────────────────
+# Simulated sync behaviour and health thresholds per upstream system.
+CONNECTOR_PROFILES = {
+    "shopify": {"latency_ms": (45, 180), "sync_interval_s": 30, "error_rate": 0.01, "p95_ms": 400, "max_lag_s": 300},
+    "amazon": {"latency_ms": (80, 250), "sync_interval_s": 60, "error_rate": 0.02, "p95_ms": 600, "max_lag_s": 600},
+    "wms": {"latency_ms": (20, 80), "sync_interval_s": 15, "error_rate": 0.005, "p95_ms": 200, "max_lag_s": 120},
+    "shipbob": {"latency_ms": (100, 350), "sync_interval_s": 120, "error_rate": 0.02, "p95_ms": 900, "max_lag_s": 1200},
+    "pos": {"latency_ms": (30, 120), "sync_interval_s": 45, "error_rate": 0.01, "p95_ms": 300, "max_lag_s": 600},
+}
+TELEMETRY_WINDOW_S = float(os.environ.get("NEXUS_TELEMETRY_WINDOW_S", "300"))
+TELEMETRY_SLOTS = 10
+DEGRADED_ERROR_RATE = 0.05
+
+
+class QuantileSketch:
+    """Mergeable log-bucketed quantile sketch (DDSketch-style).
+
+    Values land in buckets whose width grows geometrically, so any quantile is
+    returned within ``relative_accuracy`` of the true value. When more than
+    ``max_buckets`` are in use the lowest buckets are folded together, which
+    bounds memory regardless of how many samples are added.
+    """
+
+    __slots__ = ("gamma", "_log_gamma", "max_buckets", "buckets", "zero_count", "count", "total", "min", "max")
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=512):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += weight
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + weight
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def remove(self, value, weight=1):
+        """Take back a value added earlier (rolling windows); min/max keep the widest range seen."""
+        self.count -= weight
+        self.total -= value * weight
+        if value <= 0:
+            self.zero_count -= weight
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        remaining = self.buckets.get(key, 0) - weight
+        if remaining > 0:
+            self.buckets[key] = remaining
+        else:
+            self.buckets.pop(key, None)
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def _collapse(self):
+        keys = sorted(self.buckets)
+        overflow = keys[: len(keys) - self.max_buckets + 1]
+        folded = sum(self.buckets.pop(k) for k in overflow)
+        target = keys[len(overflow)]
+        self.buckets[target] += folded
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return clamp(value, self.min, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class ConnectorTelemetry:
+    """Sliding-window latency and error tracking for one connector.
+
+    The window is split into fixed slots, each holding its own sketch; slots
+    are recycled as time moves on, so memory is constant per connector.
+    """
+
+    def __init__(self, window_s=TELEMETRY_WINDOW_S, slots=TELEMETRY_SLOTS):
+        self.slot_s = window_s / slots
+        self.slots = [{"epoch": None, "sketch": QuantileSketch(), "errors": 0} for _ in range(slots)]
+        self.last_sync = None
+        self.last_attempt = None
+        self.total_samples = 0
+
+    def _slot(self, at):
+        epoch = int(at // self.slot_s)
+        slot = self.slots[epoch % len(self.slots)]
+        if slot["epoch"] != epoch:
+            slot["epoch"] = epoch
+            slot["sketch"] = QuantileSketch()
+            slot["errors"] = 0
+        return slot
+
+    def record(self, latency_ms, ok=True, at=None):
+        at = at or time.time()
+        slot = self._slot(at)
+        slot["sketch"].add(latency_ms)
+        self.total_samples += 1
+        self.last_attempt = at
+        if ok:
+            self.last_sync = at if self.last_sync is None else max(self.last_sync, at)
+        else:
+            slot["errors"] += 1
+
+    def window(self, now=None):
+        now = now or time.time()
+        oldest = int(now // self.slot_s) - len(self.slots) + 1
+        merged = QuantileSketch()
+        errors = 0
+        for slot in self.slots:
+            if slot["epoch"] is not None and slot["epoch"] >= oldest:
+                merged.merge(slot["sketch"])
+                errors += slot["errors"]
+        return merged, errors
+
+
+def connector_health(name, telemetry, now=None):
+    """Percentiles, error rate and sync lag for a connector, with a threshold-derived status."""
+    now = now or time.time()
+    profile = CONNECTOR_PROFILES.get(name, {})
+    sketch, errors = telemetry.window(now)
+    samples = sketch.count
+    p50, p95, p99 = (sketch.quantile(q) for q in (0.5, 0.95, 0.99))
+    error_rate = errors / samples if samples else 0.0
+    sync_lag = now - telemetry.last_sync if telemetry.last_sync else None
+    max_lag = profile.get("max_lag_s", 600)
+
+    reasons = []
+    if sync_lag is None or sync_lag > max_lag * 3:
+        status = "disconnected"
+        reasons.append("no successful sync" if sync_lag is None else f"sync lag {sync_lag:.0f}s")
+    else:
+        if sync_lag > max_lag:
+            reasons.append(f"sync lag {sync_lag:.0f}s > {max_lag}s")
+        if p95 is not None and p95 > profile.get("p95_ms", 500):
+            reasons.append(f"p95 {p95:.0f}ms > {profile.get('p95_ms', 500)}ms")
+        if samples and error_rate > DEGRADED_ERROR_RATE:
+            reasons.append(f"error rate {error_rate:.1%}")
+        status = "degraded" if reasons else "connected"
+
+    def _ms(value):
+        return round(value, 1) if value is not None else None
+
+    return {
+        "status": status,
+        "reasons": reasons,
+        "samples": samples,
+        "p50_ms": _ms(p50),
+        "p95_ms": _ms(p95),
+        "p99_ms": _ms(p99),
+        "error_rate": round(error_rate, 4),
+        "sync_lag_s": round(sync_lag, 1) if sync_lag is not None else None,
+        "last_sync": telemetry.last_sync,
+        "window_s": TELEMETRY_WINDOW_S,
+        "thresholds": {k: profile[k] for k in ("p95_ms", "max_lag_s") if k in profile},
+    }
+
+
+def record_connector_sample(name, latency_ms, ok=True, at=None):
+    telemetry = store["telemetry"].get(name)
+    if telemetry is None:
+        telemetry = store["telemetry"][name] = ConnectorTelemetry()
+    telemetry.record(latency_ms, ok=ok, at=at)
+
+
+def simulate_connector_syncs(elapsed_s, now=None):
+    """Draw sync attempts for each connector in proportion to its sync interval."""
+    now = now or time.time()
+    for name, profile in CONNECTOR_PROFILES.items():
+        expected = elapsed_s / profile["sync_interval_s"]
+        attempts = int(expected) + (1 if random.random() < expected % 1 else 0)
+        low, high = profile["latency_ms"]
+        for _ in range(attempts):
+            latency = random.uniform(low, high)
+            if random.random() < 0.03:
+                latency *= random.uniform(2, 6)  # occasional tail spike
+            record_connector_sample(name, latency, ok=random.random() >= profile["error_rate"], at=now)
+
+
+def refresh_connections(now=None):
+    """Rebuild the dashboard connection summary from connector telemetry."""
+    now = now or time.time()
+    connections = {}
+    for name, telemetry in store["telemetry"].items():
+        health = connector_health(name, telemetry, now)
+        connections[name] = {
+            "status": health["status"],
+            "last_sync": health["last_sync"],
+            "latency_ms": round(health["p50_ms"]) if health["p50_ms"] is not None else None,
+            "p95_ms": health["p95_ms"],
+            "p99_ms": health["p99_ms"],
+            "error_rate": health["error_rate"],
+        }
+    store["connections"] = connections
+    return connections
+
+
+def generate_connections():
+    """Seed connector telemetry with a few minutes of simulated syncs."""
+    store["telemetry"] = {name: ConnectorTelemetry() for name in CONNECTOR_PROFILES}
+    now = time.time()
+    warmup_s = 180
+    for offset in range(0, warmup_s, 15):
+        simulate_connector_syncs(15, now=now - warmup_s + offset)
+    return refresh_connections(now)
+
+
 def clamp(value, low, high):
     return max(low, min(high, value))
 
@@ -153,7 +1786,7 @@ def _days_until(date_str):
 def compute_stockout_forecast(item):
     """Rule-based stockout probability forecast for 7/14 day horizons."""
     sku_id = item.get("id")
-    sku_history = store.get("history", {}).get(sku_id, {})
+    sku_history = ensure_history().get(sku_id, {})
     vel_series = [p.get("velocity", 0) for p in sku_history.get("daily_velocity", [])]
     recent_vel = [v for v in vel_series[-3:] if v > 0]
 
@@ -189,18 +1822,17 @@ def compute_stockout_forecast(item):
     }
 
 
+@timed("forecast")
 def enrich_inventory_with_forecasts(inventory):
-    enriched = []
-    for item in inventory:
-        updated = dict(item)
-        updated["stockout_forecast"] = compute_stockout_forecast(item)
-        enriched.append(updated)
-    return enriched
+    return [RecordView(item, stockout_forecast=compute_stockout_forecast(item)) for item in inventory]
 
 
-def build_action_recommendations(inventory, returns_data, alerts, tariffs):
+@timed("recommendations")
+def build_action_recommendations(inventory, returns_data, alerts, tariffs, index=None):
     """Rank top actions by expected impact, urgency, and confidence."""
     candidates = []
+    if index is None:
+        index = TariffIndex(inventory)
 
     for item in inventory:
         systems = item.get("systems", {})
@@ -239,14 +1871,18 @@ def build_action_recommendations(inventory, returns_data, alerts, tariffs):
                 "sku": item.get("id"),
             })
 
-    in_limbo = returns_data.get("in_limbo", 0)
-    frozen_value = int(returns_data.get("total_frozen_value", 0))
-    avg_days = returns_data.get("average_days_stuck", 0)
+    # Only what a bare release_returns would actually release.
+    resellable = [r for r in returns_data.get("items", []) if r.get("grade") in RESELLABLE_GRADES]
+    in_limbo = sum(r.get("qty", 0) for r in resellable)
+    held = returns_data.get("in_limbo", 0) - in_limbo
+    frozen_value = int(sum(r.get("value", 0) for r in resellable))
+    avg_days = round(sum(r.get("days", 0) for r in resellable) / len(resellable)) if resellable else 0
     if in_limbo > 0 and frozen_value > 0:
         candidates.append({
             "kind": "returns",
-            "title": "Release inspected returns to ATP",
-            "rationale": f"{in_limbo} units and ${frozen_value:,.0f} remain frozen for ~{avg_days} days.",
+            "title": "Release grade A/B returns to ATP",
+            "rationale": f"{in_limbo} units and ${frozen_value:,.0f} remain frozen for ~{avg_days} days."
+                         + (f" {held} ungraded or grade C units stay held for inspection." if held > 0 else ""),
             "command": "release_returns",
             "expected_impact": frozen_value,
             "urgency": clamp(avg_days / 30 + in_limbo / 40, 0, 1),
@@ -256,29 +1892,24 @@ def build_action_recommendations(inventory, returns_data, alerts, tariffs):
 
     for tariff in tariffs:
         current_rate = tariff.get("current_rate", 0)
-        proposed_rate = tariff.get("scenarios", [{}])[0].get("rate", current_rate)
-        delta = proposed_rate - current_rate
+        scenario = worst_tariff_scenario(tariff) or {}
+        delta = scenario.get("rate", current_rate) - current_rate
         if delta <= 0:
             continue
 
         country = tariff.get("country")
-        affected = [i for i in inventory if i.get("country_of_origin") == country]
-        if not affected:
+        if not index.country_skus.get(country):
             continue
 
-        exposure = 0
-        for item in affected:
-            unit_cost = float(item.get("unit_cost", 25))
-            true_atp = int(item.get("true_atp", 0))
-            exposure += int(true_atp * unit_cost * delta * 4)
-
-        eff_date = tariff.get("scenarios", [{}])[0].get("effective_date")
+        exposure = int(index.exposure(country, delta))
+        eff_date = scenario.get("effective_date")
         days_to_effective = _days_until(eff_date) if eff_date else None
         urgency = clamp((1 - (days_to_effective or 30) / 90), 0.2, 1.0)
+        under = f" under {scenario['name']}" if scenario.get("name") else ""
         candidates.append({
             "kind": "tariff",
             "title": f"Shift sourcing away from {country}",
-            "rationale": f"Tariff delta of {delta * 100:.0f} pts could add ~${exposure:,.0f} annualized landed cost.",
+            "rationale": f"Tariff delta of {delta * 100:.0f} pts{under} could add ~${exposure:,.0f} annualized landed cost.",
             "command": None,
             "expected_impact": max(1, exposure),
             "urgency": urgency,
@@ -338,15 +1969,15 @@ def score_supplier_risk(extracted):
         country = str(tariff.get("country", "")).lower()
         if country and country in origin.lower():
             current = tariff.get("current_rate", 0)
-            proposed = tariff.get("scenarios", [{}])[0].get("rate", current)
+            proposed = (worst_tariff_scenario(tariff) or {}).get("rate", current)
             tariff_delta = max(0, (proposed - current) * 100)
             tariff_score = clamp(tariff_delta, 0, 12)
             break
 
-    same_origin_count = len([
-        item for item in store.get("data", {}).get("inventory", [])
-        if str(item.get("country_of_origin", "")).lower() in origin.lower()
-    ])
+    same_origin_count = sum(
+        count for country, count in tariff_index().country_skus.items()
+        if str(country).lower() in origin.lower()
+    )
     concentration_score = clamp(same_origin_count * 2, 0, 8)
 
     total_score = round(clamp(severity_score + capacity_score + tariff_score + concentration_score, 0, 100), 1)
@@ -390,12 +2021,13 @@ def upsert_supplier_risk(profile):
     current["history"].append(next_profile)
     current["history"] = current["history"][-10:]
     current["latest"] = next_profile
+    touch_store()
     return {"supplier": supplier, "latest": next_profile, "history": current["history"]}
 
 
 def supplier_risk_leaderboard():
     board = []
-    for supplier, payload in store.get("supplier_risks", {}).items():
+    for supplier, payload in list(store.get("supplier_risks", {}).items()):
         latest = payload.get("latest")
         if latest:
             board.append({
@@ -411,27 +2043,315 @@ def supplier_risk_leaderboard():
     return board
 
 
+# ── Tariff what-if engine ─────────────────────────────────────────────
+# A SKU's annualized landed-cost exposure is true_atp * unit_cost * 4 per unit of
+# rate delta, so any scenario is a scalar times a precomputed base column.
+TARIFF_TOP_SKUS = 10
+TARIFF_MAX_EVALUATIONS = 100_000
+
+
+class TariffIndex:
+    """Columnar exposure bases per SKU with per-country and per-category sums.
+
+    Built in one pass over the inventory. After that, evaluating a rate for a
+    country is O(1) for the total, O(categories) for the breakdown and O(n) for
+    the n largest SKU contributors.
+    """
+
+    __slots__ = ("skus", "base", "country_base", "country_skus", "category_base", "country_order")
+
+    def __init__(self, inventory):
+        self.skus = []
+        self.base = []
+        self.country_base = {}
+        self.country_skus = {}
+        self.category_base = {}
+        rows = {}
+        for item in inventory:
+            base = int(item.get("true_atp", 0)) * float(item.get("unit_cost", 25)) * 4
+            country = item.get("country_of_origin", "")
+            category = item.get("category") or "Uncategorized"
+            rows.setdefault(country, []).append(len(self.skus))
+            self.skus.append(item.get("id"))
+            self.base.append(base)
+            self.country_base[country] = self.country_base.get(country, 0.0) + base
+            self.country_skus[country] = self.country_skus.get(country, 0) + 1
+            categories = self.category_base.setdefault(country, {})
+            categories[category] = categories.get(category, 0.0) + base
+        # Exposure is base * delta, so ordering by base ranks SKUs for every delta.
+        self.country_order = {
+            country: sorted(positions, key=self.base.__getitem__, reverse=True)
+            for country, positions in rows.items()
+        }
+
+    def exposure(self, country, delta):
+        return self.country_base.get(country, 0.0) * delta
+
+    def by_category(self, country, delta):
+        return {
+            category: round(base * delta, 2)
+            for category, base in sorted(self.category_base.get(country, {}).items(), key=lambda kv: -kv[1])
+        }
+
+    def top_skus(self, country, delta, n=TARIFF_TOP_SKUS):
+        return [
+            {"sku": self.skus[pos], "exposure": round(self.base[pos] * delta, 2)}
+            for pos in self.country_order.get(country, [])[:n]
+        ]
+
+
+def tariff_index():
+    """TariffIndex over the live inventory, rebuilt at most once per store version."""
+    cached = store.get("tariff_index")
+    version = store["version"]
+    if cached and cached[0] == version:
+        return cached[1]
+    with span("tariff_index"):
+        index = TariffIndex(store.get("data", {}).get("inventory", []))
+    store["tariff_index"] = (version, index)
+    return index
+
+
+def worst_tariff_scenario(tariff):
+    """The highest-rate scenario for a tariff row, or None when it has none."""
+    current = tariff.get("current_rate", 0)
+    scenarios = [s for s in tariff.get("scenarios") or [] if isinstance(s, dict)]
+    if not scenarios:
+        return None
+    return max(scenarios, key=lambda s: s.get("rate", current))
+
+
+def tariff_rate_grid(grid):
+    """Expand {"min", "max", "step"} into a list of rates (inclusive of max)."""
+    low, high, step = float(grid["min"]), float(grid["max"]), float(grid["step"])
+    if step <= 0 or high < low:
+        raise ValueError("grid needs min <= max and a positive step")
+    count = int(round((high - low) / step)) + 1
+    if count > TARIFF_MAX_EVALUATIONS:
+        raise ValueError(f"grid expands to {count} rates (max {TARIFF_MAX_EVALUATIONS})")
+    return [round(low + i * step, 6) for i in range(count)]
+
+
+@timed("tariff_simulation")
+def simulate_tariffs(tariffs, index, rates=(), combinations=(), countries=None, top_n=TARIFF_TOP_SKUS):
+    """Evaluate every catalog scenario, an ad-hoc rate sweep and cross-country rate combinations."""
+    current = {t.get("country"): t.get("current_rate", 0) for t in tariffs}
+    selected = [t for t in tariffs if not countries or t.get("country") in countries]
+
+    def evaluate(country, name, rate, effective_date, source):
+        delta = rate - current.get(country, 0)
+        return {
+            "country": country,
+            "name": name,
+            "source": source,
+            "rate": rate,
+            "effective_date": effective_date,
+            "delta_pts": round(delta * 100, 2),
+            "exposure": round(index.exposure(country, delta), 2),
+            "by_category": index.by_category(country, delta),
+            "top_skus": index.top_skus(country, delta, top_n),
+        }
+
+    scenarios = []
+    for tariff in selected:
+        country = tariff.get("country")
+        for scenario in tariff.get("scenarios") or []:
+            scenarios.append(evaluate(
+                country,
+                scenario.get("name"),
+                scenario.get("rate", current.get(country, 0)),
+                scenario.get("effective_date"),
+                "catalog",
+            ))
+        for rate in rates:
+            scenarios.append(evaluate(country, f"{rate * 100:g}%", rate, None, "grid"))
+
+    combined = []
+    for combo in combinations:
+        by_country = {
+            country: round(index.exposure(country, rate - current.get(country, 0)), 2)
+            for country, rate in combo.items()
+        }
+        combined.append({"rates": combo, "exposure": round(sum(by_country.values()), 2), "by_country": by_country})
+
+    return {
+        "countries": [
+            {
+                "country": t.get("country"),
+                "current_rate": current.get(t.get("country"), 0),
+                "skus": index.country_skus.get(t.get("country"), 0),
+                "base_value": round(index.country_base.get(t.get("country"), 0.0), 2),
+                "categories": index.by_category(t.get("country"), 1),
+            }
+            for t in selected
+        ],
+        "scenarios": scenarios,
+        "combinations": combined,
+    }
+
+
+# ── Replenishment planner ─────────────────────────────────────────────
+# (s, Q) policy per SKU: reorder at lead-time demand plus z·σ·√L of safety
+# stock, order the economic order quantity (or the shortfall, if larger).
+SERVICE_LEVEL = float(os.environ.get("NEXUS_SERVICE_LEVEL", "0.95"))
+ORDER_COST_USD = 75.0  # fixed cost of placing one PO
+HOLDING_RATE = 0.25  # annual holding cost as a fraction of unit cost
+
+
+def demand_stats(sku_history, item):
+    """Mean and standard deviation of daily demand from the stored velocity series."""
+    series = [p.get("velocity", 0) for p in sku_history.get("daily_velocity", [])]
+    if len(series) >= 2:
+        return statistics.fmean(series), statistics.stdev(series)
+    # No history yet: fall back to committed units over two weeks, Poisson-like spread.
+    mean = max(1.0, float(item.get("committed", 0)) / 14.0)
+    return mean, math.sqrt(mean)
+
+
+def plan_replenishment_line(item, mean, std, z):
+    lead_time = max(1.0, float(item.get("lead_time_days", 30)))
+    unit_cost = max(0.01, float(item.get("unit_cost", 25)))
+    position = max(0.0, float(item.get("available", 0)))
+
+    safety_stock = z * std * math.sqrt(lead_time)
+    reorder_point = mean * lead_time + safety_stock
+    eoq = math.sqrt(2 * mean * 365 * ORDER_COST_USD / (HOLDING_RATE * unit_cost))
+    shortfall = max(0.0, reorder_point - position)
+    order_qty = math.ceil(max(eoq, shortfall)) if position <= reorder_point else 0
+    days_of_cover = position / max(mean, 0.01)
+    return {
+        "sku": item.get("id"),
+        "name": item.get("name"),
+        "category": item.get("category"),
+        "available": int(position),
+        "daily_demand": round(mean, 2),
+        "demand_std": round(std, 2),
+        "lead_time_days": int(lead_time),
+        "safety_stock": math.ceil(safety_stock),
+        "reorder_point": math.ceil(reorder_point),
+        "eoq": math.ceil(eoq),
+        "order_qty": order_qty,
+        # Sitting exactly at the reorder point leaves no shortfall, but an order is still due.
+        "min_order_qty": max(1, math.ceil(shortfall)) if order_qty else 0,
+        "unit_cost": unit_cost,
+        "order_cost": round(order_qty * unit_cost, 2),
+        "days_of_cover": round(days_of_cover, 1),
+        "cover_gap_days": round(lead_time - days_of_cover, 1),
+    }
+
+
+def replenishment_line(item, z=None, history=None, cached=True):
+    """Planner output for one SKU, recomputed only when its inputs changed."""
+    z = statistics.NormalDist().inv_cdf(SERVICE_LEVEL) if z is None else z
+    history = ensure_history() if history is None else history
+    sku = item.get("id")
+    if not cached:
+        return plan_replenishment_line(item, *demand_stats(history.get(sku, {}), item), z), True
+    cache = store["replenishment"]
+    signature = (
+        item.get("available"),
+        item.get("committed"),
+        item.get("lead_time_days"),
+        item.get("unit_cost"),
+        store["section_versions"].get("history", 0),
+        z,
+    )
+    entry = cache.get(sku)
+    if entry and entry[0] == signature:
+        return entry[1], False
+    mean, std = demand_stats(history.get(sku, {}), item)
+    line = plan_replenishment_line(item, mean, std, z)
+    cache[sku] = (signature, line)
+    return line, True
+
+
+@timed("replenishment")
+def build_replenishment_plan(inventory, service_level=SERVICE_LEVEL, budget=None):
+    """Rank every SKU at or below its reorder point and fund orders greedily within ``budget``."""
+    z = statistics.NormalDist().inv_cdf(service_level)
+    history = ensure_history()
+    recomputed = 0
+    orders = []
+    live = set()
+    for item in inventory:
+        line, fresh = replenishment_line(item, z, history)
+        live.add(line["sku"])
+        recomputed += fresh
+        if line["order_qty"]:
+            orders.append(line)
+    cache = store["replenishment"]
+    for sku in [sku for sku in list(cache) if sku not in live]:
+        cache.pop(sku, None)
+
+    # Least cover relative to lead time first; bigger orders break ties.
+    orders.sort(key=lambda line: (-line["cover_gap_days"], -line["order_cost"]))
+    remaining = float("inf") if budget is None else float(budget)
+    plan = []
+    funded_cost = 0.0
+    counts = {"funded": 0, "reduced": 0, "deferred": 0}
+    for rank, line in enumerate(orders, start=1):
+        entry = dict(line, rank=rank)
+        if line["order_cost"] <= remaining:
+            entry["status"], qty = "funded", line["order_qty"]
+        elif line["min_order_qty"] * line["unit_cost"] <= remaining:
+            # Cover the reorder-point shortfall now; the EOQ top-up waits for budget.
+            entry["status"], qty = "reduced", line["min_order_qty"]
+        else:
+            entry["status"], qty = "deferred", 0
+        entry["planned_qty"] = qty
+        entry["planned_cost"] = round(qty * line["unit_cost"], 2)
+        remaining -= entry["planned_cost"]
+        funded_cost += entry["planned_cost"]
+        counts[entry["status"]] += 1
+        plan.append(entry)
+
+    return {
+        "service_level": service_level,
+        "z": round(z, 3),
+        "budget": budget,
+        "summary": {
+            "skus": len(live),
+            "reorder": len(plan),
+            **counts,
+            "total_cost": round(sum(line["order_cost"] for line in plan), 2),
+            "planned_cost": round(funded_cost, 2),
+            "recomputed": recomputed,
+            "reused": len(live) - recomputed,
+        },
+        "plan": plan,
+    }
+
+
 # ── Dynamic root cause generation ──────────────────────────────────────
 def _find_item_by_sku(sku_id):
     """Look up a live inventory item by SKU ID."""
     if not sku_id or "inventory" not in store.get("data", {}):
         return None
-    for item in store["data"]["inventory"]:
-        if item["id"] == sku_id:
-            return item
-    return None
+    pos = store.get("sku_index", {}).get(sku_id)
+    if pos is None:
+        return None
+    return store["data"]["inventory"][pos]
 
 
-def get_root_cause(alert):
-    """Build a dynamic root cause chain using live data from the alert."""
+def get_root_cause(alert, snap=None):
+    """Build a dynamic root cause chain from live data, or from a retained Snapshot."""
     msg = alert.get("message", "").lower()
+    kind = alert_kind(alert)
+    alert_metrics = alert.get("metrics") or {}
     sku_id = alert.get("sku")
-    item = _find_item_by_sku(sku_id)
+    if snap is None:
+        item = _find_item_by_sku(sku_id)
+        data = store.get("data", {})
+        index_for = tariff_index
+    else:
+        item = snap.find_item(sku_id)
+        data = {"tariffs": snap.tariffs, "returns": snap.returns}
+        index_for = snap.tariff_index
     risk = alert.get("risk", 0)
     risk_str = f"${risk / 1000:.1f}K" if risk < 1_000_000 else f"${risk / 1_000_000:.2f}M"
 
     # ── Oversold / Gap alerts ──
-    if "oversold" in msg or "gap" in msg:
+    if kind == "gap":
         name = item["name"] if item else "Unknown SKU"
         sys = item["systems"] if item else {}
         wms = sys.get("wms", 0)
@@ -448,8 +2368,8 @@ def get_root_cause(alert):
         ]}
 
     # ── Tariff alerts ──
-    if "tariff" in msg:
-        tariffs = store.get("data", {}).get("tariffs", [])
+    if kind == "tariff":
+        tariffs = data.get("tariffs", [])
         # Extract country from message
         country = "Vietnam"
         for t in tariffs:
@@ -459,13 +2379,21 @@ def get_root_cause(alert):
         tariff = next((t for t in tariffs if t["country"] == country), None)
         if tariff:
             current = tariff["current_rate"]
-            proposed = tariff["scenarios"][0]["rate"] if tariff["scenarios"] else current
-            eff_date = tariff["scenarios"][0].get("effective_date", "TBD") if tariff["scenarios"] else "TBD"
-            affected = [i for i in store.get("data", {}).get("inventory", []) if i.get("country_of_origin") == country]
-            n_skus = len(affected)
+            scenario = worst_tariff_scenario(tariff) or {}
+            proposed = scenario.get("rate", current)
+            eff_date = scenario.get("effective_date", "TBD")
+            index = index_for()
+            n_skus = index.country_skus.get(country, 0)
+            if not risk:
+                exposure = index.exposure(country, max(0, proposed - current))
+                risk_str = f"${exposure / 1000:.1f}K" if exposure < 1_000_000 else f"${exposure / 1_000_000:.2f}M"
+            effect = f"{n_skus} SKUs sourced from {country} face higher landed cost"
+            categories = index.category_base.get(country)
+            if categories and len(categories) > 1:
+                effect += f", led by {max(categories, key=categories.get)}"
             return {"chain": [
                 {"label": "Root Cause", "text": f"{country} tariff increase — {current * 100:.0f}% to {proposed * 100:.0f}% effective {eff_date}"},
-                {"label": "Effect", "text": f"{n_skus} SKUs sourced from {country} face higher landed cost"},
+                {"label": "Effect", "text": effect},
                 {"label": "Impact", "text": f"{risk_str} annual exposure if no sourcing changes made"},
                 {"label": "Action", "text": f"Shift affected SKUs to lower-tariff origin or negotiate pre-tariff bulk order"},
             ]}
@@ -477,22 +2405,33 @@ def get_root_cause(alert):
         ]}
 
     # ── Demand spike alerts ──
-    if "spike" in msg or "tiktok" in msg or "velocity" in msg:
+    if kind == "spike":
         name = item["name"] if item else "Unknown SKU"
         atp = item["true_atp"] if item else 0
         available = item.get("available", 0) if item else 0
         lead_time = item.get("lead_time_days", 30) if item else 30
         days_stock = max(1, round(available / max(1, atp * 0.1)))
+        if "spike_multiplier" in alert_metrics:
+            channel = alert_metrics.get("spike_channel", "a sales channel")
+            cause = f"Demand surge on {channel} for {name}, detected from live sales velocity"
+            if alert_metrics.get("spike_velocity") is not None:
+                cause += f" — {alert_metrics['spike_velocity']:.0f} units/h vs {alert_metrics.get('spike_baseline') or 0:.0f}/h expected"
+            velocity = f"Order velocity {alert_metrics['spike_multiplier']:.1f}x normal on {channel}"
+        else:
+            # Alerts without metrics (seed data) are measured against the SKU's daily velocity history.
+            cause = f"Viral social media exposure driving demand surge for {name}"
+            multiplier = history_velocity_multiplier(sku_id)
+            velocity = f"Order velocity {multiplier:.1f}x normal" if multiplier else "Order velocity above normal"
         return {"chain": [
-            {"label": "Root Cause", "text": f"Viral social media exposure driving demand surge for {name}"},
-            {"label": "Effect", "text": f"Order velocity 3.2x normal — {available} units available, ~{days_stock} days of stock remaining"},
+            {"label": "Root Cause", "text": cause},
+            {"label": "Effect", "text": f"{velocity} — {available} units available, ~{days_stock} days of stock remaining"},
             {"label": "Impact", "text": f"{risk_str} at risk — stockout probable before next PO (lead time {lead_time}d)"},
             {"label": "Action", "text": f"Expedite PO for {sku_id} or reallocate {min(50, available)} units from wholesale channel"},
         ]}
 
     # ── Returns backlog alerts ──
-    if "return" in msg or "backlog" in msg or "inspection" in msg:
-        returns = store.get("data", {}).get("returns", {})
+    if kind == "returns":
+        returns = data.get("returns", {})
         in_limbo = returns.get("in_limbo", 0)
         frozen_val = returns.get("total_frozen_value", 0)
         avg_days = returns.get("average_days_stuck", 0)
@@ -506,14 +2445,28 @@ def get_root_cause(alert):
         ]}
 
     # ── Reorder point alerts ──
-    if "reorder" in msg or "threshold" in msg:
+    if kind in ("reorder", "stockout"):
         name = item["name"] if item else "Unknown SKU"
         available = item.get("available", 0) if item else 0
         reorder_pt = item.get("reorder_point", 50) if item else 50
         lead_time = item.get("lead_time_days", 30) if item else 30
         unit_cost = item.get("unit_cost", 25) if item else 25
-        reorder_qty = max(reorder_pt * 2, 100)
+        if item:
+            line, _ = replenishment_line(item, cached=snap is None)
+            reorder_qty = line["order_qty"] or line["eoq"]
+        else:
+            reorder_qty = max(reorder_pt * 2, 100)
         reorder_cost = reorder_qty * unit_cost
+        if kind == "stockout":
+            # Rule alerts carry the forecast that fired them; recompute only for older alerts.
+            forecast = alert_metrics if "days_to_stockout" in alert_metrics else (compute_stockout_forecast(item) if item else {})
+            days_left = forecast.get("days_to_stockout") or 0
+            return {"chain": [
+                {"label": "Root Cause", "text": f"Demand of {forecast.get('daily_demand') or 0:.1f} units/day for {name} outruns supply — {available} units cover ~{days_left:.0f} days"},
+                {"label": "Effect", "text": f"Stockout in ~{days_left:.0f} days, before a {lead_time}-day replenishment can land"},
+                {"label": "Impact", "text": f"{risk_str} at risk — {forecast.get('risk_7d') or 0:.0f}% stockout probability within 7 days"},
+                {"label": "Action", "text": f"Expedite a PO for {reorder_qty} units (${reorder_cost:,.0f}) for {sku_id} or rebalance stock from slower channels"},
+            ]}
         return {"chain": [
             {"label": "Root Cause", "text": f"Sustained demand for {name} — {available} available vs {reorder_pt} safety threshold"},
             {"label": "Effect", "text": f"Only {available} units left, {lead_time}-day lead time for replenishment"},
@@ -521,118 +2474,1773 @@ def get_root_cause(alert):
             {"label": "Action", "text": f"Emergency reorder {reorder_qty} units (${reorder_cost:,.0f}) or transfer from another channel"},
         ]}
 
+    # ── Custom rule alerts: explain from the metrics the rule saw ──
+    if alert.get("rule"):
+        name = item["name"] if item else "Unknown SKU"
+        observed = ", ".join(f"{field} {value}" for field, value in alert_metrics.items())
+        action = alert.get("action")
+        return {"chain": [
+            {"label": "Root Cause", "text": f"Alert rule '{alert['rule']}' matched for {name}"},
+            {"label": "Effect", "text": f"Observed {observed}" if observed else "Rule condition met"},
+            {"label": "Impact", "text": f"{risk_str} at risk"},
+            {"label": "Action", "text": f"Run {action}:{sku_id}" if action else f"Review {sku_id}"},
+        ]}
+
     return None
 
 
+# ── Alert rules ───────────────────────────────────────────────────────
+# A rule is declarative: a trigger expression over SKU fields, an optional
+# clear expression for hysteresis, a cooldown and a message template. Each
+# expression is compiled once into a function over a tuple of the SKU's
+# inputs, and a SKU is re-evaluated only when that tuple changes.
+ALERT_HISTORY_LIMIT = 25
+ALERT_SEVERITIES = ("CRITICAL", "WARNING", "INFO")
+ALERT_RECORD_FIELDS = (
+    "shopify", "amazon", "wms", "pos", "true_atp", "committed", "available", "risk_value",
+    "lead_time_days", "reorder_point", "unit_cost",
+)
+ALERT_DERIVED_FIELDS = ("max_listed", "oversell")
+ALERT_FORECAST_FIELDS = ("daily_demand", "days_to_stockout", "risk_7d", "risk_14d")
+ALERT_FIELDS = ALERT_RECORD_FIELDS + ALERT_DERIVED_FIELDS + ALERT_FORECAST_FIELDS + SPIKE_FIELDS
+# Extra placeholders a message template may use besides the fields.
+ALERT_MESSAGE_NAMES = ("name", "sku", "listed_channel", "spike_channel")
+# Seed and hand-written alerts carry no kind; it is inferred from the message, first match wins.
+ALERT_KIND_KEYWORDS = (
+    ("gap", ("oversold", "gap")),
+    ("tariff", ("tariff",)),
+    ("spike", ("spike", "tiktok", "velocity")),
+    ("returns", ("return", "backlog", "inspection")),
+    ("reorder", ("reorder", "threshold")),
+)
+DEFAULT_ALERT_RULES = [
+    {
+        "name": "channel_oversell",
+        "kind": "gap",
+        "severity": "CRITICAL",
+        "when": "oversell > 20",
+        "clear": "oversell <= 5",
+        "cooldown_s": 600,
+        "action": "sync_inventory",
+        "message": "{name}: {oversell}-unit gap detected — {listed_channel} ({max_listed}) vs WMS ({wms})",
+    },
+    {
+        "name": "reorder_point",
+        "kind": "reorder",
+        "severity": "WARNING",
+        "when": "0 < available <= reorder_point",
+        "clear": "available > reorder_point * 1.2",
+        "cooldown_s": 1800,
+        "message": "{name} approaching reorder point — {available} available vs {reorder_point} threshold",
+    },
+    {
+        "name": "stockout_before_lead_time",
+        "kind": "stockout",
+        "severity": "WARNING",
+        "when": "risk_7d > 70 and days_to_stockout < lead_time_days",
+        "clear": "risk_7d < 60",
+        "cooldown_s": 3600,
+        "risk": "daily_demand * lead_time_days * unit_cost",
+        "message": "{name} projected to stock out in {days_to_stockout:.0f} days — "
+                   "lead time {lead_time_days}d, 7-day risk {risk_7d:.0f}%",
+    },
+    {
+        "name": "demand_spike",
+        "kind": "spike",
+        "severity": "CRITICAL",
+        "when": "spike_multiplier >= 3 and spike_z >= 4 and spike_units >= 5",
+        "clear": "spike_multiplier < 1.5",
+        "cooldown_s": 1800,
+        "risk": "(spike_velocity - spike_baseline) * 24 * unit_cost",
+        "message": "Demand spike: {name} — {spike_velocity:.0f} units/h on {spike_channel}, "
+                   "{spike_multiplier:.1f}x its {spike_baseline:.0f}/h baseline for this hour",
+    },
+]
+
+_RULE_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.Compare,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.BinOp, ast.Add, ast.Sub, ast.Mult,
+    ast.Div, ast.Name, ast.Load, ast.Constant,
+)
+
+
+class AlertRuleError(ValueError):
+    pass
+
+
+def alert_kind(alert):
+    """An alert's kind: its own ``kind`` if it has one, else inferred from the message."""
+    kind = alert.get("kind")
+    if kind:
+        return kind
+    msg = alert.get("message", "").lower()
+    for kind, words in ALERT_KIND_KEYWORDS:
+        if any(word in msg for word in words):
+            return kind
+    return None
+
+
+def _parse_rule_expr(expr, where):
+    if not isinstance(expr, str) or not expr.strip():
+        raise AlertRuleError(f"{where} must be a non-empty expression")
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as exc:
+        raise AlertRuleError(f"{where}: cannot parse {expr!r} ({exc.msg})") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _RULE_NODES):
+            raise AlertRuleError(f"{where}: {type(node).__name__} is not allowed in {expr!r}")
+        if isinstance(node, ast.Name) and node.id not in ALERT_FIELDS:
+            raise AlertRuleError(f"{where}: unknown field {node.id!r}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+            raise AlertRuleError(f"{where}: only numeric constants are allowed")
+    return tree
+
+
+class _InputSlots(ast.NodeTransformer):
+    """Rewrite field names into lookups in the input tuple ``v``."""
+
+    def __init__(self, slots):
+        self.slots = slots
+
+    def visit_Name(self, node):
+        lookup = ast.Subscript(value=ast.Name(id="v", ctx=ast.Load()), slice=ast.Constant(self.slots[node.id]), ctx=ast.Load())
+        return ast.copy_location(lookup, node)
+
+
+def _compile_rule_expr(tree, slots, label):
+    body = _InputSlots(slots).visit(tree).body
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(arg="v")], kwonlyargs=[], kw_defaults=[], defaults=[])
+    code = compile(ast.fix_missing_locations(ast.Expression(ast.Lambda(args=args, body=body))), label, "eval")
+    return eval(code, {"__builtins__": {}})
+
+
+def _rule_value(fn, values, default=False):
+    # Forecast fields are None until history is ready; comparisons on them just don't match.
+    try:
+        return fn(values)
+    except (TypeError, ZeroDivisionError):
+        return default
+
+
+class AlertRule:
+    __slots__ = ("name", "kind", "severity", "cooldown_s", "action", "message", "spec", "fields", "trees", "when", "clear", "risk")
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise AlertRuleError("each rule must be an object")
+        self.spec = spec
+        self.name = spec.get("name")
+        if not isinstance(self.name, str) or not self.name:
+            raise AlertRuleError("rule name is required")
+        where = f"rule {self.name!r}"
+        self.kind = str(spec.get("kind") or self.name)
+        self.severity = spec.get("severity", "WARNING")
+        if self.severity not in ALERT_SEVERITIES:
+            raise AlertRuleError(f"{where}: severity must be one of {list(ALERT_SEVERITIES)}")
+        self.cooldown_s = spec.get("cooldown_s", 300)
+        if isinstance(self.cooldown_s, bool) or not isinstance(self.cooldown_s, (int, float)) or self.cooldown_s < 0:
+            raise AlertRuleError(f"{where}: cooldown_s must be a non-negative number")
+        self.action = spec.get("action")
+        self.message = spec.get("message") or f"{{name}}: {self.name} ({spec.get('when')})"
+
+        self.trees = {"when": _parse_rule_expr(spec.get("when"), f"{where} when")}
+        for key in ("clear", "risk"):
+            if spec.get(key) is not None:
+                self.trees[key] = _parse_rule_expr(spec[key], f"{where} {key}")
+        fields = {node.id for tree in self.trees.values() for node in ast.walk(tree) if isinstance(node, ast.Name)}
+        try:
+            placeholders = {name.split(".")[0].split("[")[0] for _, name, _, _ in string.Formatter().parse(self.message) if name}
+        except ValueError as exc:
+            raise AlertRuleError(f"{where}: bad message template ({exc})") from None
+        unknown = placeholders - set(ALERT_FIELDS) - set(ALERT_MESSAGE_NAMES)
+        if unknown:
+            raise AlertRuleError(f"{where}: unknown message placeholder(s) {sorted(unknown)}")
+        self.fields = fields | (placeholders & set(ALERT_FIELDS))
+        if "listed_channel" in placeholders:
+            self.fields |= {"shopify", "amazon"}
+        if "spike_channel" in placeholders:
+            self.fields |= {"spike_multiplier"}
+
+    def bind(self, slots):
+        label = f"<alert rule {self.name}>"
+        self.when = _compile_rule_expr(self.trees["when"], slots, label)
+        self.clear = _compile_rule_expr(self.trees["clear"], slots, label) if "clear" in self.trees else None
+        self.risk = _compile_rule_expr(self.trees["risk"], slots, label) if "risk" in self.trees else None
+
+    def triggered(self, values):
+        return bool(_rule_value(self.when, values))
+
+    def cleared(self, values):
+        if self.clear is None:
+            return not self.triggered(values)
+        return bool(_rule_value(self.clear, values))
+
+
+def _compile_input_extractor(fields):
+    """``f(record, forecast, spike)`` returning the input tuple for ``fields``, generated once per rule set."""
+    if not fields:
+        return lambda r, fc, sp: ()
+    parts = []
+    for field in fields:
+        if field in ALERT_RECORD_FIELDS:
+            parts.append(f"r.{field}")
+        elif field == "max_listed":
+            parts.append("max(r.shopify, r.amazon)")
+        elif field == "oversell":
+            parts.append("max(r.shopify, r.amazon) - r.wms")
+        elif field in SPIKE_FIELDS:
+            parts.append(f"(sp[{SPIKE_FIELDS.index(field)}] if sp else None)")
+        else:
+            parts.append(f"(fc[{field!r}] if fc else None)")
+    return eval(f"lambda r, fc, sp: ({', '.join(parts)},)", {"__builtins__": {}, "max": max})
+
+
+class AlertRuleEngine:
+    """Compiled alert rules plus per-SKU input memo, hysteresis and cooldown state."""
+
+    def __init__(self, specs):
+        if not isinstance(specs, list):
+            raise AlertRuleError("rules must be a list")
+        self.rules = [AlertRule(spec) for spec in specs]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise AlertRuleError("rule names must be unique")
+        referenced = set().union(*(rule.fields for rule in self.rules))
+        self.fields = tuple(f for f in ALERT_FIELDS if f in referenced)
+        slots = {f: i for i, f in enumerate(self.fields)}
+        for rule in self.rules:
+            rule.bind(slots)
+        self._extract = _compile_input_extractor(self.fields)
+        self._forecast = any(f in ALERT_FORECAST_FIELDS for f in self.fields)
+        self._spike = any(f in SPIKE_FIELDS for f in self.fields)
+        self.inputs = {}
+        self.active = {}
+        self.last_fired = {}
+        self.last_alert = {}
+        self.forecasts = {}
+        self.stats = {"evaluated": 0, "unchanged": 0, "raised": 0, "cooling_down": 0, "cleared": 0, "duplicates": 0, "dropped": 0}
+
+    def _forecast_for(self, item, history_build):
+        key = (item.available, item.committed, item.lead_time_days, item.reorder_point, history_build)
+        cached = self.forecasts.get(item.id)
+        if cached is None or cached[0] != key:
+            cached = self.forecasts[item.id] = (key, compute_stockout_forecast(item))
+        return cached[1]
+
+    def evaluate(self, items, now=None):
+        """Run the rules for items whose inputs changed; returns ``(rule, item, values)`` per alert raised."""
+        now = now or time.time()
+        raised = []
+        stats = self.stats
+        # Forecast fields stay None until history is ready; rules on them just don't match yet.
+        history_build = store["history_builds"] if self._forecast and store.get("history_ready") else None
+        detector = store.get("spike_detector") if self._spike else None
+        for item in items:
+            sku = item.id
+            values = self._extract(
+                item,
+                self._forecast_for(item, history_build) if history_build is not None else None,
+                detector.reading(sku) if detector is not None else None,
+            )
+            if self.inputs.get(sku) == values:
+                stats["unchanged"] += 1
+                continue
+            self.inputs[sku] = values
+            stats["evaluated"] += 1
+            active = self.active.get(sku)
+            for rule in self.rules:
+                if active and rule.name in active:
+                    if rule.cleared(values):
+                        active.discard(rule.name)
+                        stats["cleared"] += 1
+                    continue
+                try:
+                    if not rule.when(values):
+                        continue
+                except (TypeError, ZeroDivisionError):
+                    continue
+                if active is None:
+                    active = self.active[sku] = set()
+                active.add(rule.name)
+                last = self.last_fired.get((rule.name, sku))
+                if last is not None and now - last < rule.cooldown_s:
+                    stats["cooling_down"] += 1
+                    continue
+                self.last_fired[rule.name, sku] = now
+                self.last_alert[sku] = now
+                raised.append((rule, item, values))
+            if active is not None and not active:
+                del self.active[sku]
+        stats["raised"] += len(raised)
+        return raised
+
+    def risk(self, rule, item, values):
+        risk = _rule_value(rule.risk, values, 0) if rule.risk is not None else item.risk_value
+        return max(0, int(risk or 0))
+
+    def alert(self, rule, item, values, now, risk):
+        row = dict(zip(self.fields, values))
+        metrics = {f: row[f] for f in self.fields if f in rule.fields}
+        names = {"listed_channel": "Shopify" if item.shopify >= item.amazon else "Amazon"}
+        if any(f in SPIKE_FIELDS for f in metrics):
+            reading = spike_detector().reading(item.id)
+            names["spike_channel"] = reading[-1].title() if reading else "unknown"
+            metrics = {f: round(v, 2) if f in SPIKE_FIELDS and v is not None else v for f, v in metrics.items()}
+            metrics["spike_channel"] = names["spike_channel"]
+        try:
+            message = rule.message.format(name=item.name, sku=item.id, **{**names, **metrics})
+        except (TypeError, ValueError):
+            message = f"{item.name}: {rule.name}"
+        return {
+            "id": next_alert_id("RULE"),
+            "type": rule.severity,
+            "message": message,
+            "risk": risk,
+            "action": rule.action,
+            "sku": item.id,
+            "time": "just now",
+            "kind": rule.kind,
+            "rule": rule.name,
+            "metrics": metrics,
+            "ts": now,
+        }
+
+    def describe(self):
+        return {
+            "rules": [rule.spec for rule in self.rules],
+            "fields": list(ALERT_FIELDS),
+            "active": sum(len(names) for names in self.active.values()),
+            "stats": dict(self.stats),
+        }
+
+
+def load_alert_rule_specs():
+    if ALERT_RULES_PATH:
+        with open(ALERT_RULES_PATH) as f:
+            config = json.load(f)
+        return config.get("rules", []) if isinstance(config, dict) else config
+    return DEFAULT_ALERT_RULES
+
+
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(ALERT_SEVERITIES)}
+
+
+def apply_alert_rules(items, now=None):
+    """Evaluate the tenant's rules for changed items and put new alerts at the top of the feed.
+
+    A SKU that already has an alert of the same kind in the feed is not
+    alerted twice; when a pass raises more than the feed holds, the most
+    severe and costly alerts win.
+    """
+    engine = store["alert_rules"]
+    if engine is None:
+        return 0
+    now = now or time.time()
+    return publish_alerts(engine, engine.evaluate(items, now), now)
+
+
+def publish_alerts(engine, raised, now):
+    """Put the alerts from ``engine.evaluate`` at the top of the feed; returns how many were added."""
+    if not raised:
+        return 0
+    present = {(alert_kind(a), a.get("sku")) for a in store["alerts"]}
+    fresh = []
+    for rule, item, values in raised:
+        if (rule.kind, item.id) in present:
+            engine.stats["duplicates"] += 1
+            continue
+        present.add((rule.kind, item.id))
+        fresh.append((_SEVERITY_RANK[rule.severity], -engine.risk(rule, item, values), len(fresh), rule, item, values))
+    # Only the alerts that make the feed are formatted.
+    fresh.sort(key=lambda entry: entry[:3])
+    engine.stats["dropped"] += max(0, len(fresh) - ALERT_HISTORY_LIMIT)
+    alerts = [engine.alert(rule, item, values, now, -neg_risk) for _, neg_risk, _, rule, item, values in fresh[:ALERT_HISTORY_LIMIT]]
+    store["alerts"] = (alerts + store["alerts"])[:ALERT_HISTORY_LIMIT]
+    return len(alerts)
+
+
 # ── Simulation engine ─────────────────────────────────────────────────
+def refresh_item_state(item):
+    """Recompute true_atp/available/discrepancy/risk_value from channel counts; returns the gap."""
+    physical = item.wms
+    item.true_atp = physical
+    item.available = max(0, physical - getattr(item, "committed", 0))
+    store["dirty_skus"].add(item.id)
+
+    gap = max(item.shopify, item.amazon) - physical
+    if gap > 5:
+        item.discrepancy = True
+        item.risk_value = max(0, int(gap * getattr(item, "unit_cost", 25) * 12))
+    else:
+        item.discrepancy = False
+        item.risk_value = 0
+    return gap
+
+
+def drift_item(item):
+    """One random-walk step on a SKU's channel counts; returns True if any count moved."""
+    moved = False
+    for channel in ("shopify", "amazon", "pos"):
+        delta = random.choice([-3, -2, -1, -1, 0, 0, 0, 1, 1, 2])
+        if delta:
+            setattr(item, channel, max(0, getattr(item, channel) + delta))
+            moved = True
+
+    if random.random() < 0.15:
+        delta = random.choice([-1, 0, 0, 1])
+        if delta:
+            item.wms = max(0, item.wms + delta)
+            moved = True
+    return moved
+
+
+def finish_tick(now):
+    """Per-interval bookkeeping after SKUs moved: connector telemetry, alert feed cap, version bump."""
+    # Connector syncs since the previous tick feed the telemetry; status is derived from it.
+    simulate_connector_syncs(store["tick_interval_s"], now)
+    refresh_connections(now)
+
+    store["alerts"] = store["alerts"][:ALERT_HISTORY_LIMIT]
+    touch_store()
+
+
+@timed("tick")
 def simulate_tick():
-    """Run one simulation tick: adjust counts, generate alerts."""
-    global alert_counter
+    """Run one full simulation tick over every SKU: adjust counts, generate alerts.
+
+    The background loop refreshes SKUs through ``RefreshScheduler`` instead;
+    this full pass is kept for benchmarks and manual runs.
+    """
     data = store["data"]
     if not data or "inventory" not in data:
         return
     if store.get("demo_mode"):
-        store["last_update"] = time.time()
+        touch_store()
         return
 
+    # Records are read and written through their slots; this loop touches every SKU.
+    changed = []
     for item in data["inventory"]:
-        sys = item["systems"]
+        if drift_item(item):
+            refresh_item_state(item)
+            changed.append(item)
 
-        for channel in ["shopify", "amazon", "pos"]:
-            delta = random.choice([-3, -2, -1, -1, 0, 0, 0, 1, 1, 2])
-            sys[channel] = max(0, sys[channel] + delta)
+    # Every SKU is a velocity observation; only SKUs that moved are offered to the alert rules.
+    now = time.time()
+    observe_demand(data["inventory"], now)
+    apply_alert_rules(changed, now)
+    finish_tick(now)
+
+
+# ── Refresh scheduler ─────────────────────────────────────────────────
+# The scheduler wakes every frame, refreshes the SKUs that are due and
+# yields to the event loop between short slices of work.
+SCHEDULER_FRAME_S = 0.5
+SCHEDULER_SLICE_S = 0.01
+# Share of each frame the scheduler may spend on SKUs; the rest is left to requests.
+SCHEDULER_FRAME_BUDGET = 0.5
+SCHEDULER_TIERS = ("hot", "warm", "cold")
+# Refresh cadence per tier, in multiples of the tenant's tick_interval_s.
+SCHEDULER_CADENCE = (1, 3, 8)
+# Under load warm/cold cadences are stretched up to this factor; hot SKUs never are.
+SCHEDULER_MAX_STRETCH = 6.0
+SCHEDULER_RECENT_ALERT_S = 600
+SCHEDULER_HOT_RISK_7D = 50
+SCHEDULER_WARM_RISK_7D = 20
+
+
+def refresh_tier(item, engine, now):
+    """0 (hot), 1 (warm) or 2 (cold) from the SKU's gap, alert activity and cached stockout risk."""
+    if item.discrepancy:
+        return 0
+    if engine is None:
+        return 2
+    sku = item.id
+    if sku in engine.active or now - engine.last_alert.get(sku, -SCHEDULER_RECENT_ALERT_S) < SCHEDULER_RECENT_ALERT_S:
+        return 0
+    cached = engine.forecasts.get(sku)
+    risk = cached[1].get("risk_7d", 0) if cached else 0
+    if risk >= SCHEDULER_HOT_RISK_7D:
+        return 0
+    if risk >= SCHEDULER_WARM_RISK_7D:
+        return 1
+    return 2
+
+
+class RefreshScheduler:
+    """Per-SKU refresh cadences on a due-time heap, worked in time-sliced batches.
+
+    Each SKU is due again one cadence after it was refreshed; the cadence
+    follows its tier. When a frame runs out of budget with SKUs still due,
+    the frame is counted as an overrun and warm/cold cadences are stretched
+    until the backlog clears.
+    """
+
+    def __init__(self, frame_s=None):
+        self.frame_s = frame_s or min(SCHEDULER_FRAME_S, store["tick_interval_s"])
+        self.inventory = None
+        self.heap = []
+        self.tiers = bytearray()
+        self.tier_counts = [0, 0, 0]
+        self.stretch = 1.0
+        self.batch = 256
+        self.lag_s = 0.0
+        self.cycle_started = None
+        self.last_frame = {}
+        self.stats = {"frames": 0, "slices": 0, "refreshed": 0, "changed": 0, "overruns": 0, "cycles": 0, "rebuilds": 0}
+
+    def cadences(self, interval):
+        stretch = self.stretch
+        return [interval * SCHEDULER_CADENCE[0]] + [interval * c * stretch for c in SCHEDULER_CADENCE[1:]]
+
+    def sync(self, inventory, now, interval):
+        """Rebuild the heap when the catalog was replaced or resized; first refreshes are spread over a cadence."""
+        if inventory is self.inventory and len(inventory) == len(self.tiers):
+            return
+        engine = store["alert_rules"]
+        cadences = self.cadences(interval)
+        self.tiers = bytearray(refresh_tier(item, engine, now) for item in inventory)
+        self.tier_counts = [self.tiers.count(t) for t in range(len(SCHEDULER_TIERS))]
+        self.heap = [(now + cadences[tier] * random.random(), pos) for pos, tier in enumerate(self.tiers)]
+        heapq.heapify(self.heap)
+        self.inventory = inventory
+        self.stats["rebuilds"] += 1
+
+    def _refresh_slice(self, inventory, now, interval):
+        """Refresh up to ``batch`` due SKUs; returns how many were refreshed and how many moved."""
+        heap = self.heap
+        due = []
+        items = []
+        changed = []
+        while heap and heap[0][0] <= now and len(due) < self.batch:
+            pos = heapq.heappop(heap)[1]
+            item = inventory[pos]
+            if drift_item(item):
+                refresh_item_state(item)
+                changed.append(item)
+            due.append(pos)
+            items.append(item)
+        observe_demand(items, now)
+        apply_alert_rules(changed, now)
+
+        # Tiers are decided after the rules ran so a SKU that just alerted comes back soon.
+        engine = store["alert_rules"]
+        cadences = self.cadences(interval)
+        tiers = self.tiers
+        counts = self.tier_counts
+        for pos in due:
+            tier = refresh_tier(inventory[pos], engine, now)
+            if tier != tiers[pos]:
+                counts[tiers[pos]] -= 1
+                counts[tier] += 1
+                tiers[pos] = tier
+            heapq.heappush(heap, (now + cadences[tier], pos))
+        return len(due), len(changed)
+
+    async def run_frame(self, now=None):
+        """Refresh every SKU due by ``now`` within this frame's budget, then close the cycle if one has elapsed."""
+        now = now or time.time()
+        interval = store["tick_interval_s"]
+        started = time.perf_counter()
+        deadline = started + self.frame_s * SCHEDULER_FRAME_BUDGET
+        busy = 0.0
+        refreshed = changed = slices = 0
+        left_behind = False
+        data = store["data"]
+        inventory = data.get("inventory") if data else None
+        if inventory and not store.get("demo_mode"):
+            self.sync(inventory, now, interval)
+            while self.heap and self.heap[0][0] <= now:
+                slice_started = time.perf_counter()
+                n, moved = self._refresh_slice(inventory, now, interval)
+                elapsed = time.perf_counter() - slice_started
+                # Size the next batch so a slice (rules included) fits SCHEDULER_SLICE_S.
+                self.batch = max(32, min(4096, int(self.batch * SCHEDULER_SLICE_S / max(elapsed, 1e-6))))
+                refreshed += n
+                changed += moved
+                slices += 1
+                busy += elapsed
+                await asyncio.sleep(0)
+                if store["data"].get("inventory") is not inventory:
+                    break  # catalog replaced while we yielded; the next frame rebuilds the heap
+                if time.perf_counter() >= deadline:
+                    left_behind = bool(self.heap) and self.heap[0][0] <= now
+                    break
+        self.lag_s = max(0.0, now - self.heap[0][0]) if self.heap and inventory is self.inventory else 0.0
+
+        if self.cycle_started is None:
+            self.cycle_started = now
+        elif now - self.cycle_started >= interval:
+            self.cycle_started = now
+            self.stats["cycles"] += 1
+            cycle_started = time.perf_counter()
+            if store.get("demo_mode") or not inventory:
+                touch_store()
+            else:
+                finish_tick(now)
+            append_history_hour()
+            if store["returns_ledger"].refresh_ages(now):
+                touch_store("returns")
+            record_snapshot()
+            busy += time.perf_counter() - cycle_started
+
+        # A frame overruns when it leaves due SKUs behind or its work outlasts the frame itself.
+        overrun = left_behind or busy > self.frame_s
+        self._adapt(overrun, busy, interval)
+        stats = self.stats
+        stats["frames"] += 1
+        stats["slices"] += slices
+        stats["refreshed"] += refreshed
+        stats["changed"] += changed
+        self.last_frame = {
+            "refreshed": refreshed,
+            "changed": changed,
+            "slices": slices,
+            "busy_ms": round(busy * 1000, 3),
+            "left_behind": left_behind,
+            "overrun": overrun,
+        }
+        metrics["gauges"]["tick_last_seconds"] = round(busy, 6)
+        metrics["gauges"]["tick_budget_ratio"] = round(busy / self.frame_s, 4)
+        metrics["gauges"]["scheduler_lag_seconds"] = round(self.lag_s, 3)
+        metrics["gauges"]["scheduler_stretch"] = round(self.stretch, 3)
+        if overrun:
+            stats["overruns"] += 1
+            metrics["counters"]["tick_overruns"] += 1
+        return self.last_frame
+
+    def _adapt(self, overrun, busy, interval):
+        # Stretch low-priority cadences while SKUs are left behind; relax once frames run well under budget.
+        if overrun or self.lag_s > interval:
+            self.stretch = min(SCHEDULER_MAX_STRETCH, self.stretch * 1.25)
+        elif busy < self.frame_s * SCHEDULER_FRAME_BUDGET / 2:
+            self.stretch = max(1.0, self.stretch * 0.9)
+
+    def describe(self):
+        cadences = self.cadences(store["tick_interval_s"])
+        return {
+            "frame_s": self.frame_s,
+            "slice_ms": SCHEDULER_SLICE_S * 1000,
+            "batch": self.batch,
+            "frame_budget": SCHEDULER_FRAME_BUDGET,
+            "stretch": round(self.stretch, 3),
+            "lag_s": round(self.lag_s, 3),
+            "tiers": {
+                name: {"skus": self.tier_counts[i], "cadence_s": round(cadences[i], 2)}
+                for i, name in enumerate(SCHEDULER_TIERS)
+            },
+            "last_frame": self.last_frame,
+            "stats": dict(self.stats),
+        }
 
-        if random.random() < 0.15:
-            sys["wms"] = max(0, sys["wms"] + random.choice([-1, 0, 0, 1]))
 
-        max_listed = max(sys["shopify"], sys["amazon"])
-        physical = sys["wms"]
-        item["true_atp"] = physical
-        item["available"] = max(0, physical - item.get("committed", 0))
+async def simulation_loop():
+    """Background task driving the current tenant's refresh scheduler every frame."""
+    scheduler = store["scheduler"] = RefreshScheduler()
+    delay = scheduler.frame_s
+    while True:
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        await scheduler.run_frame()
+        # Frames start on a fixed cadence; a slow frame shortens the next sleep instead of drifting.
+        delay = max(0.0, scheduler.frame_s - (time.perf_counter() - started))
+
+
+# ── Channel webhook ingestion ─────────────────────────────────────────
+def new_ingest_state():
+    return {
+        "pending": {},
+        "last_seq": {},
+        "flush_handle": None,
+        "stats": {
+            "events_received": 0,
+            "events_applied": 0,
+            "coalesced": 0,
+            "stale": 0,
+            "rejected": 0,
+            "unknown_sku": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush": None,
+            "lag_ms_last": 0.0,
+            "lag_ms_max": 0.0,
+            "lag_ms_avg": 0.0,
+            "source_lag_ms_last": None,
+        },
+    }
+
+
+def _validate_channel_event(event):
+    if not isinstance(event, dict):
+        raise ValueError("event is not an object")
+    sku = str(event.get("sku") or "").strip()
+    channel = str(event.get("channel") or "").strip().lower()
+    if not sku:
+        raise ValueError("missing sku")
+    if channel not in CHANNELS:
+        raise ValueError(f"unknown channel: {channel or None}")
+    try:
+        count = int(event["count"])
+        seq = int(event["seq"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("count and seq must be integers")
+    if count < 0:
+        raise ValueError("count must be >= 0")
+    ts = event.get("ts")
+    return sku, channel, count, seq, float(ts) if isinstance(ts, (int, float)) else None
+
+
+def stage_channel_events(events, received_at=None):
+    """Buffer events, keeping only the highest sequence per SKU/channel."""
+    state = store["ingest"]
+    stats = state["stats"]
+    pending = state["pending"]
+    last_seq = state["last_seq"]
+    received_at = received_at or time.time()
+    accepted, rejected, errors = 0, 0, []
+
+    for pos, event in enumerate(events):
+        stats["events_received"] += 1
+        try:
+            sku, channel, count, seq, ts = _validate_channel_event(event)
+        except ValueError as e:
+            stats["rejected"] += 1
+            rejected += 1
+            if len(errors) < 20:
+                errors.append({"index": pos, "error": str(e)})
+            continue
+        key = (sku, channel)
+        if seq <= last_seq.get(key, -1):
+            stats["stale"] += 1
+            continue
+        queued = pending.get(key)
+        if queued is not None:
+            stats["coalesced"] += 1
+            if queued["seq"] >= seq:
+                continue
+        pending[key] = {"count": count, "seq": seq, "ts": ts, "received_at": received_at}
+        accepted += 1
+    return {"accepted": accepted, "rejected": rejected, "errors": errors}
+
+
+def flush_channel_ingest():
+    """Apply all buffered counts in one pass and recompute each touched SKU once."""
+    state = store["ingest"]
+    state["flush_handle"] = None
+    pending = state["pending"]
+    if not pending:
+        return 0
+    state["pending"] = {}
+    stats = state["stats"]
+    last_seq = state["last_seq"]
+    now = time.time()
 
-        gap = max_listed - physical
-        if gap > 5:
-            item["discrepancy"] = True
-            item["risk_value"] = max(0, int(gap * item.get("unit_cost", 25) * 12))
+    touched = {}
+    applied = 0
+    oldest_received = now
+    newest_source_ts = None
+    for (sku, channel), event in pending.items():
+        item = _find_item_by_sku(sku)
+        if item is None:
+            stats["unknown_sku"] += 1
+            continue
+        item["systems"][channel] = event["count"]
+        last_seq[(sku, channel)] = event["seq"]
+        touched[sku] = item
+        applied += 1
+        oldest_received = min(oldest_received, event["received_at"])
+        if event["ts"] is not None:
+            newest_source_ts = max(newest_source_ts or 0, event["ts"])
+
+    for item in touched.values():
+        refresh_item_state(item)
+    observe_demand(touched.values(), now)
+    apply_alert_rules(touched.values(), now)
+
+    # Webhook delivery latency per channel feeds connector telemetry.
+    for (sku, channel), event in pending.items():
+        if sku in touched:
+            sent_at = event["ts"] if event["ts"] is not None else event["received_at"]
+            record_connector_sample(channel, max(0.0, now - sent_at) * 1000, at=now)
+    refresh_connections(now)
+
+    lag_ms = round((now - oldest_received) * 1000, 2)
+    stats["events_applied"] += applied
+    stats["batches"] += 1
+    stats["last_batch_size"] = applied
+    stats["last_flush"] = now
+    stats["lag_ms_last"] = lag_ms
+    stats["lag_ms_max"] = max(stats["lag_ms_max"], lag_ms)
+    stats["lag_ms_avg"] = round(lag_ms if stats["batches"] == 1 else 0.9 * stats["lag_ms_avg"] + 0.1 * lag_ms, 2)
+    if newest_source_ts is not None:
+        stats["source_lag_ms_last"] = round(max(0.0, now - newest_source_ts) * 1000, 2)
+    if touched:
+        touch_store(now=now)
+    return applied
+
+
+def schedule_ingest_flush():
+    state = store["ingest"]
+    if state["flush_handle"] is None and state["pending"]:
+        loop = asyncio.get_running_loop()
+        state["flush_handle"] = loop.call_later(INGEST_WINDOW_MS / 1000, flush_channel_ingest)
+
+
+# ── Returns ledger ────────────────────────────────────────────────────
+RETURN_AGE_BUCKETS = (7, 14, 30, 60)
+# Inspected grades that can go straight back on the shelf; C and ungraded batches need a decision per batch.
+RESELLABLE_GRADES = ("A", "B")
+
+
+class ReturnsLedger:
+    """Itemized return batches indexed by SKU, grade and intake time.
+
+    ``summary`` is the dict served as ``data["returns"]``. Its aggregates are
+    updated in place on every change and its ``items`` list is edited by
+    position, so intake and release never rescan the backlog. Each batch
+    keeps its ``received_at`` (derived from ``days`` at intake when absent);
+    ``days`` is recomputed from it by ``refresh_ages`` as of ``as_of``.
+    """
+
+    def __init__(self, items=(), now=None):
+        self.as_of = now or time.time()
+        self.summary = {"in_limbo": 0, "total_frozen_value": 0, "average_days_stuck": 0, "items": []}
+        self.pos = {}
+        self.by_sku = {}
+        self.by_grade = {}
+        self.by_age = []  # sorted (received_at, id): oldest first
+        self.days_total = 0
+        self.released = {"batches": 0, "units": 0, "value": 0}
+        self.revision = 0
+        self._prefix = None
+        self._next_rollover = float("inf")
+        # Bulk load: last row per ID wins, and the age index is sorted once at the end.
+        for item in {item["id"]: item for item in items}.values():
+            self.upsert(item, _bulk=True)
+        self.by_age.sort()
+
+    def __len__(self):
+        return len(self.pos)
+
+    def get(self, return_id):
+        pos = self.pos.get(return_id)
+        return None if pos is None else self.summary["items"][pos]
+
+    def _age(self, received_at):
+        return int(self.as_of - received_at) // 86400
+
+    def _adjust(self, qty, value, days, count):
+        summary = self.summary
+        summary["in_limbo"] += qty
+        summary["total_frozen_value"] += value
+        self.days_total += days * count
+        n = len(self.pos)
+        summary["average_days_stuck"] = round(self.days_total / n) if n else 0
+        self.revision += 1
+        self._prefix = None
+
+    def upsert(self, item, _bulk=False):
+        return_id = item["id"]
+        if return_id in self.pos:
+            self._remove(return_id)
+        received_at = item.get("received_at")
+        if received_at is None:
+            received_at = int(self.as_of) - int(item.get("days", 0)) * 86400
+        item = dict(item, received_at=received_at, days=self._age(received_at))
+        items = self.summary["items"]
+        self.pos[return_id] = len(items)
+        items.append(item)
+        self.by_sku.setdefault(item.get("sku"), set()).add(return_id)
+        self.by_grade.setdefault(item.get("grade", "pending"), set()).add(return_id)
+        key = (received_at, return_id)
+        if _bulk:
+            self.by_age.append(key)
+        else:
+            bisect.insort(self.by_age, key)
+        self._next_rollover = min(self._next_rollover, received_at + (item["days"] + 1) * 86400)
+        self._adjust(item.get("qty", 0), item.get("value", 0), item["days"], 1)
+        return item
+
+    def _remove(self, return_id):
+        items = self.summary["items"]
+        pos = self.pos.pop(return_id)
+        item = items[pos]
+        last = items.pop()
+        if last is not item:
+            items[pos] = last
+            self.pos[last["id"]] = pos
+        self.by_sku[item.get("sku")].discard(return_id)
+        self.by_grade[item.get("grade", "pending")].discard(return_id)
+        key = (item["received_at"], return_id)
+        del self.by_age[bisect.bisect_left(self.by_age, key)]
+        self._adjust(-item.get("qty", 0), -item.get("value", 0), -item["days"], 1)
+        return item
+
+    def refresh_ages(self, now=None):
+        """Age every batch to ``now``; returns True when any batch's ``days`` changed.
+
+        Cheap until the next batch crosses a day boundary, so the tick can call it every cycle.
+        """
+        now = now or time.time()
+        if now < self._next_rollover:
+            self.as_of = max(self.as_of, now)
+            return False
+        self.as_of = now
+        items = self.summary["items"]
+        self.days_total = 0
+        self._next_rollover = float("inf")
+        for pos, item in enumerate(items):
+            days = self._age(item["received_at"])
+            if days != item["days"]:
+                # Replace rather than mutate so snapshots holding the old record stay intact.
+                items[pos] = item = dict(item, days=days)
+            self.days_total += days
+            self._next_rollover = min(self._next_rollover, item["received_at"] + (days + 1) * 86400)
+        self._adjust(0, 0, 0, 0)
+        return True
+
+    def release(self, return_id, qty=None):
+        """Take ``qty`` units (default all) out of limbo; returns (units, value) released."""
+        item = self.get(return_id)
+        if item is None:
+            return 0, 0
+        total = item.get("qty", 0)
+        qty = total if qty is None else min(qty, total)
+        if qty >= total:
+            self._remove(return_id)
+            value = item.get("value", 0)
+            self.released["batches"] += 1
         else:
-            item["discrepancy"] = False
-            item["risk_value"] = 0
+            value = round(item.get("value", 0) * qty / total) if total else 0
+            # Replace rather than mutate so snapshots holding the old record stay intact.
+            self.summary["items"][self.pos[return_id]] = dict(item, qty=total - qty, value=item.get("value", 0) - value)
+            self._adjust(-qty, -value, 0, 0)
+        self.released["units"] += qty
+        self.released["value"] += value
+        return qty, value
+
+    def _age_index(self, days):
+        """Position in ``by_age`` where batches at most ``days`` old begin."""
+        return bisect.bisect_right(self.by_age, self.as_of - (days + 1) * 86400, key=lambda key: key[0])
+
+    def ids_for(self, sku=None, grade=None, min_days=None, max_days=None):
+        """Return IDs matching all filters, oldest first, starting from the narrowest index."""
+        lo = 0 if max_days is None else self._age_index(max_days)
+        hi = len(self.by_age) if min_days is None else self._age_index(min_days - 1)
+        candidates = [self.by_sku.get(sku, set())] if sku is not None else []
+        if grade is not None:
+            candidates.append(self.by_grade.get(grade, set()))
+        if not candidates:
+            return [return_id for _, return_id in self.by_age[lo:hi]]
+        smallest = min(candidates, key=len)
+        ids = [i for i in smallest if all(i in c for c in candidates)]
+        if min_days is not None or max_days is not None:
+            low, high = min_days or 0, float("inf") if max_days is None else max_days
+            ids = [i for i in ids if low <= self.get(i)["days"] <= high]
+        ids.sort(key=lambda i: (self.get(i)["received_at"], i))
+        return ids
+
+    def aging(self, bounds=RETURN_AGE_BUCKETS):
+        """Batches/units/value per age bucket via bisect over prefix sums (rebuilt once per change)."""
+        if self._prefix is None:
+            units, value = [0], [0]
+            for _, return_id in self.by_age:
+                item = self.get(return_id)
+                units.append(units[-1] + item.get("qty", 0))
+                value.append(value[-1] + item.get("value", 0))
+            self._prefix = (units, value)
+        units, value = self._prefix
+        # by_age runs oldest first, so the youngest bucket is at the end.
+        edges = [len(self.by_age)] + [self._age_index(b) for b in bounds] + [0]
+        labels = [f"0-{bounds[0]}"] + [f"{a + 1}-{b}" for a, b in zip(bounds, bounds[1:])] + [f"{bounds[-1] + 1}+"]
+        return [
+            {"bucket": label, "batches": hi - lo, "units": units[hi] - units[lo], "value": value[hi] - value[lo]}
+            for label, hi, lo in zip(labels, edges, edges[1:])
+        ]
+
+
+def install_returns(items):
+    """Replace the returns backlog; ``data["returns"]`` becomes the ledger's live summary."""
+    ledger = ReturnsLedger(items)
+    store["returns_ledger"] = ledger
+    store["data"]["returns"] = ledger.summary
+    return ledger
+
+
+def release_returns(target=None, qty=None):
+    """Release returns by batch ID, SKU or everything and credit the units to WMS stock.
+
+    Only ``RESELLABLE_GRADES`` batches are released by SKU or in bulk; a batch
+    of any grade can be released by naming its ID. With ``qty``, units are
+    taken from the oldest matching batches first.
+    """
+    ledger = store["returns_ledger"]
+    released = []  # (sku, units, value)
+    held = []
+    if target is not None and ledger.get(target) is not None:
+        ids = [target]
+    else:
+        ids = []
+        for return_id in ledger.ids_for(sku=target):
+            (ids if ledger.get(return_id).get("grade") in RESELLABLE_GRADES else held).append(return_id)
+    remaining = qty
+    for return_id in ids:
+        if remaining is not None and remaining <= 0:
+            break
+        sku = ledger.get(return_id).get("sku")
+        units, value = ledger.release(return_id, remaining)
+        released.append((sku, units, value))
+        if remaining is not None:
+            remaining -= units
+
+    credited = {}
+    for sku, units, _ in released:
+        credited[sku] = credited.get(sku, 0) + units
+    uncredited = 0
+    for sku, units in list(credited.items()):
+        item = _find_item_by_sku(sku)
+        if item is None:
+            uncredited += credited.pop(sku)
+            continue
+        item["systems"]["wms"] = item["systems"].get("wms", 0) + units
+        rebase_demand(item)
+        refresh_item_state(item)
+    return {
+        "batches": len(released),
+        "units": sum(units for _, units, _ in released),
+        "value": sum(value for _, _, value in released),
+        "credited": credited,
+        "uncredited_units": uncredited,
+        "held_batches": len(held),
+        "held_units": sum(ledger.get(i).get("qty", 0) for i in held),
+    }
 
-        # Deduplicate: check if a similar alert already exists for this SKU in recent alerts
-        recent_sku_alerts = [a for a in store["alerts"][:10] if a.get("sku") == item["id"]]
-        has_reorder_alert = any("reorder" in a.get("message", "").lower() for a in recent_sku_alerts)
-        has_gap_alert = any("gap" in a.get("message", "").lower() for a in recent_sku_alerts)
 
-        reorder = item.get("reorder_point", 50)
-        if item["available"] <= reorder and item["available"] > 0 and random.random() < 0.03 and not has_reorder_alert:
-            alert_counter += 1
-            store["alerts"].insert(0, {
-                "id": f"SIM-{alert_counter}",
-                "type": "WARNING",
-                "message": f"{item['name']} approaching reorder point — {item['available']} available vs {reorder} threshold",
-                "risk": item["risk_value"],
-                "action": None,
-                "sku": item["id"],
-                "time": "just now",
-            })
+# ── Catalog import (streaming NDJSON / CSV) ────────────────────────────
+CATALOG_CHUNK_BYTES = 64 * 1024
+CATALOG_MAX_REPORTED_ERRORS = 50
+CATALOG_KINDS = ("inventory", "tariff", "return")
+
+
+class CatalogRowError(ValueError):
+    pass
+
+
+def _infer_catalog_kind(row):
+    """Pick the record kind from an explicit field or from the columns present."""
+    kind = str(row.get("kind") or row.get("type") or "").strip().lower()
+    if kind in ("inventory", "sku", "item"):
+        return "inventory"
+    if kind in ("tariff", "tariffs"):
+        return "tariff"
+    if kind in ("return", "returns"):
+        return "return"
+    if "current_rate" in row or ("country" in row and "rate" in row):
+        return "tariff"
+    if "qty" in row and "value" in row:
+        return "return"
+    if "systems" in row or "wms" in row:
+        return "inventory"
+    raise CatalogRowError("cannot determine record kind")
+
+
+def _row_number(row, key, cast=int, default=None, minimum=0):
+    raw = row.get(key)
+    if raw is None or raw == "":
+        if default is None:
+            raise CatalogRowError(f"missing {key}")
+        return default
+    try:
+        value = cast(float(raw)) if cast is int else cast(raw)
+    except (TypeError, ValueError):
+        raise CatalogRowError(f"{key} is not numeric: {raw!r}")
+    if minimum is not None and value < minimum:
+        raise CatalogRowError(f"{key} must be >= {minimum}")
+    return value
+
+
+def _row_text(row, key, default=None):
+    value = str(row.get(key) or "").strip()
+    if not value:
+        if default is None:
+            raise CatalogRowError(f"missing {key}")
+        return default
+    return value
+
+
+def _parse_inventory_row(row):
+    sku = _row_text(row, "id", default="") or _row_text(row, "sku")
+    counts = row.get("systems") if isinstance(row.get("systems"), dict) else row
+    item = InventoryRecord({
+        "id": sku,
+        "name": _row_text(row, "name", default=sku),
+        "category": _row_text(row, "category", default="Uncategorized"),
+        "systems": {ch: _row_number(counts, ch, default=0) for ch in CHANNELS},
+        "true_atp": 0,
+        "committed": _row_number(row, "committed", default=0),
+        "available": 0,
+        "discrepancy": False,
+        "risk_value": 0,
+        "country_of_origin": _row_text(row, "country_of_origin", default="Unknown"),
+        "lead_time_days": _row_number(row, "lead_time_days", default=30, minimum=1),
+        "reorder_point": _row_number(row, "reorder_point", default=50),
+        "unit_cost": _row_number(row, "unit_cost", cast=float),
+    })
+    refresh_item_state(item)
+    return item
+
+
+def _parse_tariff_row(row):
+    country = _row_text(row, "country")
+    current = _row_number(row, "current_rate", cast=float)
+    if isinstance(row.get("scenarios"), list):
+        scenarios = row["scenarios"]
+    elif row.get("rate") not in (None, ""):
+        scenarios = [{
+            "name": _row_text(row, "scenario", default="Scenario"),
+            "rate": _row_number(row, "rate", cast=float),
+            "effective_date": _row_text(row, "effective_date", default="TBD"),
+        }]
+    else:
+        scenarios = []
+    return {"country": country, "current_rate": current, "scenarios": scenarios}
 
-        if item["discrepancy"] and gap > 20 and random.random() < 0.04 and not has_gap_alert:
-            alert_counter += 1
-            store["alerts"].insert(0, {
-                "id": f"SIM-{alert_counter}",
-                "type": "CRITICAL",
-                "message": f"{item['name']}: {gap}-unit gap detected — {channel_name(max_listed, sys)} vs WMS ({physical})",
-                "risk": item["risk_value"],
-                "action": "sync_inventory",
-                "sku": item["id"],
-                "time": "just now",
-            })
 
-    # Update connection latency slightly
-    for key in store["connections"]:
-        conn = store["connections"][key]
-        conn["latency_ms"] = max(10, conn["latency_ms"] + random.randint(-15, 15))
-        if random.random() < 0.02:
-            conn["status"] = "degraded" if conn["status"] == "connected" else "connected"
-        conn["last_sync"] = time.time() - random.randint(5, 120)
+def _parse_return_row(row):
+    return {
+        "id": _row_text(row, "id"),
+        "sku": _row_text(row, "sku"),
+        "qty": _row_number(row, "qty"),
+        "value": _row_number(row, "value"),
+        "days": _row_number(row, "days", default=0),
+        "reason": _row_text(row, "reason", default="Unspecified"),
+        "grade": _row_text(row, "grade", default="pending"),
+    }
 
-    store["alerts"] = store["alerts"][:25]
-    store["last_update"] = time.time()
 
+CATALOG_ROW_PARSERS = {
+    "inventory": _parse_inventory_row,
+    "tariff": _parse_tariff_row,
+    "return": _parse_return_row,
+}
 
-def channel_name(max_val, sys):
-    if sys["shopify"] == max_val:
-        return f"Shopify ({sys['shopify']})"
-    return f"Amazon ({sys['amazon']})"
 
+class CatalogLoader:
+    """Incremental NDJSON/CSV parser that builds store-ready lists and indexes.
+
+    Chunks of bytes or text are fed as they arrive; only the trailing partial
+    line is buffered, so memory stays proportional to the catalog itself.
+    Repeated SKU, country or return IDs upsert in place.
+    """
+
+    def __init__(self, fmt="ndjson", kind=None):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported catalog format: {fmt}")
+        self.fmt = fmt
+        self.kind = kind
+        self.inventory = []
+        self.sku_index = {}
+        self.tariffs = []
+        self.tariff_index = {}
+        self.returns = []
+        self.return_index = {}
+        self.rows = 0
+        self.rejected = 0
+        self.errors = []
+        self._line_no = 0
+        self._pending = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._csv_lines = []
+        self._csv_quotes = 0
+        self._csv_start = 0
+        self._csv_header = None
+
+    def feed(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        text = self._pending + chunk
+        lines = text.split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._feed_line(line + "\n")
+
+    def close(self):
+        tail = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if tail:
+            self._feed_line(tail)
+        if self._csv_lines:
+            self.rows += 1
+            self._reject(self._csv_start, "unterminated quoted field")
+            self._csv_lines = []
+        return self
+
+    def _feed_line(self, line):
+        self._line_no += 1
+        if self.fmt == "csv":
+            self._feed_csv_line(line)
+            return
+        if not line.strip():
+            return
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise CatalogRowError("row is not an object")
+        except (ValueError, CatalogRowError) as e:
+            self._reject(self._line_no, e)
+            return
+        self._add_row(self._line_no, row)
+
+    def _feed_csv_line(self, line):
+        if not self._csv_lines:
+            self._csv_start = self._line_no
+        self._csv_lines.append(line)
+        self._csv_quotes += line.count('"')
+        if self._csv_quotes % 2:
+            return  # inside a quoted field that continues on the next line
+        record = next(csv.reader(self._csv_lines), [])
+        self._csv_lines = []
+        self._csv_quotes = 0
+        if not any(field.strip() for field in record):
+            return
+        if self._csv_header is None:
+            self._csv_header = [field.strip().lower() for field in record]
+            return
+        row = dict(zip(self._csv_header, (field.strip() for field in record)))
+        self._add_row(self._csv_start, row)
+
+    def _add_row(self, line_no, row):
+        self.rows += 1
+        try:
+            kind = self.kind or _infer_catalog_kind(row)
+            parsed = CATALOG_ROW_PARSERS[kind](row)
+        except (CatalogRowError, KeyError) as e:
+            self._reject(line_no, e)
+            return
+        if kind == "inventory":
+            self._upsert(self.inventory, self.sku_index, parsed["id"], parsed)
+        elif kind == "tariff":
+            pos = self.tariff_index.get(parsed["country"])
+            if pos is not None and not isinstance(row.get("scenarios"), list):
+                # CSV tariffs carry one scenario per row; accumulate them per country.
+                existing = self.tariffs[pos]
+                existing["current_rate"] = parsed["current_rate"]
+                existing["scenarios"].extend(parsed["scenarios"])
+            else:
+                self._upsert(self.tariffs, self.tariff_index, parsed["country"], parsed)
+        else:
+            self._upsert(self.returns, self.return_index, parsed["id"], parsed)
+
+    @staticmethod
+    def _upsert(rows, index, key, value):
+        pos = index.get(key)
+        if pos is None:
+            index[key] = len(rows)
+            rows.append(value)
+        else:
+            rows[pos] = value
+
+    def _reject(self, line_no, error):
+        self.rejected += 1
+        if len(self.errors) < CATALOG_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": str(error)})
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "loaded": {
+                "inventory": len(self.inventory),
+                "tariffs": len(self.tariffs),
+                "returns": len(self.returns),
+            },
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
 
-async def simulation_loop():
-    """Background task that ticks every 5 seconds."""
-    while True:
-        await asyncio.sleep(5)
-        simulate_tick()
+
+def catalog_format_for_path(path):
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def load_catalog_file(path, loader=None):
+    """Stream a catalog file from disk in fixed-size chunks."""
+    loader = loader or CatalogLoader(catalog_format_for_path(path))
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CATALOG_CHUNK_BYTES)
+            if not chunk:
+                break
+            loader.feed(chunk)
+    return loader.close()
+
+
+def summarize_returns(items):
+    units = sum(r.get("qty", 0) for r in items)
+    return {
+        "in_limbo": units,
+        "total_frozen_value": sum(r.get("value", 0) for r in items),
+        "average_days_stuck": round(sum(r.get("days", 0) for r in items) / len(items)) if items else 0,
+        "items": items,
+    }
+
+
+def rebuild_sku_index():
+    store["sku_index"] = {item["id"]: pos for pos, item in enumerate(store["data"].get("inventory", []))}
+
+
+def install_catalog(loader, mode="replace"):
+    """Move parsed catalog rows into the live store without copying them again."""
+    data = store["data"]
+    if mode == "replace":
+        if loader.inventory:
+            data["inventory"] = loader.inventory
+            store["sku_index"] = loader.sku_index
+        if loader.tariffs:
+            data["tariffs"] = loader.tariffs
+        if loader.returns:
+            install_returns(loader.returns)
+    else:
+        inventory = data.setdefault("inventory", [])
+        index = store["sku_index"]
+        for item in loader.inventory:
+            CatalogLoader._upsert(inventory, index, item["id"], item)
+        tariffs = data.setdefault("tariffs", [])
+        tariff_index = {t["country"]: pos for pos, t in enumerate(tariffs)}
+        for tariff in loader.tariffs:
+            CatalogLoader._upsert(tariffs, tariff_index, tariff["country"], tariff)
+        ledger = store["returns_ledger"]
+        for ret in loader.returns:
+            ledger.upsert(ret)
+
+    if loader.inventory:
+        # New or changed SKUs need fresh history; rebuild lazily on next access.
+        store["history"] = {}
+        store["history_rollups"] = None
+        store["history_ready"] = False
+        store["history_spill"] = None
+        store["spike_detector"] = None
+        store["dirty_all"] = True
+    touch_store("tariffs", "returns", "history")
+
+
+# ── Versioned snapshots ───────────────────────────────────────────────
+# Inventory snapshots are tuples of fixed-size chunks. A new snapshot copies
+# only the records marked dirty and rebuilds only their chunks, so unchanged
+# chunks (and tariffs/returns while their section is unchanged) are shared.
+SNAPSHOT_CHUNK = 256
+
+
+class Snapshot:
+    """Immutable view of the store at one version; never mutate its contents."""
+
+    __slots__ = (
+        "version", "ts", "size", "chunks", "sku_index", "alerts", "tariffs", "tariffs_version",
+        "returns", "returns_version", "connections", "supplier_risks", "demo_mode", "last_update",
+        "_tariff_index",
+    )
+
+    def items(self):
+        return [item for chunk in self.chunks for item in chunk]
+
+    def find_item(self, sku_id):
+        pos = self.sku_index.get(sku_id) if sku_id else None
+        if pos is None or pos >= self.size:
+            return None
+        return self.chunks[pos // SNAPSHOT_CHUNK][pos % SNAPSHOT_CHUNK]
+
+    def data(self):
+        return {"inventory": self.items(), "tariffs": self.tariffs, "returns": self.returns}
+
+    def tariff_index(self):
+        if self._tariff_index is None:
+            self._tariff_index = TariffIndex(self.items())
+        return self._tariff_index
+
+
+class SnapshotLog:
+    """Snapshots in version order, pruned to a time window and capped by count and record copies.
+
+    Only the tick appends here. ``head`` holds the one unretained snapshot
+    that reads of a newer version are served from until the next tick.
+    """
+
+    def __init__(self, retention_s=SNAPSHOT_RETENTION_S, max_count=SNAPSHOT_MAX_COUNT, max_records=SNAPSHOT_MAX_RECORDS):
+        self.retention_s = retention_s
+        self.max_count = max_count
+        self.max_records = max_records
+        self.snapshots = []
+        self.versions = []
+        self.timestamps = []
+        self.fresh = []  # records in chunks each snapshot does not share with the one before it
+        self.records = 0
+        self.thinned = 0
+        self.head = None
+
+    def latest(self):
+        return self.snapshots[-1] if self.snapshots else None
+
+    @staticmethod
+    def _fresh(prev, snap):
+        shared = {id(chunk) for chunk in prev.chunks} if prev is not None else set()
+        return sum(len(chunk) for chunk in snap.chunks if id(chunk) not in shared)
+
+    def append(self, snap):
+        fresh = self._fresh(self.latest(), snap)
+        self.snapshots.append(snap)
+        self.versions.append(snap.version)
+        self.timestamps.append(snap.ts)
+        self.fresh.append(fresh)
+        self.records += fresh
+        self.head = None
+        cut = min(bisect.bisect_left(self.timestamps, snap.ts - self.retention_s), len(self.snapshots) - 1)
+        if cut > 0:
+            self._keep(range(cut, len(self.snapshots)))
+        while len(self.snapshots) > 1 and (len(self.snapshots) > self.max_count or self.records > self.max_records):
+            self._thin()
+
+    def _thin(self):
+        """Drop every other snapshot from the older half, so old history gets coarser instead of vanishing."""
+        n = len(self.snapshots)
+        older = n // 2
+        drop = set(range(1, older, 2)) or {0}
+        self.thinned += len(drop)
+        self._keep(i for i in range(n) if i not in drop)
+
+    def _keep(self, indices):
+        # Chunks are shared by runs of consecutive snapshots, so a snapshot's fresh
+        # records only change when its predecessor does.
+        indices = list(indices)
+        kept = [self.snapshots[i] for i in indices]
+        fresh = []
+        for pos, i in enumerate(indices):
+            same_prev = pos > 0 and indices[pos - 1] == i - 1
+            fresh.append(self.fresh[i] if same_prev else self._fresh(kept[pos - 1] if pos else None, kept[pos]))
+        self.snapshots = kept
+        self.versions = [self.versions[i] for i in indices]
+        self.timestamps = [self.timestamps[i] for i in indices]
+        self.fresh = fresh
+        self.records = sum(fresh)
+
+    def at_version(self, version):
+        i = bisect.bisect_right(self.versions, version) - 1
+        return self.snapshots[i] if i >= 0 else None
+
+    def at_time(self, ts):
+        i = bisect.bisect_right(self.timestamps, ts) - 1
+        return self.snapshots[i] if i >= 0 else None
+
+    def stats(self):
+        chunk_refs = sum(len(snap.chunks) for snap in self.snapshots)
+        unique_chunks = {id(chunk): len(chunk) for snap in self.snapshots for chunk in snap.chunks}
+        return {
+            "count": len(self.snapshots),
+            "retention_s": self.retention_s,
+            "oldest": {"version": self.versions[0], "ts": self.timestamps[0]} if self.snapshots else None,
+            "newest": {"version": self.versions[-1], "ts": self.timestamps[-1]} if self.snapshots else None,
+            "chunk_refs": chunk_refs,
+            "unique_chunks": len(unique_chunks),
+            "unique_records": sum(unique_chunks.values()),
+            "max_count": self.max_count,
+            "max_records": self.max_records,
+            "thinned": self.thinned,
+        }
+
+
+def _freeze_item(item):
+    if isinstance(item, InventoryRecord):
+        return item.copy()
+    return dict(item, systems=dict(item["systems"]))
+
+
+def record_snapshot(now=None):
+    """Append a snapshot of the current version to the retained log; called once per tick."""
+    log = store["snapshots"]
+    prev = log.latest()
+    if prev is not None and prev.version == store["version"]:
+        return prev
+    snap = log.head if log.head is not None and log.head.version == store["version"] else _build_snapshot(prev, now)
+    store["dirty_skus"] = set()
+    store["dirty_all"] = False
+    log.append(snap)
+    return snap
+
+
+def current_snapshot():
+    """Immutable view of the current version for request handlers, without retaining it.
+
+    Built from the latest retained snapshot plus everything dirtied since, and
+    reused by every read until the version moves; the dirty set is left for
+    the tick's ``record_snapshot``.
+    """
+    log = store["snapshots"]
+    prev = log.latest()
+    if prev is not None and prev.version == store["version"]:
+        return prev
+    if log.head is None or log.head.version != store["version"]:
+        log.head = _build_snapshot(prev)
+    return log.head
+
+
+def _build_snapshot(prev, now=None):
+    """Snapshot of the live store sharing every chunk and section ``prev`` still matches."""
+    data = store["data"]
+    inventory = data.get("inventory", [])
+    versions = store["section_versions"]
+
+    with span("snapshot"):
+        snap = Snapshot()
+        snap.version = store["version"]
+        snap.ts = now or time.time()
+        snap.size = len(inventory)
+        snap.sku_index = store["sku_index"]
+        if prev is None or store["dirty_all"] or prev.size != len(inventory):
+            snap.chunks = tuple(
+                tuple(_freeze_item(item) for item in inventory[start:start + SNAPSHOT_CHUNK])
+                for start in range(0, len(inventory), SNAPSHOT_CHUNK)
+            )
+        else:
+            chunks = list(prev.chunks)
+            by_chunk = {}
+            for sku in store["dirty_skus"]:
+                pos = store["sku_index"].get(sku)
+                if pos is not None and pos < len(inventory):
+                    by_chunk.setdefault(pos // SNAPSHOT_CHUNK, []).append(pos)
+            for c, positions in by_chunk.items():
+                chunk = list(chunks[c])
+                for pos in positions:
+                    chunk[pos % SNAPSHOT_CHUNK] = _freeze_item(inventory[pos])
+                chunks[c] = tuple(chunk)
+            snap.chunks = tuple(chunks)
+
+        snap.tariffs_version = versions.get("tariffs", 0)
+        if prev is not None and prev.tariffs_version == snap.tariffs_version:
+            snap.tariffs = prev.tariffs
+        else:
+            snap.tariffs = [dict(t, scenarios=[dict(sc) for sc in t.get("scenarios") or []]) for t in data.get("tariffs", [])]
+        snap.returns_version = versions.get("returns", 0)
+        if prev is not None and prev.returns_version == snap.returns_version:
+            snap.returns = prev.returns
+        else:
+            returns = data.get("returns", {})
+            snap.returns = dict(returns, items=list(returns.get("items", [])))
+        snap.alerts = tuple(store["alerts"])
+        snap.connections = {name: dict(conn) for name, conn in store["connections"].items()}
+        snap.supplier_risks = supplier_risk_leaderboard()
+        snap.demo_mode = bool(store.get("demo_mode"))
+        snap.last_update = store["last_update"]
+        snap._tariff_index = None
+    return snap
+
+
+def resolve_snapshot(at):
+    """Find the retained snapshot for ``at``: a Unix timestamp (>= 1e9) or a store version."""
+    try:
+        value = float(at)
+    except (TypeError, ValueError):
+        return None
+    log = store["snapshots"]
+    return log.at_time(value) if value >= 1e9 else log.at_version(int(value))
 
 
 # ── App lifecycle ─────────────────────────────────────────────────────
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    seed = load_seed_data()
-    store["data"] = copy.deepcopy(seed)
-    store["alerts"] = copy.deepcopy(seed.get("alerts", []))
+def initialize_store(seed):
+    """Reset the store around a freshly parsed seed/catalog dict."""
+    # The seed dict is owned by the store from here on, so no deep copy;
+    # alerts get their own list since they are mutated independently.
+    if "inventory" in seed:
+        seed["inventory"] = [InventoryRecord.from_dict(item) for item in seed["inventory"]]
+    store["data"] = seed
+    store["alerts"] = [dict(alert) for alert in seed.get("alerts", [])]
     store["boot_time"] = time.time()
     store["last_update"] = time.time()
-    store["history"] = generate_history(seed.get("inventory", []))
+    store["version"] = 0
+    store["section_versions"] = {}
+    store["fragments"] = {}
+    store["response_cache"] = {}
+    store["inflight"] = {}
+    store["tariff_index"] = None
+    store["replenishment"] = {}
+    store["history"] = {}
+    store["history_rollups"] = None
+    store["history_ready"] = False
     store["connections"] = generate_connections()
     store["demo_mode"] = False
     store["supplier_risks"] = {}
+    store["ingest"] = new_ingest_state()
+    install_returns(seed.get("returns", {}).get("items", []))
+    rebuild_sku_index()
+    store["dirty_skus"] = set()
+    store["dirty_all"] = True
+    store["alert_rules"] = AlertRuleEngine(load_alert_rule_specs())
+    store["spike_detector"] = SpikeDetector()
+    store["snapshots"] = SnapshotLog()
+    record_snapshot()
+
+
+def load_tenant_store(catalog_paths=(), phases=None):
+    """Fill the current tenant's store from its catalog files, or the seed JSON when none are given."""
+    phases = {} if phases is None else phases
+    started = time.perf_counter()
+    seed = {} if catalog_paths else load_seed_data()
+    phases["seed_load"] = round((time.perf_counter() - started) * 1000, 2)
+
+    started = time.perf_counter()
+    initialize_store(seed)
+    phases["store_init"] = round((time.perf_counter() - started) * 1000, 2)
+
+    if catalog_paths:
+        started = time.perf_counter()
+        seed.update({"inventory": [], "tariffs": []})
+        install_returns([])
+        for path in catalog_paths:
+            loader = load_catalog_file(path)
+            install_catalog(loader, mode="merge")
+        phases["catalog_load"] = round((time.perf_counter() - started) * 1000, 2)
+    return phases
+
+
+def start_tenant(tenant_id, company=None, catalog_paths=(), tick_interval_s=None):
+    """Create a tenant, load its data and start its simulation and history tasks."""
+    tenants[tenant_id] = new_store_state(tenant_id, company or COMPANY_NAME, tick_interval_s or SIMULATION_INTERVAL_S)
+    with tenant_context(tenant_id) as state:
+        load_tenant_store(catalog_paths)
+        state["tasks"] = [asyncio.create_task(simulation_loop()), asyncio.create_task(warm_history())]
+    metrics["gauges"]["tenants"] = len(tenants)
+    return tenants[tenant_id]
+
+
+def stop_tenant(tenant_id):
+    """Cancel a tenant's background tasks and flush any webhook events still pending."""
+    with tenant_context(tenant_id) as state:
+        for task in state["tasks"]:
+            task.cancel()
+        state["tasks"] = []
+        if state["ingest"].get("flush_handle"):
+            state["ingest"]["flush_handle"].cancel()
+            flush_channel_ingest()
+
+
+def load_tenant_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    entries = config.get("tenants", []) if isinstance(config, dict) else config
+    for entry in entries:
+        if not TENANT_ID_RE.match(str(entry.get("id", ""))):
+            raise ValueError(f"Invalid tenant id in {path}: {entry.get('id')!r}")
+    return entries
+
+
+# Store keys grouped for memory accounting; shared objects are counted once, first section wins.
+MEMORY_SECTIONS = {
+    "data": ("data", "sku_index"),
+    "history": ("history", "history_rollups", "spike_detector"),
+    "alerts": ("alerts",),
+    "snapshots": ("snapshots",),
+    "returns": ("returns_ledger",),
+    "caches": ("response_cache", "fragments", "tariff_index", "replenishment"),
+    "telemetry": ("telemetry", "connections"),
+}
+
+
+def deep_sizeof(obj, seen):
+    """Approximate bytes retained by ``obj``, skipping objects already in ``seen``."""
+    traversable = (InventoryRecord, HistoryRollups, DemandRollup, SpikeDetector, Snapshot, SnapshotLog, ReturnsLedger, TariffIndex, QuantileSketch, ConnectorTelemetry)
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, traversable):
+            if hasattr(o, "__dict__"):
+                stack.append(o.__dict__)
+            stack.extend(getattr(o, name) for name in getattr(type(o), "__slots__", ()) if hasattr(o, name))
+    return total
+
+
+def tenant_memory(state):
+    """Per-section byte estimates for one tenant (walks every object, so not for hot paths)."""
+    seen = set()
+    sections = {name: sum(deep_sizeof(state.get(key), seen) for key in keys) for name, keys in MEMORY_SECTIONS.items()}
+    accounted = {key for keys in MEMORY_SECTIONS.values() for key in keys} | {"tasks", "history_lock"}
+    sections["other"] = sum(deep_sizeof(v, seen) for k, v in state.items() if k not in accounted)
+    return {"total_bytes": sum(sections.values()), "sections": sections}
+
+
+def tenant_summary(state, memory=False):
+    summary = {
+        "id": state["tenant"],
+        "company": state["company"],
+        "skus": len(state["data"].get("inventory", [])),
+        "version": state["version"],
+        "tick_interval_s": state["tick_interval_s"],
+        "history_ready": state["history_ready"],
+        "history_spilled": bool(state["history_spill"]) and not state["history_ready"],
+        "idle_s": round(time.time() - state["last_access"], 1),
+    }
+    if memory:
+        summary["memory"] = tenant_memory(state)
+    return summary
 
-    task = asyncio.create_task(simulation_loop())
+
+async def evict_idle_tenants():
+    """Spill history of tenants with no recent requests; it is reloaded on next use."""
+    while True:
+        await asyncio.sleep(min(60.0, TENANT_IDLE_S))
+        now = time.time()
+        for state in list(tenants.values()):
+            if state["history_ready"] and now - state["last_access"] > TENANT_IDLE_S:
+                if await asyncio.to_thread(spill_history, state):
+                    metrics["counters"]["tenant_history_spills"] += 1
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    boot_started = time.perf_counter()
+    phases = startup_report["phases_ms"]
+    phases.clear()
+    phases["imports"] = round((_APP_T0 - _PROCESS_T0) * 1000, 2)
+
+    with tenant_context(DEFAULT_TENANT) as state:
+        load_tenant_store([p for p in CATALOG_PATH.split(os.pathsep) if p], phases)
+        store["loop_thread_ident"] = threading.get_ident()
+        state["tasks"] = [asyncio.create_task(simulation_loop()), asyncio.create_task(warm_history())]
+    if TENANTS_PATH:
+        for entry in load_tenant_config(TENANTS_PATH):
+            catalog = entry.get("catalog") or ""
+            paths = catalog if isinstance(catalog, list) else [p for p in catalog.split(os.pathsep) if p]
+            start_tenant(entry["id"], entry.get("company"), paths, entry.get("tick_interval_s"))
+    metrics["gauges"]["tenants"] = len(tenants)
+
+    tasks = [
+        asyncio.create_task(monitor_event_loop_lag()),
+        asyncio.create_task(evict_idle_tenants()),
+    ]
+    # Time from lifespan entry to serving; module imports are reported separately.
+    startup_report["ready_ms"] = round((time.perf_counter() - boot_started) * 1000, 2)
     yield
-    task.cancel()
+    for task in tasks:
+        task.cancel()
+    profiler.stop()
+    for tenant_id in list(tenants):
+        stop_tenant(tenant_id)
+        if tenant_id != DEFAULT_TENANT:
+            del tenants[tenant_id]
 
 
 app = FastAPI(title="NexusLink API", lifespan=lifespan)
+_APP_T0 = time.perf_counter()
 
+app.add_middleware(TenantMiddleware)
+app.add_middleware(TimingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -643,7 +4251,7 @@ app.add_middleware(
 
 
 # ── System prompt ─────────────────────────────────────────────────────
-SYSTEM_PROMPT = """You are NexusLink AI, an expert supply chain intelligence assistant for Ridgeline Outdoor Co.
+SYSTEM_PROMPT = """You are NexusLink AI, an expert supply chain intelligence assistant for {company}.
 
 You have real-time access to the company's unified data fabric including inventory positions across all channels (Shopify, Amazon, WMS, POS), tariff schedules, and returns pipeline.
 
@@ -653,7 +4261,8 @@ Here is the current LIVE data (updates every 5 seconds):
 
 AVAILABLE ACTIONS you can recommend the user trigger:
 - sync_inventory:<SKU-ID> — Syncs all channel counts to match WMS for a specific SKU
-- release_returns — Releases inspected returns back into sellable ATP
+- release_returns — Releases inspected grade A/B returns back into sellable ATP
+- release_returns:<SKU-ID|RET-ID>[:<qty>] — Releases one SKU's grade A/B returns, or one batch of any grade (optionally only qty units, oldest first), into WMS stock
 - pause_channel:<channel>:<SKU-ID> — Pauses listing on a specific channel for a SKU
 
 When recommending an action, include the exact action string so the user can trigger it.
@@ -678,58 +4287,281 @@ async def root():
 
 
 @app.get("/inventory")
-async def get_inventory():
+async def get_inventory(request: Request, at: str | None = None):
     data = store["data"]
     if not data:
         return {"error": "Data model not yet initialized"}
-    inventory = enrich_inventory_with_forecasts(data.get("inventory", []))
+    if at is not None:
+        snap = resolve_snapshot(at)
+        if snap is None:
+            return {"error": f"No snapshot retained for at={at}"}
+        return await cached_response(request, "/inventory@snapshot", snap.version, lambda: build_inventory_body(snap, at=True))
+    # Built from the snapshot of the current version, so the worker thread never reads the live store.
+    snap = current_snapshot()
+    uptime = round(time.time() - store["boot_time"])
+    return await cached_response(
+        request, "/inventory", snap.version, lambda: build_inventory_body(snap), trailer=[("uptime", uptime)],
+    )
+
+
+def build_inventory_body(snap, at=False):
+    """Dashboard payload for ``snap``; ``at`` adds the ``uptime``/``snapshot`` fields of a historical view."""
+    inventory = enrich_inventory_with_forecasts(snap.items())
 
     # Enrich alerts with root cause data
     enriched_alerts = []
-    for alert in store["alerts"]:
-        a = dict(alert)
-        rc = get_root_cause(alert)
-        if rc:
-            a["root_cause"] = rc
-        enriched_alerts.append(a)
+    with span("root_cause"):
+        for alert in snap.alerts:
+            a = dict(alert)
+            rc = get_root_cause(alert, snap)
+            if rc:
+                a["root_cause"] = rc
+            enriched_alerts.append(a)
 
     recommendations = build_action_recommendations(
         inventory=inventory,
-        returns_data=data.get("returns", {}),
+        returns_data=snap.returns,
         alerts=enriched_alerts,
-        tariffs=data.get("tariffs", []),
+        tariffs=snap.tariffs,
+        index=snap.tariff_index(),
     )
 
-    return {
-        "inventory": inventory,
-        "tariffs": data.get("tariffs", []),
-        "returns": data.get("returns", {}),
-        "alerts": enriched_alerts,
-        "recommendations": recommendations,
-        "supplier_risks": supplier_risk_leaderboard(),
-        "demo_mode": bool(store.get("demo_mode")),
-        "connections": store["connections"],
-        "last_update": store["last_update"],
-        "uptime": round(time.time() - store["boot_time"]),
-    }
+    parts = [
+        ("inventory", encode_json(inventory)),
+        ("tariffs", section_fragment("tariffs", snap.tariffs, snap.tariffs_version)),
+        ("returns", section_fragment("returns", snap.returns, snap.returns_version)),
+        ("alerts", encode_json(enriched_alerts)),
+        ("recommendations", encode_json(recommendations)),
+        ("supplier_risks", encode_json(snap.supplier_risks)),
+        ("demo_mode", encode_json(snap.demo_mode)),
+        ("connections", encode_json(snap.connections)),
+        ("last_update", encode_json(snap.last_update)),
+    ]
+    if at:
+        parts.append(("uptime", encode_json(round(snap.ts - store["boot_time"]))))
+        parts.append(("snapshot", encode_json({"version": snap.version, "ts": snap.ts})))
+    return json_object_bytes(parts)
 
 
 @app.get("/api/history")
-async def get_history():
+async def get_history(request: Request):
     """Return 7-day historical data for charts and sparklines."""
-    return store.get("history", {})
+    if not store.get("history_ready"):
+        await asyncio.to_thread(ensure_history)
+    key = store["section_versions"].get("history", 0)
+
+    def build():
+        # The tick appends hourly points under this lock; hold it so the encoder never sees a series mid-update.
+        with store["history_lock"]:
+            return section_fragment("history", store["history"], key)
+
+    return await cached_response(request, "/api/history", key, build)
+
+
+@app.get("/api/analytics/demand")
+async def get_demand_analytics(
+    channel: str = "all",
+    group: str = "hour",
+    category: str | None = None,
+    skus: str | None = None,
+    quantiles: str | None = None,
+):
+    """Demand profile by hour of day, day of week or category, with percentile bands, from the history rollups."""
+    if channel not in ROLLUP_CHANNELS:
+        return {"error": f"channel must be one of {list(ROLLUP_CHANNELS)}"}
+    if group not in ANALYTICS_GROUPS:
+        return {"error": f"group must be one of {list(ANALYTICS_GROUPS)}"}
+    sku_list = [s.strip() for s in skus.split(",") if s.strip()] if skus else None
+    if sku_list is not None and category is not None:
+        return {"error": "pass either skus or category, not both"}
+    if sku_list is not None and len(sku_list) > ANALYTICS_MAX_SKUS:
+        return {"error": f"at most {ANALYTICS_MAX_SKUS} skus per query"}
+    try:
+        qs = tuple(float(q) for q in quantiles.split(",")) if quantiles else ANALYTICS_QUANTILES
+    except ValueError:
+        return {"error": "quantiles must be comma-separated numbers"}
+    if not qs or not all(0 <= q <= 1 for q in qs):
+        return {"error": "quantiles must be between 0 and 1"}
+
+    rollups = store["history_rollups"] if store.get("history_ready") else None
+    if rollups is None:
+        rollups = await asyncio.to_thread(ensure_history_rollups)
+    if category is not None and category not in rollups.categories:
+        return {"error": f"unknown category {category!r}"}
+    started = time.perf_counter()
+    result = rollups.query(channel, group, skus=sku_list, category=category, quantiles=qs)
+    return {**result, "history_points": rollups.points, "query_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+@app.get("/api/analytics/spikes")
+async def get_demand_spikes(limit: int = 20, min_multiplier: float = 0.0, min_z: float = 0.0):
+    """SKUs whose latest velocity observation is furthest above their seasonal baseline."""
+    if not 1 <= limit <= 500:
+        return {"error": "limit must be between 1 and 500"}
+    detector = spike_detector()
+    return {
+        "spikes": detector.top(limit, min_multiplier, min_z),
+        "tracked_skus": len(detector.skus),
+        "stats": dict(detector.stats),
+    }
+
+
+@app.get("/api/scheduler")
+async def get_scheduler():
+    """Refresh scheduler tiers, cadences, lag and overrun counters for the current tenant."""
+    scheduler = store["scheduler"]
+    if scheduler is None:
+        return {"error": "The refresh scheduler is not running for this tenant"}
+    return scheduler.describe()
+
+
+@app.get("/api/alert-rules")
+async def get_alert_rules():
+    """Active alert rules with evaluation counters."""
+    return store["alert_rules"].describe()
+
+
+@app.put("/api/alert-rules")
+async def put_alert_rules(payload: dict):
+    """Replace the alert rules; they are compiled up front and run against every SKU straight away."""
+    try:
+        engine = AlertRuleEngine(payload.get("rules"))
+    except AlertRuleError as exc:
+        return {"error": str(exc)}
+    # The full-catalog pass runs off the loop; the new engine is private to it until installed below.
+    now = time.time()
+    found = await asyncio.to_thread(engine.evaluate, list(store["data"].get("inventory", [])), now)
+    store["alert_rules"] = engine
+    raised = publish_alerts(engine, found, now)
+    touch_store()
+    return {"status": "success", "rules": len(engine.rules), "raised": raised}
+
+
+@app.get("/api/startup")
+async def get_startup_report():
+    """Boot phase timings; history is reported once the background build lands."""
+    return {
+        **startup_report,
+        "history_ready": bool(store.get("history_ready")),
+    }
+
+
+@app.post("/api/catalog/import")
+async def import_catalog(request: Request, format: str = "ndjson", mode: str = "merge", kind: str | None = None):
+    """Stream an NDJSON or CSV catalog body into the store, validating each row."""
+    if mode not in ("merge", "replace"):
+        return {"error": "mode must be 'merge' or 'replace'"}
+    if kind is not None and kind not in CATALOG_KINDS:
+        return {"error": f"kind must be one of {', '.join(CATALOG_KINDS)}"}
+    try:
+        loader = CatalogLoader(format, kind=kind)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    async for chunk in request.stream():
+        if chunk:
+            loader.feed(chunk)
+    loader.close()
+
+    if not (loader.inventory or loader.tariffs or loader.returns):
+        return {"status": "no_change", **loader.summary()}
+    install_catalog(loader, mode=mode)
+    return {"status": "success", "mode": mode, **loader.summary()}
+
+
+@app.post("/api/ingest/channel-counts")
+async def ingest_channel_counts(payload: dict):
+    """Accept a batch of channel inventory-level events (Shopify, Amazon, WMS, POS webhooks)."""
+    events = payload.get("events", [])
+    if not isinstance(events, list):
+        return {"error": "events must be a list"}
+
+    result = stage_channel_events(events)
+    if payload.get("flush"):
+        flush_channel_ingest()
+    else:
+        schedule_ingest_flush()
+    return {
+        "status": "accepted",
+        **result,
+        "pending": len(store["ingest"]["pending"]),
+    }
+
+
+@app.get("/api/ingest/stats")
+async def get_ingest_stats():
+    state = store["ingest"]
+    return {
+        **state["stats"],
+        "pending": len(state["pending"]),
+        "window_ms": INGEST_WINDOW_MS,
+    }
+
+
+@app.get("/api/connectors")
+async def get_connectors():
+    """Rolling latency percentiles, error rate and sync lag per connector."""
+    now = time.time()
+    return {
+        "generated_at": now,
+        "connectors": {name: connector_health(name, t, now) for name, t in store["telemetry"].items()},
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, span, tick and event-loop metrics."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/api/profiler")
+async def set_profiler(payload: dict):
+    """Start/stop the sampling profiler on the event-loop thread."""
+    enabled = bool(payload.get("enabled", False))
+    if payload.get("reset"):
+        profiler.reset()
+    if enabled:
+        interval_ms = float(payload.get("interval_ms", 5))
+        profiler.start(store.get("loop_thread_ident") or threading.get_ident(), interval_ms)
+    else:
+        profiler.stop()
+    return {"status": "success", "enabled": profiler.enabled, "samples": profiler.samples}
+
+
+@app.get("/api/profiler/stacks")
+async def get_profiler_stacks():
+    """Collapsed stacks (``frame;frame;frame count``) for flamegraph.pl / speedscope."""
+    return PlainTextResponse(profiler.collapsed())
 
 
 @app.get("/api/health")
-async def get_health():
+async def get_health(request: Request, at: str | None = None):
     """Compute a 0-100 supply chain health score."""
     data = store["data"]
     if not data or "inventory" not in data:
         return {"score": 0, "breakdown": {}}
+    if at is not None:
+        snap = resolve_snapshot(at)
+        if snap is None:
+            return {"error": f"No snapshot retained for at={at}"}
+        return await cached_response(
+            request,
+            "/api/health@snapshot",
+            snap.version,
+            lambda: encode_json(dict(compute_health_score(snap.data(), snap.alerts), snapshot={"version": snap.version, "ts": snap.ts})),
+        )
+    snap = current_snapshot()
+    return await cached_response(
+        request,
+        "/api/health",
+        snap.version,
+        lambda: encode_json(compute_health_score(snap.data(), snap.alerts)),
+    )
 
+
+def compute_health_score(data, alerts):
     inventory = data.get("inventory", [])
     returns = data.get("returns", {})
-    alerts = store["alerts"]
 
     # Discrepancy score: fewer discrepancies = higher score (0-25)
     disc_count = sum(1 for i in inventory if i.get("discrepancy"))
@@ -764,19 +4596,165 @@ async def get_health():
 
 
 @app.get("/api/recommendations")
-async def get_recommendations():
-    data = store.get("data", {})
-    inventory = enrich_inventory_with_forecasts(data.get("inventory", []))
+async def get_recommendations(request: Request):
+    snap = current_snapshot()
+    return await cached_response(
+        request,
+        "/api/recommendations",
+        snap.version,
+        lambda: encode_json(build_recommendations_payload(snap)),
+        trailer=[("generated_at", int(time.time()))],
+    )
+
+
+def build_recommendations_payload(snap):
     recommendations = build_action_recommendations(
-        inventory=inventory,
-        returns_data=data.get("returns", {}),
-        alerts=store.get("alerts", []),
-        tariffs=data.get("tariffs", []),
+        inventory=enrich_inventory_with_forecasts(snap.items()),
+        returns_data=snap.returns,
+        alerts=snap.alerts,
+        tariffs=snap.tariffs,
+        index=snap.tariff_index(),
     )
+    return {"demo_mode": snap.demo_mode, "recommendations": recommendations}
+
+
+@app.get("/api/returns")
+async def get_returns(sku: str | None = None, grade: str | None = None, min_days: int | None = None,
+                      max_days: int | None = None, limit: int = 100):
+    """Open return batches filtered by SKU, grade and days stuck, oldest first."""
+    ledger = store["returns_ledger"]
+    ids = ledger.ids_for(sku, grade, min_days, max_days)
+    summary = ledger.summary
     return {
-        "generated_at": int(time.time()),
-        "demo_mode": bool(store.get("demo_mode")),
-        "recommendations": recommendations,
+        "in_limbo": summary["in_limbo"],
+        "total_frozen_value": summary["total_frozen_value"],
+        "average_days_stuck": summary["average_days_stuck"],
+        "matched": len(ids),
+        "items": [ledger.get(i) for i in ids[:max(0, min(limit, 1000))]],
+        "released": ledger.released,
+    }
+
+
+@app.get("/api/returns/aging")
+async def get_returns_aging(buckets: str | None = None):
+    """Batches, units and frozen value per days-stuck bucket (e.g. ``?buckets=7,14,30,60``)."""
+    try:
+        bounds = tuple(sorted({int(b) for b in buckets.split(",") if b.strip()})) if buckets else RETURN_AGE_BUCKETS
+    except ValueError:
+        return {"error": "buckets must be comma-separated whole days"}
+    if not bounds or bounds[0] < 0:
+        return {"error": "buckets must be comma-separated whole days"}
+    return {"buckets": store["returns_ledger"].aging(bounds)}
+
+
+@app.get("/api/tenants")
+async def list_tenants(memory: bool = False):
+    """Hosted tenants; ``?memory=true`` adds a per-section memory estimate (walks each store)."""
+    return {
+        "default": DEFAULT_TENANT,
+        "idle_spill_s": TENANT_IDLE_S,
+        "tenants": [tenant_summary(state, memory) for state in tenants.values()],
+    }
+
+
+@app.post("/api/tenants")
+async def create_tenant(payload: dict):
+    """Start a tenant from the seed data; load its catalog with /api/catalog/import under its X-Tenant-ID."""
+    tenant_id = str(payload.get("id", "")).strip()
+    if not TENANT_ID_RE.match(tenant_id):
+        return {"error": "id must be 1-64 letters, digits, '-' or '_'"}
+    if tenant_id in tenants:
+        return {"error": f"Tenant {tenant_id} already exists"}
+    tick_interval_s = payload.get("tick_interval_s")
+    if tick_interval_s is not None and (not isinstance(tick_interval_s, (int, float)) or tick_interval_s < 1):
+        return {"error": "tick_interval_s must be a number >= 1"}
+    state = start_tenant(tenant_id, payload.get("company"), tick_interval_s=tick_interval_s)
+    return {"status": "success", "tenant": tenant_summary(state)}
+
+
+@app.delete("/api/tenants/{tenant_id}")
+async def delete_tenant(tenant_id: str):
+    if tenant_id == DEFAULT_TENANT:
+        return {"error": "The default tenant cannot be removed"}
+    if tenant_id not in tenants:
+        return {"error": f"Unknown tenant: {tenant_id}"}
+    stop_tenant(tenant_id)
+    spill = tenants.pop(tenant_id)["history_spill"]
+    if spill and os.path.exists(spill):
+        os.remove(spill)
+    metrics["gauges"]["tenants"] = len(tenants)
+    return {"status": "success", "removed": tenant_id}
+
+
+@app.get("/api/snapshots")
+async def get_snapshots():
+    """Retained snapshot range and how much of it is structurally shared."""
+    return store["snapshots"].stats()
+
+
+@app.get("/api/replenishment")
+async def get_replenishment(request: Request, budget: float | None = None, service_level: float = SERVICE_LEVEL, limit: int = 50):
+    """Ranked purchase plan: safety stock, reorder point and order quantity per SKU."""
+    if not 0.5 <= service_level < 1:
+        return {"error": "service_level must be in [0.5, 1)"}
+    if budget is not None and budget < 0:
+        return {"error": "budget must be non-negative"}
+    limit = max(1, min(limit, 1000))
+
+    snap = current_snapshot()
+
+    def build():
+        result = build_replenishment_plan(snap.items(), service_level, budget)
+        result["plan"] = result["plan"][:limit]
+        return encode_json({"generated_at": int(time.time()), **result})
+
+    key = (snap.version, budget, service_level, limit)
+    return await cached_response(request, "/api/replenishment", key, build)
+
+
+@app.post("/api/tariffs/simulate")
+async def simulate_tariff_scenarios(payload: dict):
+    """Landed-cost exposure for every tariff scenario, ad-hoc rates and cross-country combinations."""
+    def _is_rate(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 5
+
+    tariffs = store["data"].get("tariffs", [])
+    known = {t.get("country") for t in tariffs}
+    countries = payload.get("countries")
+    if countries is not None and (not isinstance(countries, list) or not set(countries) <= known):
+        return {"error": f"countries must be a list drawn from {sorted(known)}"}
+
+    rates = payload.get("rates", [])
+    if not isinstance(rates, list) or not all(_is_rate(r) for r in rates):
+        return {"error": "rates must be a list of numbers between 0 and 5"}
+    if payload.get("grid") is not None:
+        try:
+            rates = rates + tariff_rate_grid(payload["grid"])
+        except (KeyError, TypeError, ValueError) as exc:
+            return {"error": f"invalid grid: {exc}"}
+
+    combinations = payload.get("combinations", [])
+    if not isinstance(combinations, list) or not all(
+        isinstance(c, dict) and set(c) <= known and all(_is_rate(r) for r in c.values()) for c in combinations
+    ):
+        return {"error": "combinations must be a list of {country: rate} objects for known countries"}
+
+    top_n = payload.get("top_skus", TARIFF_TOP_SKUS)
+    if not isinstance(top_n, int) or not 0 <= top_n <= 100:
+        return {"error": "top_skus must be an integer between 0 and 100"}
+
+    n_countries = len(countries) if countries is not None else len(tariffs)
+    if len(rates) * n_countries + len(combinations) > TARIFF_MAX_EVALUATIONS:
+        return {"error": f"too many evaluations (max {TARIFF_MAX_EVALUATIONS})"}
+
+    started = time.perf_counter()
+    index = tariff_index()
+    result = simulate_tariffs(tariffs, index, rates, combinations, countries, top_n)
+    return {
+        "version": store["version"],
+        "skus": len(index.skus),
+        **result,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
     }
 
 
@@ -801,7 +4779,7 @@ async def set_demo_mode(payload: dict):
     if not enabled:
         # Trigger one immediate tick so users can see drift resume right away.
         simulate_tick()
-    store["last_update"] = time.time()
+    touch_store()
     return {
         "status": "success",
         "demo_mode": enabled,
@@ -827,7 +4805,7 @@ async def query_intelligence(payload: dict):
         "returns": store["data"].get("returns", {}),
         "recent_alerts": store["alerts"][:5],
     }
-    system = SYSTEM_PROMPT.format(context=json.dumps(context_data, indent=2))
+    system = SYSTEM_PROMPT.format(company=store["company"], context=json.dumps(context_data, indent=2, default=json_default))
 
     messages = [{"role": "system", "content": system}]
 
@@ -897,13 +4875,13 @@ Generate 4-6 anomalies by performing these analyses:
 Use real numbers from the data below. Be specific and quantitative — no vague statements.
 
 LIVE INVENTORY:
-""" + json.dumps(inventory, indent=2) + """
+""" + json.dumps(inventory, indent=2, default=json_default) + """
 
 TARIFF SCENARIOS:
-""" + json.dumps(tariffs, indent=2) + """
+""" + json.dumps(tariffs, indent=2, default=json_default) + """
 
 RECENT ALERTS:
-""" + json.dumps(alerts[:5], indent=2)
+""" + json.dumps(alerts[:5], indent=2, default=json_default)
 
     try:
         completion = client.chat.completions.create(
@@ -942,7 +4920,6 @@ RECENT ALERTS:
 @app.post("/api/action")
 async def execute_action(payload: dict):
     """Execute a supply chain action that mutates the live data."""
-    global alert_counter
     action = payload.get("action", "")
     data = store["data"]
 
@@ -964,12 +4941,13 @@ async def execute_action(payload: dict):
                 item["true_atp"] = wms
                 item["discrepancy"] = False
                 item["risk_value"] = 0
+                rebase_demand(item)
+                mark_dirty(item["id"])
                 synced.append(item["name"])
 
         if synced:
-            alert_counter += 1
             store["alerts"].insert(0, {
-                "id": f"ACT-{alert_counter}",
+                "id": next_alert_id("ACT"),
                 "type": "INFO",
                 "message": f"Inventory synced for {', '.join(synced)} — all channels now match WMS",
                 "risk": 0,
@@ -977,31 +4955,43 @@ async def execute_action(payload: dict):
                 "sku": sku_id,
                 "time": "just now",
             })
-            store["last_update"] = time.time()
+            touch_store()
             return {"status": "success", "message": f"Synced: {', '.join(synced)}"}
-        store["last_update"] = time.time()
+        touch_store()
         return {"status": "no_change", "message": "No discrepancies to sync"}
 
-    if action == "release_returns":
-        returns = data.get("returns", {})
-        released_value = returns.get("total_frozen_value", 0)
-        returns["in_limbo"] = 0
-        returns["total_frozen_value"] = 0
-        returns["average_days_stuck"] = 0
-        returns["items"] = []
+    if action.startswith("release_returns"):
+        parts = action.split(":")
+        target = parts[1] if len(parts) > 1 and parts[1] else None
+        qty = None
+        if len(parts) > 2:
+            if not parts[2].isdigit() or int(parts[2]) <= 0:
+                return {"error": "Format: release_returns[:<SKU-ID|RET-ID>[:<qty>]]"}
+            qty = int(parts[2])
+        if target is not None and store["returns_ledger"].get(target) is None and target not in store["returns_ledger"].by_sku:
+            return {"error": f"No returns found for {target}"}
+
+        released = release_returns(target, qty)
+        held = ""
+        if released["held_units"]:
+            held = f"; {released['held_units']} units in {released['held_batches']} ungraded or grade C batches still held"
+        if not released["units"]:
+            grades = "/".join(RESELLABLE_GRADES)
+            return {"status": "no_change", "message": f"No grade {grades} returns awaiting release{held}", "released": released}
+        released_value = released["value"]
+        scope = f" for {target}" if target else ""
 
-        alert_counter += 1
         store["alerts"].insert(0, {
-            "id": f"ACT-{alert_counter}",
+            "id": next_alert_id("ACT"),
             "type": "INFO",
-            "message": f"Returns released — ${released_value:,} in frozen inventory returned to sellable ATP",
+            "message": f"Returns released{scope} — {released['units']} units (${released_value:,}) returned to sellable ATP{held}",
             "risk": 0,
             "action": None,
-            "sku": None,
+            "sku": target if target in released["credited"] else None,
             "time": "just now",
         })
-        store["last_update"] = time.time()
-        return {"status": "success", "message": f"Released ${released_value:,} in returns"}
+        touch_store("returns")
+        return {"status": "success", "message": f"Released ${released_value:,} in returns{scope}{held}", "released": released}
 
     if action.startswith("pause_channel"):
         parts = action.split(":")
@@ -1014,13 +5004,14 @@ async def execute_action(payload: dict):
             if item["id"] == sku_id and channel in item["systems"]:
                 old_val = item["systems"][channel]
                 if old_val <= 0:
-                    store["last_update"] = time.time()
+                    touch_store()
                     return {"status": "no_change", "message": f"{item['name']} already paused on {channel}"}
                 item["systems"][channel] = 0
+                rebase_demand(item)
+                mark_dirty(sku_id)
 
-                alert_counter += 1
                 store["alerts"].insert(0, {
-                    "id": f"ACT-{alert_counter}",
+                    "id": next_alert_id("ACT"),
                     "type": "INFO",
                     "message": f"{item['name']} paused on {channel.title()} (was {old_val} units)",
                     "risk": 0,
@@ -1028,7 +5019,7 @@ async def execute_action(payload: dict):
                     "sku": sku_id,
                     "time": "just now",
                 })
-                store["last_update"] = time.time()
+                touch_store()
                 return {"status": "success", "message": f"Paused {item['name']} on {channel}"}
 
         return {"error": f"SKU {sku_id} or channel {channel} not found"}
@@ -0,0 +1,110 @@
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from main import AlertRuleEngine, AlertRuleError, InventoryRecord, app
+
+
+def record(shopify, wms=100):
+    return InventoryRecord({
+        "id": "SKU-1",
+        "name": "Tent",
+        "systems": {"shopify": shopify, "amazon": 0, "wms": wms, "pos": 0},
+        "available": wms,
+        "reorder_point": 10,
+        "risk_value": 0,
+    })
+
+
+class AlertRuleTests(unittest.TestCase):
+    def test_rules_are_validated_when_compiled(self):
+        for spec, fragment in [
+            ({"name": "x", "when": "oversell > "}, "cannot parse"),
+            ({"name": "x", "when": "__import__('os')"}, "not allowed"),
+            ({"name": "x", "when": "velocity > 3"}, "unknown field"),
+            ({"name": "x", "when": "oversell > 1", "message": "{name} {colour}"}, "placeholder"),
+            ({"name": "x", "when": "oversell > 1", "severity": "LOUD"}, "severity"),
+        ]:
+            with self.assertRaisesRegex(AlertRuleError, fragment):
+                AlertRuleEngine([spec])
+
+    def test_hysteresis_and_cooldown(self):
+        engine = AlertRuleEngine([{
+            "name": "oversell", "kind": "gap", "when": "oversell > 10", "clear": "oversell <= 2", "cooldown_s": 60,
+        }])
+        item = record(shopify=115)
+        self.assertEqual(len(engine.evaluate([item], now=1000)), 1)
+        self.assertEqual(engine.evaluate([item], now=1001), [])
+        self.assertEqual(engine.stats["unchanged"], 1)
+
+        item.shopify = 108  # below the trigger but above the clear level: stays active
+        self.assertEqual(engine.evaluate([item], now=1002), [])
+        item.shopify = 120
+        self.assertEqual(engine.evaluate([item], now=1003), [])
+
+        item.shopify = 100
+        engine.evaluate([item], now=1004)
+        self.assertEqual(engine.stats["cleared"], 1)
+        item.shopify = 130
+        self.assertEqual(engine.evaluate([item], now=1010), [])
+        self.assertEqual(engine.stats["cooling_down"], 1)
+
+        item.shopify = 100
+        engine.evaluate([item], now=1070)
+        item.shopify = 131
+        (rule, raised_item, values), = engine.evaluate([item], now=1071)
+        alert = engine.alert(rule, raised_item, values, 1071, engine.risk(rule, raised_item, values))
+        self.assertEqual(alert["kind"], "gap")
+        self.assertEqual(alert["metrics"], {"oversell": 31})
+
+    def test_structured_alerts_reach_root_cause_and_only_changed_skus_are_evaluated(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            rules = [{
+                "name": "deep_oversell",
+                "kind": "oversell_watch",
+                "severity": "INFO",
+                "when": "oversell > 40",
+                "action": "sync_inventory",
+                "message": "{name} oversold by {oversell} on {listed_channel}",
+            }]
+            self.assertIn("error", client.put("/api/alert-rules", json={"rules": [{"name": "x"}]}).json())
+            resp = client.put("/api/alert-rules", json={"rules": rules}).json()
+            self.assertEqual(resp["status"], "success")
+
+            raised = [a for a in main.store["alerts"] if a.get("rule") == "deep_oversell"]
+            self.assertEqual(resp["raised"], len(raised))
+            self.assertTrue(raised)
+            body = client.get("/inventory").json()
+            alert = next(a for a in body["alerts"] if a["id"] == raised[0]["id"])
+            self.assertIn("oversell", alert["metrics"])
+            self.assertIn("deep_oversell", alert["root_cause"]["chain"][0]["text"])
+
+            before = client.get("/api/alert-rules").json()["stats"]
+            events = [{"sku": "SKU-101", "channel": "pos", "count": 3, "seq": 1}]
+            client.post("/api/ingest/channel-counts", json={"events": events, "flush": True})
+            after = client.get("/api/alert-rules").json()["stats"]
+            self.assertEqual(after["evaluated"] + after["unchanged"], before["evaluated"] + before["unchanged"] + 1)
+
+    def test_rule_replacement_evaluates_the_catalog_off_the_event_loop(self):
+        threads = []
+        original = AlertRuleEngine.evaluate
+
+        def evaluate(engine, items, now=None):
+            threads.append((threading.get_ident(), main.store["tenant"]))
+            return original(engine, items, now)
+
+        with TestClient(app) as client, mock.patch.object(AlertRuleEngine, "evaluate", evaluate):
+            client.post("/api/demo-mode", json={"enabled": True})
+            loop_thread = client.portal.call(threading.get_ident)
+            resp = client.put("/api/alert-rules", json={"rules": main.DEFAULT_ALERT_RULES}).json()
+        self.assertEqual(resp["status"], "success")
+        self.assertTrue(threads)
+        self.assertTrue(all(ident != loop_thread and tenant == main.DEFAULT_TENANT for ident, tenant in threads))
+
+
+if __name__ == "__main__":
+    unittest.main()
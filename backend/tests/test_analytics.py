@@ -0,0 +1,96 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import bench
+import main
+from main import app
+
+
+def brute_force_profile(history, channel):
+    sums, counts = [0] * 24, [0] * 24
+    for series in history.values():
+        hourly = series["hourly"]
+        for prev, point in zip(hourly, hourly[1:]):
+            value = dict(main.point_demand(prev, point))[channel]
+            hour = main.hour_of_day(point["ts"])
+            sums[hour] += value
+            counts[hour] += 1
+    return sums, counts
+
+
+class DemandAnalyticsTests(unittest.TestCase):
+    def setUp(self):
+        bench.install_catalog(bench.synthetic_catalog(60, seed=5), history_max_skus=60)
+
+    def test_profile_matches_a_scan_of_the_history(self):
+        client = TestClient(app)
+        for channel in main.ROLLUP_CHANNELS:
+            body = client.get("/api/analytics/demand", params={"channel": channel}).json()
+            sums, counts = brute_force_profile(main.store["history"], channel)
+            self.assertEqual([b["total"] for b in body["buckets"]], sums)
+            self.assertEqual([b["points"] for b in body["buckets"]], counts)
+            self.assertIn("p90", body["buckets"][0])
+
+        by_category = client.get("/api/analytics/demand", params={"group": "category"}).json()
+        self.assertEqual(sum(b["points"] for b in by_category["buckets"]), by_category["overall"]["points"])
+        dow = client.get("/api/analytics/demand", params={"group": "dow"}).json()
+        self.assertEqual(len(dow["buckets"]), 7)
+        self.assertEqual(dow["overall"]["total"], by_category["overall"]["total"])
+
+        skus = ",".join(item["id"] for item in main.store["data"]["inventory"][:5]) + ",SKU-NOPE"
+        scoped = client.get("/api/analytics/demand", params={"skus": skus}).json()
+        self.assertEqual(scoped["scope"], {"skus": 6, "matched": 5})
+        self.assertNotIn("p50", scoped["buckets"][0])
+
+        self.assertIn("error", client.get("/api/analytics/demand", params={"channel": "fax"}).json())
+        self.assertIn("error", client.get("/api/analytics/demand", params={"quantiles": "2"}).json())
+        self.assertIn("error", client.get("/api/analytics/demand", params={"category": "Nope"}).json())
+
+    def test_appended_hours_keep_rollups_in_step_with_the_window(self):
+        item = main.store["data"]["inventory"][0]
+        last_ts = main.store["history"][item["id"]]["hourly"][-1]["ts"]
+        item["systems"]["shopify"] = 0
+        appended = main.append_history_hour(now=last_ts + 3 * 3600)
+
+        hourly = main.store["history"][item["id"]]["hourly"]
+        self.assertEqual(appended, 3 * 60)
+        self.assertEqual(len(hourly), main.HISTORY_HOURS)
+        self.assertEqual(hourly[-1]["ts"], last_ts + 3 * 3600)
+        self.assertEqual(hourly[-1]["shopify"], 0)
+
+        live = main.store["history_rollups"]
+        rebuilt = main.build_history_rollups(main.store["history"])
+        self.assertEqual(live.points, rebuilt.points)
+        for channel in main.ROLLUP_CHANNELS:
+            for group in main.ROLLUP_GROUPS:
+                self.assertEqual(live.skus[item["id"]][channel].sums[group], rebuilt.skus[item["id"]][channel].sums[group])
+                self.assertEqual(live.skus[item["id"]][channel].counts[group], rebuilt.skus[item["id"]][channel].counts[group])
+            self.assertEqual(live.skus[item["id"]][channel].sketch.count, rebuilt.skus[item["id"]][channel].sketch.count)
+        self.assertEqual(main.append_history_hour(now=last_ts + 3 * 3600 + 60), 0)
+        self.assertTrue(hourly[-2]["gap_fill"])
+        self.assertNotIn("gap_fill", hourly[-1])
+
+    def test_closing_a_day_rolls_daily_velocity(self):
+        item = main.store["data"]["inventory"][0]
+        series = main.store["history"][item["id"]]
+        last = series["hourly"][-1]
+        self.assertEqual((last["day"], last["hour"]), (6, 23))
+        before = [d["velocity"] for d in series["daily_velocity"]]
+        item["systems"]["shopify"] = last["shopify"] + 240
+        item["systems"]["amazon"] = last["amazon"]
+        main.append_history_hour(now=last["ts"] + 30 * 3600)
+
+        hourly = series["hourly"]
+        self.assertEqual({p["day"] for p in hourly}, set(range(7)))
+        self.assertEqual(hourly[-1]["day"], 1)
+        # 240 units spread evenly over 30 missed hours: 8 an hour, 23 hour-steps inside the closed day.
+        self.assertEqual([d["day"] for d in series["daily_velocity"]], [1, 2, 3, 4, 5, 6, 0])
+        self.assertEqual(series["daily_velocity"][-1]["velocity"], 23 * 8)
+        self.assertEqual([d["velocity"] for d in series["daily_velocity"][:-1]], before[1:])
+        mean, _ = main.demand_stats(series, item)
+        self.assertAlmostEqual(mean, sum(before[1:] + [23 * 8]) / 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
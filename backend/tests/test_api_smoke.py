@@ -54,6 +54,17 @@ class APISmokeTests(unittest.TestCase):
             self.assertEqual(updated["systems"]["shopify"], updated["systems"]["wms"])
             self.assertEqual(updated["systems"]["amazon"], updated["systems"]["wms"])
 
+    def test_startup_report_and_lazy_history(self):
+        with TestClient(app) as client:
+            report = client.get("/api/startup").json()
+            self.assertIn("seed_load", report["phases_ms"])
+            self.assertIsNotNone(report["ready_ms"])
+
+            history = client.get("/api/history").json()
+            self.assertIn("SKU-101", history)
+            self.assertEqual(len(history["SKU-101"]["hourly"]), 7 * 24)
+            self.assertTrue(client.get("/api/startup").json()["history_ready"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import bench
+import main
+
+
+class BenchmarkSuiteTests(unittest.TestCase):
+    def test_synthetic_catalog_is_deterministic(self):
+        first = bench.synthetic_catalog(50, seed=11)
+        second = bench.synthetic_catalog(50, seed=11)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first["inventory"]), 50)
+        self.assertEqual(len({item["id"] for item in first["inventory"]}), 50)
+        self.assertTrue(any(item["discrepancy"] for item in first["inventory"]))
+        self.assertNotEqual(first, bench.synthetic_catalog(50, seed=12))
+
+    def test_small_run_reports_timings_and_flags_regressions(self):
+        builds = main.metrics["singleflight"].get("/inventory", {}).get("leader", 0)
+        report = bench.run_benchmark([10], repeat=2, trace_memory=False)
+        cases = {case["name"]: case for case in report["results"][0]["cases"]}
+        self.assertIn("simulate_tick", cases)
+        self.assertIn("GET /inventory", cases)
+        self.assertIn("GET /inventory [cached]", cases)
+        self.assertGreater(cases["GET /inventory"]["response_bytes"], 0)
+        # The size probe and both cold samples build; the cached samples never do.
+        self.assertEqual(main.metrics["singleflight"]["/inventory"]["leader"] - builds, 3)
+        self.assertGreater(report["results"][0]["max_rss_kib"], 0)
+
+        baseline = {"results": [{"skus": 10, "cases": [dict(cases["simulate_tick"], median_ms=1e-6)]}]}
+        regressions = bench.compare(report, baseline, threshold=0.2)
+        self.assertEqual([r["case"] for r in regressions], ["simulate_tick"])
+
+
+if __name__ == "__main__":
+    unittest.main()
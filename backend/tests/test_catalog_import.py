@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+INVENTORY_CSV = (
+    "id,name,category,shopify,amazon,wms,pos,committed,country_of_origin,lead_time_days,reorder_point,unit_cost\n"
+    "SKU-900,Trail Pack,Packs,40,38,30,2,5,Vietnam,30,20,12.5\n"
+    "SKU-901,\"Camp Stove, Compact\",Cooking,12,12,12,0,2,Mexico,14,5,8\n"
+    "SKU-902,Broken Row,Cooking,lots,1,1,0,0,Mexico,14,5,8\n"
+)
+
+
+class CatalogImportTests(unittest.TestCase):
+    def test_csv_upload_merges_rows_and_reports_rejects(self):
+        with TestClient(app) as client:
+            resp = client.post(
+                "/api/catalog/import?format=csv&mode=merge",
+                content=INVENTORY_CSV.encode(),
+            )
+            self.assertEqual(resp.status_code, 200)
+            payload = resp.json()
+            self.assertEqual(payload["status"], "success")
+            self.assertEqual(payload["loaded"]["inventory"], 2)
+            self.assertEqual(payload["rejected"], 1)
+            self.assertEqual(payload["errors"][0]["line"], 4)
+
+            inventory = {item["id"]: item for item in client.get("/inventory").json()["inventory"]}
+            self.assertIn("SKU-101", inventory)
+            self.assertEqual(inventory["SKU-900"]["true_atp"], 30)
+            self.assertTrue(inventory["SKU-900"]["discrepancy"])
+            self.assertEqual(inventory["SKU-901"]["name"], "Camp Stove, Compact")
+            self.assertIn("SKU-900", client.get("/api/history").json())
+
+    def test_ndjson_catalog_path_replaces_seed_at_startup(self):
+        lines = [
+            '{"kind": "inventory", "id": "SKU-1", "name": "Tent", "systems": {"shopify": 9, "amazon": 9, "wms": 9, "pos": 0}, "unit_cost": 90}',
+            '{"kind": "tariff", "country": "Vietnam", "current_rate": 0.15, "rate": 0.3, "scenario": "Spike"}',
+            '{"kind": "return", "id": "RET-1", "sku": "SKU-1", "qty": 4, "value": 360, "days": 10}',
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.ndjson")
+            with open(path, "w") as f:
+                f.write("\n".join(lines))
+            with mock.patch.object(main, "CATALOG_PATH", path), TestClient(app) as client:
+                payload = client.get("/inventory").json()
+                self.assertEqual([item["id"] for item in payload["inventory"]], ["SKU-1"])
+                self.assertEqual(payload["tariffs"][0]["scenarios"][0]["rate"], 0.3)
+                self.assertEqual(payload["returns"]["in_limbo"], 4)
+                self.assertIn("catalog_load", client.get("/api/startup").json()["phases_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+class QuantileSketchTests(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy_and_mergeable(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+        whole, left, right = main.QuantileSketch(), main.QuantileSketch(), main.QuantileSketch()
+        for i, v in enumerate(values):
+            whole.add(v)
+            (left if i % 2 else right).add(v)
+        left.merge(right)
+
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(whole.quantile(q), exact, delta=exact * 0.03)
+            self.assertEqual(left.quantile(q), whole.quantile(q))
+        self.assertLessEqual(len(whole.buckets), whole.max_buckets)
+
+
+class ConnectorHealthTests(unittest.TestCase):
+    def test_status_is_derived_from_latency_thresholds(self):
+        with TestClient(app) as client:
+            connectors = client.get("/api/connectors").json()["connectors"]
+            self.assertEqual(set(connectors), set(main.CONNECTOR_PROFILES))
+            self.assertIsNotNone(connectors["wms"]["p95_ms"])
+
+            for _ in range(50):
+                main.record_connector_sample("wms", 2500)
+            wms = client.get("/api/connectors").json()["connectors"]["wms"]
+            self.assertEqual(wms["status"], "degraded")
+            self.assertTrue(any("p95" in reason for reason in wms["reasons"]))
+            self.assertGreater(wms["p99_ms"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import gzip
+import json
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+class ResponseEncodingTests(unittest.TestCase):
+    def test_gzip_is_negotiated_and_cached_per_version(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            plain = client.get("/api/history", headers={"Accept-Encoding": "identity"})
+            self.assertNotIn("content-encoding", plain.headers)
+            self.assertIn("Accept-Encoding", plain.headers["vary"])
+
+            zipped = client.get("/api/history", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(zipped.headers["content-encoding"], "gzip")
+            self.assertEqual(zipped.json(), plain.json())
+
+            entry = main.store["response_cache"]["/api/history"]
+            self.assertEqual(json.loads(gzip.decompress(entry["encoded"]["gzip"])), plain.json())
+
+    def test_tariff_fragment_is_reused_until_catalog_changes(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            client.get("/inventory")
+            fragment = main.store["fragments"]["tariffs"][1]
+            client.post("/api/action", json={"action": "sync_inventory"})
+            client.get("/inventory")
+            self.assertIs(main.store["fragments"]["tariffs"][1], fragment)
+
+            csv_body = "country,current_rate,scenario,rate\nPeru,0.02,Trade Pact,0.01\n"
+            client.post("/api/catalog/import?format=csv", content=csv_body.encode())
+            payload = client.get("/inventory").json()
+            self.assertIn("Peru", [t["country"] for t in payload["tariffs"]])
+            self.assertIsNot(main.store["fragments"]["tariffs"][1], fragment)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+class ChannelIngestTests(unittest.TestCase):
+    def test_batch_coalesces_by_sequence_and_recomputes_item(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            events = [
+                {"sku": "SKU-101", "channel": "shopify", "count": 500, "seq": 2},
+                {"sku": "SKU-101", "channel": "shopify", "count": 100, "seq": 1},
+                {"sku": "SKU-101", "channel": "shopify", "count": 290, "seq": 3},
+                {"sku": "SKU-101", "channel": "amazon", "count": 280, "seq": 1},
+                {"sku": "SKU-101", "channel": "fax", "count": 1, "seq": 1},
+            ]
+            resp = client.post("/api/ingest/channel-counts", json={"events": events, "flush": True}).json()
+            self.assertEqual(resp["rejected"], 1)
+            self.assertEqual(resp["pending"], 0)
+
+            item = next(i for i in client.get("/inventory").json()["inventory"] if i["id"] == "SKU-101")
+            self.assertEqual(item["systems"]["shopify"], 290)
+            self.assertEqual(item["systems"]["amazon"], 280)
+            self.assertFalse(item["discrepancy"])
+            self.assertEqual(item["risk_value"], 0)
+
+            stale = [{"sku": "SKU-101", "channel": "shopify", "count": 999, "seq": 3}]
+            client.post("/api/ingest/channel-counts", json={"events": stale, "flush": True})
+            stats = client.get("/api/ingest/stats").json()
+            self.assertEqual(stats["stale"], 1)
+            self.assertEqual(stats["coalesced"], 2)
+            self.assertEqual(stats["events_applied"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import fake_openai
+import loadtest
+from main import app
+
+
+class FakeOpenAITests(unittest.TestCase):
+    def test_query_streams_through_fake_openai_server(self):
+        config = fake_openai.FakeConfig(latency_ms=0, jitter_ms=0, tokens_per_second=0)
+        server, base_url = fake_openai.serve_in_thread(config=config)
+        self.addCleanup(server.shutdown)
+        env = {"OPENAI_API_KEY": "fake-key", "OPENAI_BASE_URL": base_url}
+        with mock.patch.dict(os.environ, env), TestClient(app) as client:
+            resp = client.post("/api/query", json={"query": "Which SKUs are at risk?"})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.text, fake_openai.ANSWER)
+
+            parsed = client.post("/api/parse", json={"text": "PO-7781 ..."}).json()
+            self.assertEqual(parsed["extracted"]["po_number"], "PO-7781")
+            self.assertIn("score", parsed["supplier_risk"]["latest"])
+
+
+class LoadTestSummaryTests(unittest.TestCase):
+    def test_summary_reports_percentiles_and_error_rate(self):
+        recorder = loadtest.Recorder()
+        for i in range(100):
+            recorder.add("inventory", (i + 1) / 1000, ok=i % 10 != 0)
+        summary = loadtest.summarize(recorder, elapsed_s=2.0)
+        inventory = summary["endpoints"]["inventory"]
+        self.assertEqual(inventory["requests"], 100)
+        self.assertEqual(inventory["rps"], 50.0)
+        self.assertEqual(inventory["error_rate"], 0.1)
+        self.assertEqual(inventory["p50_ms"], 51.0)
+        self.assertEqual(inventory["p99_ms"], 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+class MetricsTests(unittest.TestCase):
+    def test_metrics_expose_route_histograms_and_spans(self):
+        with TestClient(app) as client:
+            client.get("/inventory")
+            client.get("/api/recommendations")
+            body = client.get("/metrics").text
+
+            # Metrics are process-wide, so other tests may have added samples too.
+            self.assertRegex(body, r'nexus_http_request_duration_seconds_count\{method="GET",route="/inventory",status="200"\} [1-9]')
+            for name in ("forecast", "recommendations", "root_cause", "serialize"):
+                self.assertIn(f'nexus_span_duration_seconds_count{{span="{name}"}}', body)
+            self.assertIn("nexus_profiler_enabled 0", body)
+
+    def test_profiler_collects_collapsed_stacks(self):
+        with TestClient(app) as client:
+            resp = client.post("/api/profiler", json={"enabled": True, "interval_ms": 1, "reset": True})
+            self.assertTrue(resp.json()["enabled"])
+            deadline = time.time() + 0.2
+            while time.time() < deadline:
+                client.get("/api/health")
+            stopped = client.post("/api/profiler", json={"enabled": False}).json()
+            self.assertFalse(stopped["enabled"])
+            self.assertGreater(stopped["samples"], 0)
+
+            stacks = client.get("/api/profiler/stacks").text.splitlines()
+            self.assertTrue(stacks)
+            frames, count = stacks[0].rsplit(" ", 1)
+            self.assertIn(";", frames)
+            self.assertGreater(int(count), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
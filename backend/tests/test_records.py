@@ -0,0 +1,70 @@
+import json
+import sys
+import unittest
+
+import main
+from main import InventoryRecord, RecordView
+
+
+ITEM = {
+    "id": "SKU-1",
+    "name": "Tent",
+    "category": "Camping",
+    "systems": {"shopify": 12, "amazon": 9, "wms": 4, "pos": 1},
+    "true_atp": 4,
+    "committed": 1,
+    "available": 3,
+    "discrepancy": True,
+    "risk_value": 2160,
+    "country_of_origin": "Vietnam",
+    "lead_time_days": 30,
+    "reorder_point": 10,
+    "unit_cost": 22.5,
+}
+
+
+class InventoryRecordTests(unittest.TestCase):
+    def test_serializes_exactly_like_the_item_dict(self):
+        record = InventoryRecord(dict(ITEM, supplier="Hanoi Outdoor"))
+        expected = dict(ITEM, supplier="Hanoi Outdoor")
+        self.assertEqual(main.encode_json(record), main.encode_json(expected))
+        self.assertEqual(json.dumps(record, default=main.json_default), json.dumps(expected))
+        self.assertEqual(list(record), list(expected))
+        self.assertEqual(record, expected)
+
+    def test_systems_view_writes_through(self):
+        record = InventoryRecord(ITEM)
+        record["systems"]["wms"] += 8
+        self.assertEqual(record.wms, 12)
+        self.assertEqual(main.refresh_item_state(record), 0)
+        self.assertEqual(record["available"], 11)
+        self.assertFalse(record["discrepancy"])
+        with self.assertRaises(KeyError):
+            record["systems"]["fax"] = 1
+        with self.assertRaises(ValueError):
+            InventoryRecord(dict(ITEM, systems={"fax": 1}))
+
+    def test_copy_is_independent(self):
+        record = InventoryRecord(ITEM)
+        clone = record.copy()
+        record["systems"]["shopify"] = 0
+        self.assertEqual(clone["systems"]["shopify"], 12)
+
+    def test_view_shares_the_record_and_is_read_only(self):
+        record = InventoryRecord(ITEM)
+        view = RecordView(record, stockout_forecast={"risk_7d": 1.0})
+        record["available"] = 0
+        self.assertEqual(view["available"], 0)
+        self.assertEqual(list(view)[-1], "stockout_forecast")
+        with self.assertRaises(TypeError):
+            view["systems"]["wms"] = 1
+        self.assertEqual(main.encode_json(view), main.encode_json(dict(ITEM, available=0, stockout_forecast={"risk_7d": 1.0})))
+
+    def test_record_is_smaller_than_the_dicts_it_replaces(self):
+        record = InventoryRecord(ITEM)
+        as_dicts = sys.getsizeof(dict(ITEM)) + sys.getsizeof(dict(ITEM["systems"]))
+        self.assertLess(sys.getsizeof(record), as_dicts)
+
+
+if __name__ == "__main__":
+    unittest.main()
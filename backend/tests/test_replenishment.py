@@ -0,0 +1,75 @@
+import math
+import statistics
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+class ReplenishmentPlannerTests(unittest.TestCase):
+    def test_plan_lines_follow_safety_stock_and_eoq(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            payload = client.get("/api/replenishment").json()
+            self.assertEqual(payload["summary"]["skus"], len(main.store["data"]["inventory"]))
+
+            z = statistics.NormalDist().inv_cdf(main.SERVICE_LEVEL)
+            for line in payload["plan"]:
+                velocity = [p["velocity"] for p in main.store["history"][line["sku"]]["daily_velocity"]]
+                std = statistics.stdev(velocity)
+                lead = line["lead_time_days"]
+                self.assertEqual(line["safety_stock"], math.ceil(z * std * math.sqrt(lead)))
+                self.assertEqual(line["reorder_point"], math.ceil(statistics.fmean(velocity) * lead + z * std * math.sqrt(lead)))
+                self.assertGreaterEqual(line["order_qty"], line["eoq"])
+                self.assertEqual(line["status"], "funded")
+            self.assertEqual([line["rank"] for line in payload["plan"]], list(range(1, len(payload["plan"]) + 1)))
+
+    def test_budget_defers_orders_it_cannot_fund(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            payload = client.get("/api/replenishment", params={"budget": 1000}).json()
+            self.assertLessEqual(payload["summary"]["planned_cost"], 1000)
+            statuses = {line["status"] for line in payload["plan"]}
+            self.assertTrue(statuses & {"deferred", "reduced"})
+            self.assertIn("error", client.get("/api/replenishment", params={"service_level": 1.2}).json())
+
+    def test_line_at_its_reorder_point_is_reduced_to_at_least_one_unit(self):
+        item = main.InventoryRecord({
+            "id": "SKU-RP", "name": "Stove", "category": "Camping",
+            "systems": {"shopify": 0, "amazon": 0, "wms": 0, "pos": 0},
+            "available": 10, "committed": 0, "lead_time_days": 10, "unit_cost": 50,
+        })
+        line = main.plan_replenishment_line(item, 1.0, 0.0, 1.0)
+        self.assertEqual((line["available"], line["reorder_point"]), (10, 10))
+        self.assertGreater(line["order_qty"], 0)
+        self.assertEqual(line["min_order_qty"], 1)
+
+        with mock.patch.object(main, "replenishment_line", return_value=(line, False)):
+            result = main.build_replenishment_plan([item], budget=60)
+        entry, = result["plan"]
+        self.assertEqual((entry["status"], entry["planned_qty"]), ("reduced", 1))
+
+    def test_only_changed_skus_are_recomputed(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            inventory = main.store["data"]["inventory"]
+            main.build_replenishment_plan(inventory)
+            inventory[0]["available"] += 25
+            summary = main.build_replenishment_plan(inventory)["summary"]
+            self.assertEqual(summary["recomputed"], 1)
+            self.assertEqual(summary["reused"], len(inventory) - 1)
+
+    def test_reorder_root_cause_uses_planned_quantity(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            item = main.store["data"]["inventory"][0]
+            line, _ = main.replenishment_line(item)
+            chain = main.get_root_cause({"message": "approaching reorder point", "sku": item["id"], "risk": 0})["chain"]
+            self.assertIn(f"reorder {line['order_qty'] or line['eoq']} units", chain[-1]["text"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+def batch(i, sku, qty, days, grade="A"):
+    return {"id": f"RET-{i}", "sku": sku, "qty": qty, "value": qty * 10, "days": days, "reason": "Size Exchange", "grade": grade}
+
+
+class ReturnsLedgerTests(unittest.TestCase):
+    def test_running_aggregates_match_a_full_summary(self):
+        ledger = main.ReturnsLedger([batch(i, f"SKU-{i % 3}", 5 + i, i % 70) for i in range(200)])
+        ledger.release("RET-10")
+        ledger.release("RET-11", 4)
+        ledger.upsert(batch(5, "SKU-9", 1, 3))
+        expected = main.summarize_returns(list(ledger.summary["items"]))
+        for key in ("in_limbo", "total_frozen_value", "average_days_stuck"):
+            self.assertEqual(ledger.summary[key], expected[key])
+
+        aging = ledger.aging((7, 30))
+        self.assertEqual(sum(b["units"] for b in aging), ledger.summary["in_limbo"])
+        self.assertEqual(
+            aging[0]["batches"], sum(1 for r in ledger.summary["items"] if r["days"] <= 7)
+        )
+        ids = ledger.ids_for(sku="SKU-1", min_days=20, max_days=40)
+        self.assertTrue(ids)
+        self.assertTrue(all(20 <= ledger.get(i)["days"] <= 40 and ledger.get(i)["sku"] == "SKU-1" for i in ids))
+
+    def test_partial_release_credits_wms_oldest_first(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            ledger = main.store["returns_ledger"]
+            ledger.upsert(batch(1, "SKU-101", 10, 5))
+            item = main._find_item_by_sku("SKU-101")
+            wms_before = item["systems"]["wms"]
+            oldest = ledger.ids_for(sku="SKU-101")[0]
+            oldest_qty = ledger.get(oldest)["qty"]
+
+            result = client.post("/api/action", json={"action": "release_returns:SKU-101:30"}).json()
+            self.assertEqual(result["status"], "success")
+            self.assertEqual(result["released"]["units"], 30)
+            self.assertEqual(item["systems"]["wms"], wms_before + 30)
+            self.assertEqual(item["true_atp"], wms_before + 30)
+            self.assertEqual(ledger.get(oldest)["qty"], oldest_qty - 30)
+            self.assertIsNotNone(ledger.get("RET-1"))
+
+            payload = client.get("/inventory").json()
+            self.assertEqual(payload["returns"]["in_limbo"], ledger.summary["in_limbo"])
+
+            error = client.post("/api/action", json={"action": "release_returns:SKU-101:lots"}).json()
+            self.assertIn("error", error)
+            self.assertIn("error", client.post("/api/action", json={"action": "release_returns:RET-404"}).json())
+
+    def test_release_all_and_query_endpoints(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            listing = client.get("/api/returns", params={"min_days": 30}).json()
+            self.assertTrue(all(r["days"] >= 30 for r in listing["items"]))
+            aging = client.get("/api/returns/aging", params={"buckets": "14,30"}).json()["buckets"]
+            self.assertEqual([b["bucket"] for b in aging], ["0-14", "15-30", "31+"])
+
+            ledger = main.store["returns_ledger"]
+            units = sum(ledger.get(i)["qty"] for i in ledger.ids_for() if ledger.get(i)["grade"] in main.RESELLABLE_GRADES)
+            held = ledger.summary["in_limbo"] - units
+            result = client.post("/api/action", json={"action": "release_returns"}).json()
+            self.assertEqual(result["released"]["units"], units)
+            self.assertEqual(client.get("/api/returns").json()["in_limbo"], held)
+            self.assertEqual(client.post("/api/action", json={"action": "release_returns"}).json()["status"], "no_change")
+
+    def test_bulk_and_sku_release_skip_unsellable_grades(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            main.install_returns([
+                batch(1, "SKU-101", 10, 30, grade="A"),
+                batch(2, "SKU-101", 20, 40, grade="C"),
+                batch(3, "SKU-103", 5, 10, grade="B"),
+                batch(4, "SKU-105", 8, 50, grade="pending"),
+            ])
+            main.touch_store("returns")
+            wms = {sku: main._find_item_by_sku(sku)["systems"]["wms"] for sku in ("SKU-101", "SKU-103", "SKU-105")}
+
+            returns = main.store["data"]["returns"]
+            recommendation, = main.build_action_recommendations([], returns, [], [])
+            self.assertTrue(recommendation["rationale"].startswith("15 units and $150 "))
+            self.assertIn("28 ungraded or grade C units stay held", recommendation["rationale"])
+
+            result = client.post("/api/action", json={"action": "release_returns"}).json()
+            self.assertEqual(result["released"]["units"], 15)
+            self.assertEqual((result["released"]["held_batches"], result["released"]["held_units"]), (2, 28))
+            self.assertIn("28 units in 2 ungraded or grade C batches still held", result["message"])
+            self.assertEqual(sorted(r["id"] for r in client.get("/api/returns").json()["items"]), ["RET-2", "RET-4"])
+            self.assertEqual(main._find_item_by_sku("SKU-101")["systems"]["wms"], wms["SKU-101"] + 10)
+            self.assertEqual(main._find_item_by_sku("SKU-105")["systems"]["wms"], wms["SKU-105"])
+
+            # Naming the SKU still leaves its grade C batch alone; naming the batch releases it.
+            self.assertEqual(client.post("/api/action", json={"action": "release_returns:SKU-101"}).json()["status"], "no_change")
+            result = client.post("/api/action", json={"action": "release_returns:RET-2"}).json()
+            self.assertEqual(result["released"]["units"], 20)
+            self.assertEqual(main._find_item_by_sku("SKU-101")["systems"]["wms"], wms["SKU-101"] + 30)
+            self.assertEqual(main.store["data"]["returns"]["in_limbo"], 8)
+
+    def test_batches_age_from_their_intake_time(self):
+        start = 1_000_000_000
+        ledger = main.ReturnsLedger([batch(1, "SKU-1", 10, 3), batch(2, "SKU-1", 5, 9), batch(3, "SKU-2", 7, 20)], now=start)
+        self.assertEqual(ledger.get("RET-2")["received_at"], start - 9 * 86400)
+        self.assertEqual(ledger.ids_for(), ["RET-3", "RET-2", "RET-1"])
+        self.assertEqual(ledger.ids_for(max_days=7), ["RET-1"])
+
+        self.assertFalse(ledger.refresh_ages(start + 3600))
+        self.assertTrue(ledger.refresh_ages(start + 5 * 86400))
+        self.assertEqual([ledger.get(f"RET-{i}")["days"] for i in (1, 2, 3)], [8, 14, 25])
+        self.assertEqual(ledger.summary["average_days_stuck"], round((8 + 14 + 25) / 3))
+        self.assertEqual(ledger.ids_for(max_days=7), [])
+        self.assertEqual(ledger.ids_for(min_days=8, max_days=14), ["RET-2", "RET-1"])
+        self.assertEqual(ledger.ids_for(sku="SKU-1", min_days=10), ["RET-2"])
+        self.assertEqual([b["batches"] for b in ledger.aging((7, 14, 30))], [0, 2, 1, 0])
+
+        # A batch arriving now starts at day 0 and sorts as the newest.
+        ledger.upsert(batch(4, "SKU-2", 2, 0))
+        self.assertEqual(ledger.ids_for()[-1], "RET-4")
+        self.assertEqual(ledger.aging((7,))[0], {"bucket": "0-7", "batches": 1, "units": 2, "value": 20})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import bench
+import main
+from main import AlertRuleEngine, RefreshScheduler, app
+
+
+class RefreshSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        bench.install_catalog(bench.synthetic_catalog(300, seed=3), history_max_skus=300)
+        main.store["alert_rules"] = AlertRuleEngine(main.DEFAULT_ALERT_RULES)
+        self.inventory = main.store["data"]["inventory"]
+
+    def test_tiers_follow_gap_alerts_and_stockout_risk(self):
+        engine = main.store["alert_rules"]
+        item = next(i for i in self.inventory if not i.discrepancy)
+        self.assertEqual(main.refresh_tier(item, engine, 1000), 2)
+        engine.forecasts[item.id] = (None, {"risk_7d": 30})
+        self.assertEqual(main.refresh_tier(item, engine, 1000), 1)
+        engine.last_alert[item.id] = 900
+        self.assertEqual(main.refresh_tier(item, engine, 1000), 0)
+        self.assertEqual(main.refresh_tier(item, engine, 900 + main.SCHEDULER_RECENT_ALERT_S), 1)
+        item.discrepancy = True
+        self.assertEqual(main.refresh_tier(item, None, 1000), 0)
+
+    def test_skus_are_rescheduled_on_their_tier_cadence(self):
+        scheduler = RefreshScheduler(frame_s=0.5)
+        interval = main.store["tick_interval_s"]
+        now = 10_000.0
+        asyncio.run(scheduler.run_frame(now=now))
+        first = scheduler.stats["refreshed"]
+        self.assertLess(first, len(self.inventory))  # first refreshes are spread over a cadence
+
+        later = now + interval * max(main.SCHEDULER_CADENCE)
+        frame = asyncio.run(scheduler.run_frame(now=later))
+        self.assertEqual(frame["refreshed"] + first, scheduler.stats["refreshed"])
+        self.assertEqual(scheduler.stats["cycles"], 1)
+        self.assertEqual(sorted(pos for _, pos in scheduler.heap), list(range(len(self.inventory))))
+        cadences = scheduler.cadences(interval)
+        for due, pos in scheduler.heap:
+            self.assertEqual(due, later + cadences[scheduler.tiers[pos]])
+        self.assertEqual(sum(scheduler.tier_counts), len(self.inventory))
+        self.assertEqual(list(scheduler.tiers).count(0), scheduler.tier_counts[0])
+
+    def test_overruns_stretch_low_priority_cadences(self):
+        scheduler = RefreshScheduler(frame_s=0.5)
+        scheduler.sync(self.inventory, 10_000.0, main.store["tick_interval_s"])
+        scheduler.batch = 50
+        before = main.metrics["counters"]["tick_overruns"]
+        with mock.patch.object(main, "SCHEDULER_FRAME_BUDGET", 0):
+            frame = asyncio.run(scheduler.run_frame(now=11_000.0))
+        self.assertTrue(frame["left_behind"])
+        self.assertEqual(frame["slices"], 1)
+        self.assertGreater(scheduler.lag_s, 0)
+        self.assertGreater(scheduler.stretch, 1.0)
+        self.assertEqual(main.metrics["counters"]["tick_overruns"], before + 1)
+
+        cadences = scheduler.cadences(main.store["tick_interval_s"])
+        self.assertEqual(cadences[0], main.store["tick_interval_s"])
+        self.assertGreater(cadences[2], main.store["tick_interval_s"] * main.SCHEDULER_CADENCE[2])
+
+    def test_scheduler_endpoint_reports_the_running_tenant(self):
+        with TestClient(app) as client:
+            body = client.get("/api/scheduler").json()
+        self.assertEqual(list(body["tiers"]), list(main.SCHEDULER_TIERS))
+        self.assertIn("overruns", body["stats"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+import main
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        main.initialize_store(main.load_seed_data())
+        main.ensure_history()
+        main.store["demo_mode"] = True
+        transport = httpx.ASGITransport(app=main.app)
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_concurrent_reads_share_one_computation(self):
+        # uptime and generated_at are added at send time, so neither the key nor the build depends on the clock.
+        # /inventory is large enough to be gzipped, so it also covers finishing the cached stream per request.
+        cases = (("/inventory", "uptime", "gzip"), ("/api/recommendations", "generated_at", None))
+        for route, stamp, encoding in cases:
+            with self.subTest(route=route):
+                calls = []
+                original = main.enrich_inventory_with_forecasts
+
+                def counting(inventory):
+                    calls.append(1)
+                    return original(inventory)
+
+                main.touch_store()
+                before = dict(main.metrics["singleflight"].get(route, {"leader": 0, "coalesced": 0}))
+                with mock.patch.object(main, "enrich_inventory_with_forecasts", counting):
+                    responses = await asyncio.gather(*(self.client.get(route) for _ in range(20)))
+                    later = time.time() + 5
+                    with mock.patch("time.time", return_value=later):
+                        plain = await self.client.get(route, headers={"Accept-Encoding": "identity"})
+
+                self.assertTrue(all(r.status_code == 200 for r in responses))
+                self.assertEqual(responses[0].headers.get("content-encoding"), encoding)
+                bodies = [r.json() for r in responses]
+                self.assertTrue(all(stamp in body for body in bodies))
+                self.assertEqual(len({json.dumps({k: v for k, v in b.items() if k != stamp}) for b in bodies}), 1)
+                self.assertEqual(len(calls), 1)
+                after = main.metrics["singleflight"][route]
+                self.assertEqual(after["leader"] - before["leader"], 1)
+                self.assertEqual(after["coalesced"] - before["coalesced"], 19)
+
+                self.assertNotIn("content-encoding", plain.headers)
+                self.assertGreater(plain.json()[stamp], bodies[0][stamp])
+                self.assertEqual(plain.json()["recommendations"], bodies[0]["recommendations"])
+
+        metrics_text = (await self.client.get("/metrics")).text
+        self.assertIn('nexus_singleflight_requests_total{route="/inventory",role="coalesced"}', metrics_text)
+
+    async def test_new_store_version_triggers_fresh_computation(self):
+        first = (await self.client.get("/api/health")).json()
+        main.store["alerts"].insert(0, {"id": "X1", "type": "CRITICAL", "message": "test", "risk": 0, "sku": None})
+        main.touch_store()
+        second = (await self.client.get("/api/health")).json()
+        self.assertEqual(first["breakdown"]["alert_health"] - second["breakdown"]["alert_health"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import bench
+import main
+from main import app
+
+
+class SnapshotTests(unittest.TestCase):
+    def test_historical_reads_see_state_before_a_sync(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            before = main.record_snapshot()
+            shopify_before = before.find_item("SKU-101")["systems"]["shopify"]
+
+            client.post("/api/action", json={"action": "sync_inventory:SKU-101"})
+            main.record_snapshot()
+
+            live = client.get("/inventory").json()
+            past = client.get("/inventory", params={"at": before.version}).json()
+            by_time = client.get("/inventory", params={"at": before.ts}).json()
+
+            live_item = next(i for i in live["inventory"] if i["id"] == "SKU-101")
+            past_item = next(i for i in past["inventory"] if i["id"] == "SKU-101")
+            self.assertEqual(live_item["systems"]["shopify"], live_item["systems"]["wms"])
+            self.assertEqual(past_item["systems"]["shopify"], shopify_before)
+            self.assertEqual(past["snapshot"]["version"], before.version)
+            self.assertEqual(by_time["snapshot"]["version"], before.version)
+            self.assertEqual(len(past["alerts"]), len(before.alerts))
+            self.assertNotIn("snapshot", live)
+
+            health = client.get("/api/health", params={"at": before.version}).json()
+            self.assertEqual(health["snapshot"]["version"], before.version)
+            self.assertIn("error", client.get("/inventory", params={"at": "nonsense"}).json())
+
+    def test_unchanged_chunks_are_shared(self):
+        main.initialize_store(bench.synthetic_catalog(2000, seed=3))
+        first = main.store["snapshots"].latest()
+        item = main.store["data"]["inventory"][1500]
+        item["systems"]["wms"] += 7
+        main.refresh_item_state(item)
+        main.touch_store()
+        second = main.record_snapshot()
+
+        changed = [c for c, (a, b) in enumerate(zip(first.chunks, second.chunks)) if a is not b]
+        self.assertEqual(changed, [1500 // main.SNAPSHOT_CHUNK])
+        self.assertEqual(second.find_item(item["id"])["systems"]["wms"], item["systems"]["wms"])
+        self.assertEqual(first.find_item(item["id"])["systems"]["wms"], item["systems"]["wms"] - 7)
+
+        stats = main.store["snapshots"].stats()
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["unique_chunks"], len(first.chunks) + 1)
+
+    def test_retention_window_prunes_old_snapshots(self):
+        main.initialize_store(main.load_seed_data())
+        log = main.SnapshotLog(retention_s=10)
+        main.store["snapshots"] = log
+        for i in range(5):
+            main.touch_store()
+            main.record_snapshot(now=1_000_000_000 + i * 4)
+        self.assertEqual(log.timestamps[0], 1_000_000_008)
+        self.assertIsNone(log.at_version(0))
+        self.assertEqual(log.at_time(1_000_000_009).ts, 1_000_000_008)
+
+    def test_reads_of_new_versions_are_not_retained(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            log = main.store["snapshots"]
+            main.record_snapshot()
+            count = len(log.snapshots)
+            for _ in range(5):
+                client.post("/api/action", json={"action": "sync_inventory:SKU-101"})
+                client.get("/inventory")
+                client.get("/api/health")
+            self.assertEqual(len(log.snapshots), count)
+            self.assertEqual(log.head.version, main.store["version"])
+
+            # The tick retains the snapshot the reads were already using.
+            head = log.head
+            self.assertIs(main.record_snapshot(), head)
+            self.assertEqual(len(log.snapshots), count + 1)
+            self.assertIsNone(log.head)
+
+    def test_count_and_record_caps_thin_older_snapshots(self):
+        main.initialize_store(bench.synthetic_catalog(600, seed=3))
+        log = main.SnapshotLog(max_count=8)
+        main.store["snapshots"] = log
+        inventory = main.store["data"]["inventory"]
+        start = 1_000_000_000
+        for i in range(40):
+            item = inventory[i % len(inventory)]
+            item["systems"]["wms"] += 1
+            main.mark_dirty(item["id"])
+            main.touch_store()
+            main.record_snapshot(now=start + i * 5)
+        self.assertLessEqual(len(log.snapshots), 8)
+        self.assertEqual(log.timestamps[-1], start + 39 * 5)
+        self.assertLess(log.timestamps[0], start + 20 * 5)  # thinned, not truncated to the newest 8
+        self.assertEqual(log.records, log.stats()["unique_records"])
+
+        log.max_records = 2 * len(inventory)
+        main.store["dirty_all"] = True
+        main.touch_store()
+        main.record_snapshot(now=start + 40 * 5)
+        self.assertLessEqual(log.records, log.max_records)
+        self.assertEqual(log.records, log.stats()["unique_records"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from main import InventoryRecord, SpikeDetector, app
+
+
+def record(sku="SKU-1", shopify=1000, amazon=1000):
+    return InventoryRecord({
+        "id": sku,
+        "name": "Tent",
+        "category": "Camping",
+        "systems": {"shopify": shopify, "amazon": amazon, "wms": 2000, "pos": 0},
+        "available": 2000,
+        "unit_cost": 20,
+    })
+
+
+def steady(detector, item, start, steps, units=2, every=60):
+    now = start
+    for _ in range(steps):
+        item.shopify -= units
+        now += every
+        detector.observe([item], now)
+    return now
+
+
+class SpikeDetectorTests(unittest.TestCase):
+    def setUp(self):
+        with open(main.DATA_PATH) as f:
+            main.initialize_store(json.load(f))
+
+    def test_surge_is_scored_against_the_learned_baseline(self):
+        detector = SpikeDetector()
+        item = record()
+        detector.observe([item], 1000)
+        self.assertIsNone(detector.reading(item.id))
+        now = steady(detector, item, 1000, 30)
+
+        multiplier, z, units, velocity, baseline, channel = detector.reading(item.id)
+        self.assertAlmostEqual(multiplier, 1.0, places=6)
+        self.assertAlmostEqual(baseline, 120.0, places=6)  # 2 units a minute
+
+        item.shopify -= 40
+        detector.observe([item], now + 60)
+        multiplier, z, units, velocity, baseline, channel = detector.reading(item.id)
+        self.assertEqual((channel, units, velocity), ("shopify", 40, 2400.0))
+        self.assertAlmostEqual(multiplier, 20.0, places=6)
+        self.assertGreater(z, 4)
+
+        # The surge was clipped before it updated the level, so the next normal minute reads as normal again.
+        item.shopify -= 2
+        detector.observe([item], now + 120)
+        self.assertLess(detector.reading(item.id)[0], 1.5)
+
+        # Observations closer together than SPIKE_MIN_INTERVAL_S are merged into the next one.
+        item.shopify -= 5
+        detector.observe([item], now + 121)
+        self.assertEqual(detector.stats["merged"], 1)
+        self.assertEqual(detector.reading(item.id)[2], 2)
+
+    def test_spike_alert_carries_the_measured_multiplier_into_root_cause(self):
+        # SKU-101 already has the seed's spike alert, which would absorb a new one.
+        item = next(i for i in main.store["data"]["inventory"] if i.id != "SKU-101")
+        start = 1_000_000.0
+        main.observe_demand([item], start)
+        for step in range(1, 20):
+            item.shopify -= 1
+            main.observe_demand([item], start + step * 60)
+        item.shopify -= 30
+        main.refresh_item_state(item)
+        main.observe_demand([item], start + 20 * 60)
+        main.apply_alert_rules([item], start + 20 * 60)
+
+        alert = next(a for a in main.store["alerts"] if a.get("rule") == "demand_spike")
+        self.assertEqual(alert["kind"], "spike")
+        self.assertEqual(alert["metrics"]["spike_channel"], "Shopify")
+        multiplier = alert["metrics"]["spike_multiplier"]
+        self.assertGreaterEqual(multiplier, 3)
+        self.assertIn(f"{multiplier:.1f}x", alert["message"])
+
+        chain = main.get_root_cause(alert)["chain"]
+        self.assertIn("detected from live sales velocity", chain[0]["text"])
+        self.assertTrue(chain[1]["text"].startswith(f"Order velocity {multiplier:.1f}x normal on Shopify"))
+
+        client = TestClient(app)
+        spikes = client.get("/api/analytics/spikes", params={"min_z": 4}).json()["spikes"]
+        self.assertEqual([s["sku"] for s in spikes], [item.id])
+        self.assertIn("error", client.get("/api/analytics/spikes", params={"limit": 0}).json())
+
+    def test_operator_actions_are_not_read_as_demand(self):
+        client = TestClient(app)
+        paused = main._find_item_by_sku("SKU-102")
+        synced = next(i for i in main.store["data"]["inventory"] if i.id not in ("SKU-101", "SKU-102"))
+        synced.shopify = synced.wms + 80
+        main.refresh_item_state(synced)
+        start = 1_000_000.0
+        main.observe_demand([paused, synced], start)
+        for step in range(1, 20):
+            paused.shopify -= 1
+            synced.shopify -= 1
+            main.observe_demand([paused, synced], start + step * 60)
+
+        actions = ["pause_channel:shopify:SKU-102", f"sync_inventory:{synced.id}"]
+        for action in actions:
+            self.assertEqual(client.post("/api/action", json={"action": action}).json()["status"], "success")
+        self.assertEqual(paused.shopify, 0)
+        self.assertEqual(synced.shopify, synced.wms)
+
+        synced.shopify -= 1
+        main.observe_demand([paused, synced], start + 20 * 60)
+        main.apply_alert_rules([paused, synced], start + 20 * 60)
+        for item, units in ((paused, 0), (synced, 1)):
+            multiplier, z, spike_units, *_ = main.spike_detector().reading(item.id)
+            self.assertEqual(spike_units, units)
+            self.assertLess(multiplier, 3)
+        self.assertFalse([a for a in main.store["alerts"] if a.get("rule") == "demand_spike"])
+
+    def test_seed_spike_alert_is_measured_from_history(self):
+        main.ensure_history()
+        seed_alert = next(a for a in main.store["alerts"] if "TikTok" in a["message"])
+        measured = main.history_velocity_multiplier("SKU-101")
+        self.assertIsNotNone(measured)
+        effect = main.get_root_cause(seed_alert)["chain"][1]["text"]
+        self.assertTrue(effect.startswith(f"Order velocity {measured:.1f}x normal"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+def brute_force_exposure(inventory, country, delta):
+    return sum(
+        int(item.get("true_atp", 0)) * float(item.get("unit_cost", 25)) * 4 * delta
+        for item in inventory
+        if item.get("country_of_origin") == country
+    )
+
+
+class TariffSimulationTests(unittest.TestCase):
+    def test_every_scenario_matches_a_full_inventory_pass(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            main.store["data"]["tariffs"][0]["scenarios"].append(
+                {"name": "Negotiated Cap", "rate": 0.2, "effective_date": "2026-07-01"}
+            )
+            payload = client.post("/api/tariffs/simulate", json={"top_skus": 2}).json()
+
+            inventory = main.store["data"]["inventory"]
+            tariffs = {t["country"]: t for t in main.store["data"]["tariffs"]}
+            expected = sum(len(t["scenarios"]) for t in tariffs.values())
+            self.assertEqual(len(payload["scenarios"]), expected)
+            for scenario in payload["scenarios"]:
+                delta = scenario["rate"] - tariffs[scenario["country"]]["current_rate"]
+                self.assertAlmostEqual(
+                    scenario["exposure"], brute_force_exposure(inventory, scenario["country"], delta), places=1
+                )
+                self.assertAlmostEqual(sum(scenario["by_category"].values()), scenario["exposure"], places=0)
+                self.assertLessEqual(len(scenario["top_skus"]), 2)
+
+    def test_rate_grid_and_combinations(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            payload = client.post("/api/tariffs/simulate", json={
+                "countries": ["Vietnam"],
+                "grid": {"min": 0.0, "max": 0.5, "step": 0.05},
+                "combinations": [{"Vietnam": 0.3, "China": 0.3}],
+            }).json()
+
+            grid = [s for s in payload["scenarios"] if s["source"] == "grid"]
+            self.assertEqual(len(grid), 11)
+            self.assertEqual({s["country"] for s in payload["scenarios"]}, {"Vietnam"})
+            self.assertLess(grid[0]["exposure"], 0)  # dropping to 0% is a saving
+
+            combo = payload["combinations"][0]
+            self.assertAlmostEqual(combo["exposure"], sum(combo["by_country"].values()), places=1)
+
+            error = client.post("/api/tariffs/simulate", json={"combinations": [{"Atlantis": 0.1}]}).json()
+            self.assertIn("error", error)
+            error = client.post("/api/tariffs/simulate", json={"grid": {"min": 0, "max": 1, "step": 0}}).json()
+            self.assertIn("error", error)
+
+    def test_recommendations_and_root_cause_use_worst_scenario(self):
+        with TestClient(app) as client:
+            client.post("/api/demo-mode", json={"enabled": True})
+            vietnam = next(t for t in main.store["data"]["tariffs"] if t["country"] == "Vietnam")
+            vietnam["scenarios"].append({"name": "Escalation", "rate": 0.6, "effective_date": "2026-12-01"})
+            main.touch_store("tariffs")
+
+            chain = main.get_root_cause({"message": "Vietnam tariff increase pending", "risk": 0})["chain"]
+            self.assertIn("to 60%", chain[0]["text"])
+            risk = main.score_supplier_risk({"supplier": "Hanoi Co", "origin": "Vietnam", "anomalies": []})
+            self.assertEqual(risk["components"]["tariff_delta_pts"], 45.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
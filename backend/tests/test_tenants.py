@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+
+class TenantTests(unittest.TestCase):
+    def test_tenants_have_isolated_stores(self):
+        with TestClient(app) as client:
+            created = client.post("/api/tenants", json={"id": "summit", "company": "Summit Gear"}).json()
+            self.assertEqual(created["tenant"]["company"], "Summit Gear")
+            self.assertIn("error", client.post("/api/tenants", json={"id": "summit"}).json())
+            self.assertIn("error", client.post("/api/tenants", json={"id": "../etc"}).json())
+
+            summit = {"X-Tenant-ID": "summit"}
+            client.post("/api/demo-mode", json={"enabled": True}, headers=summit)
+            client.post("/api/demo-mode", json={"enabled": True})
+            result = client.post("/api/action", json={"action": "sync_inventory:SKU-101"}, headers=summit).json()
+            self.assertEqual(result["status"], "success")
+
+            mine = client.get("/inventory", headers=summit).json()
+            default = client.get("/inventory").json()
+            by_query = client.get("/inventory", params={"tenant": "summit"}).json()
+            item = lambda payload: next(i for i in payload["inventory"] if i["id"] == "SKU-101")
+            self.assertFalse(item(mine)["discrepancy"])
+            self.assertTrue(item(default)["discrepancy"])
+            self.assertEqual(item(by_query), item(mine))
+            self.assertEqual(mine["alerts"][0]["id"], "ACT-101")
+            self.assertNotEqual(default["alerts"][0]["id"], "ACT-101")
+
+            missing = client.get("/inventory", headers={"X-Tenant-ID": "nobody"})
+            self.assertEqual(missing.status_code, 404)
+
+            self.assertEqual(client.delete("/api/tenants/summit").json()["status"], "success")
+            self.assertEqual(client.get("/inventory", headers=summit).status_code, 404)
+            self.assertIn("error", client.delete(f"/api/tenants/{main.DEFAULT_TENANT}").json())
+
+    def test_idle_history_spills_to_disk_and_reloads(self):
+        with tempfile.TemporaryDirectory() as spill_dir, mock.patch.object(main, "SPILL_DIR", spill_dir):
+            with TestClient(app) as client:
+                client.post("/api/tenants", json={"id": "basecamp", "company": "Basecamp Supply"})
+                headers = {"X-Tenant-ID": "basecamp"}
+                before = client.get("/api/history", headers=headers).json()
+
+                state = main.tenants["basecamp"]
+                self.assertTrue(main.spill_history(state))
+                self.assertEqual(state["history"], {})
+                path = state["history_spill"]
+                self.assertEqual(os.path.dirname(path), spill_dir)
+                self.assertEqual(os.stat(spill_dir).st_mode & 0o777, 0o700)
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+                listing = client.get("/api/tenants").json()["tenants"]
+                self.assertTrue(next(t for t in listing if t["id"] == "basecamp")["history_spilled"])
+
+                self.assertEqual(client.get("/api/history", headers=headers).json(), before)
+                self.assertTrue(state["history_ready"])
+
+                # A re-spill writes a new file and removes the one it replaces.
+                self.assertTrue(main.spill_history(state))
+                self.assertNotEqual(state["history_spill"], path)
+                self.assertEqual(os.listdir(spill_dir), [os.path.basename(state["history_spill"])])
+
+    def test_default_spill_dir_is_private_to_the_process(self):
+        with mock.patch.object(main, "SPILL_DIR", ""):
+            path = main.spill_dir()
+            self.assertEqual(main.spill_dir(), path)
+        self.assertTrue(os.path.basename(path).startswith("nexuslink-spill-"))
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+    def test_memory_accounting_by_section(self):
+        with TestClient(app) as client:
+            client.get("/api/history")
+            tenants = client.get("/api/tenants", params={"memory": True}).json()["tenants"]
+            memory = next(t for t in tenants if t["id"] == main.DEFAULT_TENANT)["memory"]
+            self.assertGreater(memory["sections"]["history"], memory["sections"]["alerts"])
+            self.assertEqual(memory["total_bytes"], sum(memory["sections"].values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -425,13 +425,13 @@ function InventoryTab({ inventory, onAction, historyData, alerts, recommendation
     Object.values(historyData || {}).forEach(sku => {
       (sku.hourly || []).forEach(h => {
         const key = h.day;
-        if (!days[key]) days[key] = { day: `Day ${key + 1}`, shopify: 0, amazon: 0, wms: 0 };
+        if (!days[key]) days[key] = { index: key, day: `Day ${key + 1}`, shopify: 0, amazon: 0, wms: 0 };
         days[key].shopify += h.shopify;
         days[key].amazon += h.amazon;
         days[key].wms += h.wms;
       });
     });
-    return Object.values(days).sort((a, b) => a.day.localeCompare(b.day)).map(d => ({
+    return Object.values(days).sort((a, b) => a.index - b.index).map(d => ({
       ...d,
       shopify: Math.round(d.shopify / 24),
       amazon: Math.round(d.amazon / 24),